@@ -1,5 +1,6 @@
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 import os
 import sys
@@ -24,7 +25,9 @@ from .routes.verify_session import bp as verify_bp
 from .routes.manager import bp as manager_bp
 from .routes.psychology import bp as psychology_bp
 from .routes.guarantee import bp as guarantee_bp
-from .db.store import init_db
+from .db.store import init_db, install_unit_of_work
+from .utils.auth import start_key_refresh
+from .cli import auth_cli, db_cli
 
 
 # SECURITY: Fail-fast on missing critical secrets — Phase 0 hardening
@@ -55,16 +58,24 @@ def create_app() -> Flask:
     _check_required_secrets()
 
     app = Flask(__name__)
+    # Behind Railway's (or any) reverse proxy, take the client address from
+    # X-Forwarded-For so per-IP limits apply to clients, not the proxy
+    proxy_hops = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
     app.config['APP_ENV'] = os.getenv('APP_ENV', 'development')
     app.config['DATABASE_URL'] = os.getenv('DATABASE_URL', 'sqlite:///careerforge.db')
 
     # SECURITY: CORS restricted to known origins — Phase 0 hardening
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "https://thronoschain.org,https://careerforge-ai.thronoschain.org,https://api.thronoschain.org").split(",")
     CORS(app, origins=CORS_ORIGINS, supports_credentials=True,
-         allow_headers=['Content-Type', 'Authorization'],
+         allow_headers=['Content-Type', 'Authorization', 'Upload-Offset'],
+         expose_headers=['Upload-Offset', 'Upload-Length'],
          methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
 
+    start_key_refresh()
     init_db(app.config['DATABASE_URL'])
+    install_unit_of_work(app)
 
     app.register_blueprint(health_bp)
     app.register_blueprint(auth_bp)
@@ -87,4 +98,7 @@ def create_app() -> Flask:
     app.register_blueprint(psychology_bp)
     app.register_blueprint(guarantee_bp)
 
+    app.cli.add_command(db_cli)
+    app.cli.add_command(auth_cli)
+
     return app
@@ -0,0 +1,153 @@
+"""
+Operational commands, registered on the Flask CLI.
+
+    flask --app wsgi db migrate
+    flask --app wsgi db schema-version
+    flask --app wsgi db credits-verify
+    flask --app wsgi db credits-rebuild
+    flask --app wsgi db search-rebuild
+    flask --app wsgi db counters-rebuild
+    flask --app wsgi db blobs-migrate
+    flask --app wsgi db blobs-gc
+    flask --app wsgi db recompress
+    flask --app wsgi db audits-archive
+    flask --app wsgi db audits-export
+    flask --app wsgi auth calibrate-hash
+"""
+import calendar
+import json
+
+import click
+from flask.cli import AppGroup
+
+from .db.store import (
+    archive_audits, collect_blobs, iter_audits, migrate_schema, migrate_session_blobs, rebuild_candidate_search, rebuild_credit_balances,
+    rebuild_platform_counters, recompress_columns, schema_version, verify_credit_balances,
+)
+from .utils import pwhash
+
+db_cli = AppGroup('db', help='Database maintenance commands.')
+auth_cli = AppGroup('auth', help='Authentication commands.')
+
+
+@db_cli.command('migrate')
+def migrate():
+    """Apply pending schema migrations."""
+    applied = migrate_schema()
+    current, _ = schema_version()
+    if applied:
+        click.echo(f"Applied migration(s) {', '.join(map(str, applied))}; schema is at version {current}.")
+    else:
+        click.echo(f'Schema is up to date (version {current}).')
+
+
+@db_cli.command('schema-version')
+def show_schema_version():
+    """Show the database schema version and any pending migrations."""
+    current, latest = schema_version()
+    click.echo(f'Database is at version {current}; this release expects {latest}.')
+    if current < latest:
+        raise click.ClickException(f'{latest - current} migration(s) pending; run `db migrate`')
+
+
+@db_cli.command('credits-verify')
+def credits_verify():
+    """Compare materialised credit balances against the ledger."""
+    mismatches = verify_credit_balances()
+    for m in mismatches:
+        click.echo(f"{m['sub']}: stored={m['stored_balance']} ledger={m['ledger_balance']}")
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} balance(s) out of sync; run `db credits-rebuild`')
+    click.echo('All credit balances match the ledger.')
+
+
+@db_cli.command('credits-rebuild')
+def credits_rebuild():
+    """Recompute every materialised credit balance from the ledger."""
+    n = rebuild_credit_balances()
+    click.echo(f'Rebuilt balances for {n} user(s).')
+
+
+@db_cli.command('search-rebuild')
+def search_rebuild():
+    """Recreate the recruiter search index from candidate visibility and profiles."""
+    n = rebuild_candidate_search()
+    click.echo(f'Indexed {n} visible candidate(s).')
+
+
+@db_cli.command('counters-rebuild')
+def counters_rebuild():
+    """Recompute the per-day platform counters behind /v1/n8n/stats."""
+    n = rebuild_platform_counters()
+    click.echo(f'Rebuilt {n} platform counter bucket(s).')
+
+
+@db_cli.command('blobs-migrate')
+@click.option('--batch-size', default=20, show_default=True, help='Sessions per transaction.')
+def blobs_migrate(batch_size):
+    """Move base64 verification documents out of the database into the blob store."""
+    n = migrate_session_blobs(batch_size=batch_size)
+    click.echo(f'Migrated {n} verification session(s). On SQLite, run VACUUM to reclaim the space.')
+
+
+@db_cli.command('blobs-gc')
+@click.option('--min-age', default=3600, show_default=True, help='Seconds before an unreferenced file is removed.')
+def blobs_gc(min_age):
+    """Delete blobs no longer referenced by any row."""
+    result = collect_blobs(min_age_s=min_age)
+    click.echo(f"Removed {result['unreferenced']} unreferenced blob(s) and {result['orphaned_files']} orphaned file(s); "
+               f"expired {result['expired_uploads']} unfinished upload(s).")
+
+
+@db_cli.command('recompress')
+def recompress():
+    """Rewrite large text columns not yet in the current compressed encoding."""
+    result = recompress_columns()
+    for column, n in result.items():
+        click.echo(f'{column}: {n} row(s) rewritten')
+    click.echo(f'Rewrote {sum(result.values())} value(s). On SQLite, run VACUUM to reclaim the space.')
+
+
+@db_cli.command('audits-archive')
+@click.option('--older-than-days', type=click.IntRange(min=1), default=None,
+              help='Retention window in days (default: AUDIT_RETENTION_DAYS).')
+def audits_archive(older_than_days):
+    """Move audit rows past the retention window into compressed archive segments."""
+    result = archive_audits(older_than_days)
+    click.echo(f"Archived {result['rows']} audit row(s) into {result['segments']} segment(s); "
+               f"removed {result['leftovers']} leftover segment file(s).")
+
+
+def _epoch(value):
+    return calendar.timegm(value.timetuple()) if value else None
+
+
+@db_cli.command('audits-export')
+@click.option('--since', type=click.DateTime(), default=None, help='Inclusive start (UTC).')
+@click.option('--until', type=click.DateTime(), default=None, help='Exclusive end (UTC).')
+@click.option('--tenant', default=None)
+@click.option('--action', default=None)
+@click.option('--target-type', default=None)
+@click.option('--target-id', default=None)
+def audits_export(since, until, tenant, action, target_type, target_id):
+    """Stream matching audit rows, archived and live, as JSON lines."""
+    rows = iter_audits(since=_epoch(since), until=_epoch(until), tenant_id=tenant, action=action,
+                       target_type=target_type, target_id=target_id)
+    for row in rows:
+        click.echo(json.dumps(row, ensure_ascii=False))
+
+
+@auth_cli.command('calibrate-hash')
+@click.option('--target-ms', type=click.FloatRange(min=1), default=250, show_default=True,
+              help='Time one password hash should take on this host.')
+def calibrate_hash(target_ms):
+    """Benchmark PBKDF2 here and suggest PASSWORD_HASH_ITERATIONS."""
+    iterations, ms_per_100k = pwhash.calibrate(target_ms)
+    hash_ms = ms_per_100k * iterations / 100_000
+    current_ms = ms_per_100k * pwhash.ITERATIONS / 100_000
+    click.echo(f'PBKDF2-SHA256: {ms_per_100k:.1f} ms per 100k iterations on this host.')
+    click.echo(f'Current: {pwhash.ITERATIONS} iterations, ~{current_ms:.0f} ms per hash.')
+    click.echo(f'Suggested: {iterations} iterations, ~{hash_ms:.0f} ms per hash, '
+               f'~{1000 / hash_ms * pwhash.WORKERS:.0f} logins/s per worker process '
+               f'({pwhash.WORKERS} hashing thread(s)).')
+    click.echo(f'PASSWORD_HASH_ITERATIONS={iterations}')
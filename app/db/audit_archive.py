@@ -0,0 +1,96 @@
+"""
+Append-only archive of audit rows older than the hot-table retention window.
+
+Rows are written as gzip-compressed JSON lines, one segment per run of
+consecutive ids from the same UTC day, under
+AUDIT_ARCHIVE_DIR/<YYYY-MM-DD>/audits-<first_id>-<last_id>.jsonl.gz. A
+segment is written to a temp file, fsync'd and renamed into place, and is
+never modified afterwards. Which segments exist (and the id/time range each
+covers) is tracked by the `audit_segments` table in app/db/store.py; a file
+without a row there is a leftover from an archive run that rolled back.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+_NAME_RE = re.compile(r'^\d{4}-\d{2}-\d{2}/audits-\d+-\d+\.jsonl\.gz$')
+
+
+def root() -> Path:
+    return Path(os.getenv('AUDIT_ARCHIVE_DIR', 'audit-archive'))
+
+
+def segment_name(day: str, first_id: int, last_id: int) -> str:
+    """Path of a segment relative to root(); `day` is YYYY-MM-DD (UTC)."""
+    return f'{day}/audits-{first_id:012d}-{last_id:012d}.jsonl.gz'
+
+
+def path_for(name: str) -> Path:
+    if not _NAME_RE.match(name or ''):
+        raise ValueError(f'not an audit segment: {name!r}')
+    return root() / name
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_segment(name: str, rows: List[Dict[str, Any]]) -> Tuple[int, str]:
+    """Durably write `rows` as segment `name`; returns (bytes, sha256)."""
+    dest = path_for(name)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f'.{dest.name}.{uuid.uuid4().hex}.tmp')
+    try:
+        with open(tmp, 'wb') as raw:
+            # mtime=0 so identical rows always produce identical bytes
+            with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+                for row in rows:
+                    gz.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                    gz.write(b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    _fsync_dir(dest.parent)
+    h = hashlib.sha256()
+    with open(dest, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return dest.stat().st_size, h.hexdigest()
+
+
+def read_segment(name: str) -> Iterator[Dict[str, Any]]:
+    """Stream the rows of a segment, in id order, without loading it whole."""
+    with gzip.open(path_for(name), 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def remove(name: str) -> None:
+    try:
+        path_for(name).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def iter_segments() -> Iterator[Tuple[str, Path]]:
+    """Every segment file on disk as (name, path); used to clear leftovers."""
+    base = root()
+    if not base.is_dir():
+        return
+    for path in base.glob('*/audits-*.jsonl.gz'):
+        name = f'{path.parent.name}/{path.name}'
+        if _NAME_RE.match(name):
+            yield name, path
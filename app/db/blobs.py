@@ -0,0 +1,138 @@
+"""
+Content-addressed file store for large binary uploads (ID documents, videos).
+
+Each blob is written once to BLOB_STORE_DIR/<aa>/<bb>/<sha256>, via a temp
+file that is fsync'd and renamed into place, so a reader never sees a
+partial file and identical uploads share one copy. Which blobs are still in
+use is tracked by the `blobs` refcount table in app/db/store.py; this module
+only deals with the files.
+
+Chunked uploads are staged under BLOB_STORE_DIR/uploads/<id>.part and
+adopted into the store once their checksum is verified.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def root() -> Path:
+    return Path(os.getenv('BLOB_STORE_DIR', 'blobs'))
+
+
+def digest_of(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def path_for(digest: str) -> Path:
+    if not _DIGEST_RE.match(digest or ''):
+        raise ValueError(f'not a sha256 digest: {digest!r}')
+    return root() / digest[:2] / digest[2:4] / digest
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write(data: bytes, digest: Optional[str] = None) -> str:
+    """Durably store `data`, returning its sha256. A no-op if already present."""
+    digest = digest or digest_of(data)
+    dest = path_for(digest)
+    if dest.exists():
+        return digest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f'.{digest}.{uuid.uuid4().hex}.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    _fsync_dir(dest.parent)
+    return digest
+
+
+def upload_path(upload_id: str) -> Path:
+    """Staging file for a chunked upload; same filesystem as the blobs so
+    adopt() is a rename."""
+    if not re.match(r'^[0-9a-f]{32}$', upload_id or ''):
+        raise ValueError(f'not an upload id: {upload_id!r}')
+    return root() / 'uploads' / f'{upload_id}.part'
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def adopt(src: Path, digest: str) -> None:
+    """Move a fully written file into the store under `digest` (no copy)."""
+    dest = path_for(digest)
+    if dest.exists():
+        src.unlink()
+        return
+    with open(src, 'rb') as f:
+        os.fsync(f.fileno())
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(src, dest)
+    _fsync_dir(dest.parent)
+
+
+def remove(digest: str) -> None:
+    try:
+        path_for(digest).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def iter_digests() -> Iterator[Tuple[str, Path]]:
+    """Every stored blob as (digest, path); used by garbage collection."""
+    base = root()
+    if not base.is_dir():
+        return
+    for path in base.glob('??/??/*'):
+        if _DIGEST_RE.match(path.name):
+            yield path.name, path
+
+
+def iter_uploads() -> Iterator[Tuple[str, Path]]:
+    """Every staged chunked upload as (upload_id, path)."""
+    base = root() / 'uploads'
+    if not base.is_dir():
+        return
+    for path in base.glob('*.part'):
+        yield path.stem, path
+
+
+def decode_data_url(value: str, default_mime: str) -> Tuple[bytes, str]:
+    """Decode a base64 upload, with or without a `data:<mime>;base64,` prefix.
+
+    Raises ValueError if the payload is not valid base64.
+    """
+    mime = default_mime
+    if ',' in value:
+        header, value = value.split(',', 1)
+        if header.startswith('data:'):
+            mime = header[5:].split(';')[0] or default_mime
+    value = re.sub(r'\s+', '', value)
+    value += '=' * (-len(value) % 4)
+    try:
+        return base64.b64decode(value, validate=True), mime
+    except (binascii.Error, ValueError) as exc:
+        raise ValueError('invalid base64 payload') from exc
@@ -0,0 +1,142 @@
+"""
+Transparent compression for the large text columns in app/db/store.py
+(jobs.raw_text, cv_analyses.raw_text, kits.artifacts_json,
+stripe_events.raw_json, profiles.data_json).
+
+encode() turns a str into the value to store and decode() turns a stored
+value back into the str; values written before compression existed are
+plain text and pass through decode() unchanged. A compressed value is a
+marker, the dictionary version in decimal followed by ':', and a raw DEFLATE
+stream primed with a preset dictionary of the JSON keys and CV/job
+vocabulary these columns are full of, which is what makes short JSON
+documents compress at all. (The first values written carried the version as
+a single character or byte with no ':'; decode() still reads them.) On SQLite the
+value is stored as bytes (a BLOB in the TEXT column); Postgres TEXT cannot
+hold arbitrary bytes, so there it is base64 after the marker.
+
+DB_COMPRESS=0 stops compressing new writes (reads always decode).
+DB_COMPRESS_MIN_BYTES (default 256) leaves short values as plain text.
+"""
+import base64
+import os
+import zlib
+from typing import Dict, Optional, Tuple, Union
+
+ENABLED = os.getenv('DB_COMPRESS', '1').strip() != '0'
+_MIN_BYTES = int(os.getenv('DB_COMPRESS_MIN_BYTES', '256'))
+_LEVEL = 6
+
+# Never edit a dictionary once values have been written with it; add a new
+# version instead and point _CURRENT at it. zlib favours the end of the
+# dictionary, so the most common strings come last.
+_DICTIONARIES: Dict[int, bytes] = {
+    1: ''.join((
+        # Stripe events
+        '{"api_version": "2024-06-20", "livemode": false, "pending_webhooks": 1, "request": {"id": null, '
+        '"idempotency_key": null}, "object": "event", "type": "checkout.session.completed", '
+        '"data": {"object": {"object": "checkout.session", "amount_total": , "currency": "eur", '
+        '"customer": null, "customer_details": {"email": "", "name": "", "address": null}, '
+        '"client_reference_id": , "metadata": {"sub": "", "pack": "", "credits": ""}, '
+        '"mode": "payment", "payment_intent": "pi_", "payment_status": "paid", "status": "complete", '
+        '"created": , "id": "evt_", "cs_live_", "cs_test_", ',
+        # Job posts and CVs
+        'Responsibilities Requirements Qualifications Nice to have Benefits About the role About us '
+        'We are looking for a You will Experience Education Skills Summary Languages Certifications '
+        'Projects Bachelor Master University of years of experience with in the and the for the '
+        'to the of the team development management software engineering customer product design '
+        'data business Developed Managed Led Designed Implemented Improved Built Responsible for '
+        'Python JavaScript TypeScript React Node.js SQL AWS Docker Kubernetes Java Excel '
+        'Full-time Part-time Contract Remote Hybrid On-site Senior Junior Lead Manager Engineer ',
+        # Profiles (schemas/profile.v1.json) and jobs (schemas/job.v1.json)
+        '"profile_version": "1", "identity": {"full_name": "", "email": "", "phone": "", '
+        '"location": "", "links": {"linkedin": "https://www.linkedin.com/in/", '
+        '"github": "https://github.com/", "portfolio": "https://"}}, "headline": "", '
+        '"preferences": {"roles": [], "locations": [], "remote_ok": true, "industries": [], '
+        '"seniority": "", "cv_length": , "tone": ""}, "summary_facts": [{"text": "", "evidence": }], '
+        '"education": [{"institution": "", "degree": "", "field": "", "year": }], '
+        '"certifications": [], "languages": [], "no_invention": true, '
+        '"skills": {"hard": [], "soft": [], "stack": []}, "experience": [{"company": "", "title": "", '
+        '"start_date": "", "end_date": "", "highlights": [{"text": "", "metric": {"value": , '
+        '"unit": "%", "target": ""}, "confidence": }]}], '
+        '"source": {"type": "", "url": ""}, "parsed": {"employment_type": "", "responsibilities": [], '
+        '"requirements_must": [], "requirements_nice": [], "keywords": [], "work_mode": "", '
+        '"contract_type": "", "detected_country": ""}, ',
+        # Kit artifacts and CV analyses (app/services/ai_core.py)
+        '{"ats_notes": [], "ats_score": , "keyword_coverage_pct": , "missing_keywords": [], '
+        '"detected_skills": [], "sections_found": [], "format_flags": [], "word_count": , '
+        '"strengths": [], "weaknesses": [], "improvements": [], "recommendations": [], '
+        '"evidence_map": [{"requirement": "", "covered": true, "where": ""}], '
+        '"interview_pack": {"behavioral_questions": [], "technical_topics": [], "questions_to_ask": [], '
+        '"star_stories": [{"situation": "", "task": "", "action": "", "result": ""}]}, '
+        '"outreach_pack": {"cadence_days": [], "options": [{"channel": "", "subject": "", "body": ""}]}, '
+        '"cover_letter": {"subject": "", "body": ""}, '
+        '"cv": {"summary": "", "bullets": [], "sections": []}, "company_context": "", '
+        '"candidate_name": "", "title": "", "company": "", "location": "", "seniority": "", ',
+    )).encode('utf-8'),
+}
+_CURRENT = 1
+
+_MARKER = '\x1fZ'                   # never the start of plain JSON or CV text
+_BYTES_MARKER = _MARKER.encode('ascii')
+_MAX_VERSION_DIGITS = 6
+
+
+def _compress(data: bytes, version: int) -> bytes:
+    c = zlib.compressobj(_LEVEL, zlib.DEFLATED, -15, zdict=_DICTIONARIES[version])
+    return c.compress(data) + c.flush()
+
+
+def _decompress(payload: bytes, version: int) -> bytes:
+    d = zlib.decompressobj(-15, zdict=_DICTIONARIES[version])
+    return d.decompress(payload) + d.flush()
+
+
+def encode(text: Optional[str], binary: bool) -> Union[str, bytes, None]:
+    """Value to store for `text`: compressed when that saves space, else
+    `text` itself. `binary` selects the SQLite (bytes) or Postgres (base64
+    text) form."""
+    if text is None:
+        return None
+    data = text.encode('utf-8')
+    # Text that happens to begin with the marker is always wrapped, so
+    # decode() can never mistake it for a compressed value
+    literal = text.startswith(_MARKER)
+    if not literal and (not ENABLED or len(data) < _MIN_BYTES):
+        return text
+    payload = _compress(data, _CURRENT)
+    if binary:
+        value = _BYTES_MARKER + b'%d:' % _CURRENT + payload
+    else:
+        value = f'{_MARKER}{_CURRENT:d}:' + base64.b64encode(payload).decode('ascii')
+    if not literal and len(value) >= len(data):
+        return text
+    return value
+
+
+def _header(value: Union[str, bytes]) -> Tuple[int, int]:
+    """(dictionary version, offset of the payload) of a marked value."""
+    sep = b':' if isinstance(value, bytes) else ':'
+    end = value.find(sep, 3, 3 + _MAX_VERSION_DIGITS)
+    if end != -1 and value[2:end].isdigit():
+        return int(value[2:end]), end + 1
+    # Original form: one version byte, or one digit before the base64 (which
+    # has no ':'), so it can never look like the delimited field above
+    return (value[2] if isinstance(value, bytes) else int(value[2])), 3
+
+
+def decode(value: Union[str, bytes, memoryview, None]) -> Optional[str]:
+    """The text a stored value represents (plain text passes through)."""
+    if value is None:
+        return None
+    if isinstance(value, memoryview):
+        value = bytes(value)
+    if isinstance(value, bytes):
+        if value.startswith(_BYTES_MARKER):
+            version, start = _header(value)
+            return _decompress(value[start:], version).decode('utf-8')
+        return value.decode('utf-8')
+    if value.startswith(_MARKER):
+        version, start = _header(value)
+        return _decompress(base64.b64decode(value[start:]), version).decode('utf-8')
+    return value
+
@@ -0,0 +1,188 @@
+"""
+Versioned schema migrations for app/db/store.py.
+
+Migrations are numbered functions (see _MIGRATIONS at the bottom of the
+store) that receive an open connection. Applied versions are recorded in
+`schema_version`; startup reads the highest recorded version and does no
+schema work at all when it is already current.
+
+Only one process migrates at a time. On SQLite the migrator holds the
+database write lock (BEGIN IMMEDIATE) and applies every pending migration
+in that one transaction; on Postgres it takes a session advisory lock and
+runs each migration in its own transaction, except migrations marked
+`transactional=False`, which run in autocommit so they can build indexes
+with CREATE INDEX CONCURRENTLY (see create_index). Workers that lose the
+race wait for the lock, re-read the version and find nothing left to do.
+"""
+import logging
+import sqlite3
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from . import pg as _pg
+
+log = logging.getLogger(__name__)
+
+# Long enough for another worker to finish a backfill; the normal busy
+# timeout is tuned for request traffic, not DDL
+_LOCK_TIMEOUT_S = 600
+
+_VERSION_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at BIGINT NOT NULL
+)'''
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Any], None]   # called with the migration connection
+    transactional: bool = True     # False: Postgres autocommit (online index builds)
+
+
+def latest(migrations: Sequence[Migration]) -> int:
+    return max((m.version for m in migrations), default=0)
+
+
+def run_script(c, sql: str) -> None:
+    """Execute a multi-statement script without committing (unlike
+    sqlite3.executescript, which COMMITs first)."""
+    if isinstance(c, sqlite3.Connection):
+        buf = ''
+        for line in sql.splitlines(keepends=True):
+            buf += line
+            if sqlite3.complete_statement(buf):
+                c.execute(buf)
+                buf = ''
+        if buf.strip():
+            c.execute(buf)
+    else:
+        c.raw.execute(sql, prepare=False)
+
+
+def create_index(c, name: str, table: str, columns: str,
+                 where: Optional[str] = None, unique: bool = False) -> None:
+    """CREATE INDEX that does not block writers on Postgres.
+
+    Outside a transaction (a `transactional=False` migration) the index is
+    built CONCURRENTLY; an invalid leftover from an interrupted build is
+    dropped first. SQLite has no online build and creates it inline.
+    """
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    suffix = f' WHERE {where}' if where else ''
+    if isinstance(c, sqlite3.Connection) or c.in_transaction:
+        c.execute(f'CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns}){suffix}')
+        return
+    invalid = c.execute(
+        '''SELECT 1 FROM pg_index i JOIN pg_class x ON x.oid = i.indexrelid
+           WHERE x.relname = ? AND NOT i.indisvalid''', (name,)
+    ).fetchone()
+    if invalid:
+        c.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    c.execute(f'CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns}){suffix}')
+
+
+def drop_index(c, name: str) -> None:
+    """DROP INDEX counterpart of create_index() (CONCURRENTLY when it can)."""
+    if isinstance(c, sqlite3.Connection) or c.in_transaction:
+        c.execute(f'DROP INDEX IF EXISTS {name}')
+    else:
+        c.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def _recorded(c) -> int:
+    row = c.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def _record(c, m: Migration) -> None:
+    c.execute('INSERT INTO schema_version (version, name, applied_at) VALUES (?,?,?)',
+              (m.version, m.name, int(time.time())))
+
+
+def current_sqlite(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return _recorded(conn)
+    except sqlite3.OperationalError:   # no schema_version yet
+        return 0
+    finally:
+        conn.close()
+
+
+def upgrade_sqlite(path: str, migrations: Sequence[Migration]) -> List[int]:
+    """Apply pending migrations to the SQLite file at `path`; returns the versions applied."""
+    target = latest(migrations)
+    if current_sqlite(path) >= target:
+        return []
+    conn = sqlite3.connect(path, timeout=_LOCK_TIMEOUT_S, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(_VERSION_TABLE_SQL)
+            current = _recorded(conn)
+            applied = []
+            for m in sorted(migrations, key=lambda m: m.version):
+                if m.version <= current:
+                    continue
+                log.info('applying schema migration %d (%s)', m.version, m.name)
+                m.apply(conn)
+                _record(conn, m)
+                applied.append(m.version)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return applied
+    finally:
+        conn.close()
+
+
+def current_postgres() -> int:
+    with _pg.session() as c:
+        if not c.execute("SELECT to_regclass('schema_version') IS NOT NULL").fetchone()[0]:
+            return 0
+        return _recorded(c)
+
+
+def _pg_lock(c) -> None:
+    # Poll rather than block in pg_advisory_lock: a waiting statement holds a
+    # snapshot, and CREATE INDEX CONCURRENTLY in the lock holder would wait
+    # for it to finish — a deadlock.
+    deadline = time.monotonic() + _LOCK_TIMEOUT_S
+    while not c.execute('SELECT pg_try_advisory_lock(?)', (_pg.SCHEMA_LOCK_KEY,)).fetchone()[0]:
+        if time.monotonic() > deadline:
+            raise RuntimeError('timed out waiting for another process to finish schema migrations')
+        time.sleep(0.5)
+
+
+def upgrade_postgres(migrations: Sequence[Migration]) -> List[int]:
+    """Apply pending migrations on Postgres; returns the versions applied."""
+    target = latest(migrations)
+    if current_postgres() >= target:
+        return []
+    with _pg.dedicated() as c:
+        _pg_lock(c)
+        try:
+            c.execute(_VERSION_TABLE_SQL)
+            current = _recorded(c)
+            applied = []
+            for m in sorted(migrations, key=lambda m: m.version):
+                if m.version <= current:
+                    continue
+                log.info('applying schema migration %d (%s)', m.version, m.name)
+                if m.transactional:
+                    with c.raw.transaction():
+                        m.apply(c)
+                        _record(c, m)
+                else:
+                    m.apply(c)
+                    _record(c, m)
+                applied.append(m.version)
+            return applied
+        finally:
+            c.execute('SELECT pg_advisory_unlock(?)', (_pg.SCHEMA_LOCK_KEY,))
@@ -0,0 +1,219 @@
+"""
+PostgreSQL backend for app/db/store.py.
+
+Selected by init_db() when DATABASE_URL is postgresql://…  Store functions
+are written in the SQL dialect SQLite and Postgres share (`?` placeholders,
+ON CONFLICT, RETURNING); this module translates placeholders, hands out
+pooled connections that behave like the sqlite3 ones (`with conn:` commits
+or rolls back, rows index by name or position) and holds db/schema.sql, the
+baseline that app/db/migrate.py applies as migration 1.
+
+Tuning (env):
+  PG_POOL_MIN / PG_POOL_MAX   pool size per worker process (default 1 / 10)
+  PG_PREPARE_THRESHOLD        executions before a statement is prepared
+                              server-side (default 1; "off" for PgBouncer
+                              in transaction mode)
+  DATABASE_READ_URL           replica for session(readonly=True); defaults
+                              to DATABASE_URL. Either way those connections
+                              run with default_transaction_read_only=on
+"""
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / 'db' / 'schema.sql'
+
+# Arbitrary constant shared by every worker so only one applies DDL at a time
+SCHEMA_LOCK_KEY = 0x43465f5343484d41
+
+# One pool per kind: 'primary' (reads and writes) and 'read' (reporting)
+_POOLS: Dict[str, Any] = {}
+_POOL_PID: Optional[int] = None
+_URLS: Dict[str, Optional[str]] = {'primary': None, 'read': None}
+# Pools inherited across fork() share sockets with the parent; never close them
+_ORPHANED_POOLS: List[Any] = []
+_pool_lock = threading.Lock()
+_locals = {'primary': threading.local(), 'read': threading.local()}
+
+
+class Row(tuple):
+    """Result row indexable by position or column name, like sqlite3.Row."""
+
+    def __new__(cls, values: Sequence[Any], index: Dict[str, int]):
+        row = super().__new__(cls, values)
+        row._index = index
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def keys(self) -> List[str]:
+        return list(self._index)
+
+
+def _row_factory(cursor):
+    desc = cursor.description
+    index = {col.name: i for i, col in enumerate(desc or [])}
+
+    def make_row(values: Sequence[Any]) -> Row:
+        return Row(values, index)
+    return make_row
+
+
+@lru_cache(maxsize=1024)
+def _translate(sql: str) -> str:
+    """Rewrite sqlite-style `?` placeholders to psycopg `%s`."""
+    return sql.replace('%', '%%').replace('?', '%s')
+
+
+class Connection:
+    """Thin sqlite3.Connection look-alike over a pooled psycopg connection."""
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+
+    def execute(self, sql: str, params: Sequence[Any] = ()):
+        return self.raw.execute(_translate(sql), tuple(params))
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]):
+        cur = self.raw.cursor()
+        cur.executemany(_translate(sql), [tuple(p) for p in seq_of_params])
+        return cur
+
+    @property
+    def in_transaction(self) -> bool:
+        from psycopg.pq import TransactionStatus
+        return self.raw.info.transaction_status != TransactionStatus.IDLE
+
+    def commit(self) -> None:
+        self.raw.commit()
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+
+class _Session:
+    """Context manager returned by store._conn() on Postgres.
+
+    The outermost `with` on a thread checks a connection out of the pool and
+    commits (or rolls back) and returns it on exit; nested `with` blocks on
+    the same thread join that connection instead of taking a second one.
+    """
+
+    def __init__(self, kind: str = 'primary') -> None:
+        self.kind = kind
+
+    def __enter__(self) -> Connection:
+        local = _locals[self.kind]
+        depth = getattr(local, 'depth', 0)
+        if depth == 0:
+            local.conn = Connection(_pool(self.kind).getconn())
+        local.depth = depth + 1
+        return local.conn
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        local = _locals[self.kind]
+        local.depth -= 1
+        if local.depth:
+            return False
+        conn, local.conn = local.conn, None
+        try:
+            if exc_type is None:
+                conn.commit()
+            else:
+                conn.rollback()
+        finally:
+            _pool(self.kind).putconn(conn.raw)
+        return False
+
+
+def session(readonly: bool = False) -> _Session:
+    return _Session('read' if readonly else 'primary')
+
+
+def _prepare_threshold() -> Optional[int]:
+    raw = os.getenv('PG_PREPARE_THRESHOLD', '1').strip().lower()
+    return None if raw in ('off', 'none', '') else int(raw)
+
+
+def _make_pool(kind: str):
+    from psycopg_pool import ConnectionPool
+    kwargs = {
+        'autocommit': False,
+        'prepare_threshold': _prepare_threshold(),
+        'row_factory': _row_factory,
+    }
+    if kind == 'read':
+        kwargs['options'] = '-c default_transaction_read_only=on'
+    return ConnectionPool(
+        _URLS[kind] or _URLS['primary'],
+        min_size=int(os.getenv('PG_POOL_MIN', '1')),
+        max_size=int(os.getenv('PG_POOL_MAX', '10')),
+        kwargs=kwargs,
+        check=ConnectionPool.check_connection,
+        max_idle=300,
+        max_lifetime=3600,
+        open=True,
+        name='careerforge' if kind == 'primary' else f'careerforge-{kind}',
+    )
+
+
+def _pool(kind: str = 'primary'):
+    global _POOL_PID
+    pid = os.getpid()
+    pool = _POOLS.get(kind)
+    if pool is not None and _POOL_PID == pid:
+        return pool
+    with _pool_lock:
+        if _POOL_PID != pid:
+            _ORPHANED_POOLS.extend(_POOLS.values())
+            _POOLS.clear()
+            _POOL_PID = pid
+        if kind not in _POOLS:
+            _POOLS[kind] = _make_pool(kind)
+    return _POOLS[kind]
+
+
+def init(database_url: str, read_url: Optional[str] = None) -> None:
+    """Point the (lazily opened) pools at `database_url` and, for
+    read-only sessions, `read_url` (defaults to the primary)."""
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError(
+            'DATABASE_URL is postgresql:// but psycopg is not installed. '
+            'pip install "psycopg[binary]" psycopg-pool'
+        ) from exc
+
+    if _POOL_PID == os.getpid():
+        for pool in _POOLS.values():
+            pool.close()
+    else:
+        _ORPHANED_POOLS.extend(_POOLS.values())
+    _POOLS.clear()
+    _URLS['primary'] = database_url
+    _URLS['read'] = read_url
+
+
+@contextmanager
+def dedicated():
+    """A pooled connection in autocommit mode, held for the whole block.
+
+    Used by the migrator: session advisory locks and CREATE INDEX
+    CONCURRENTLY need a connection that is not inside a transaction.
+    """
+    raw = _pool().getconn()
+    try:
+        raw.autocommit = True
+        yield Connection(raw)
+    finally:
+        try:
+            raw.autocommit = False
+        finally:
+            _pool().putconn(raw)
@@ -0,0 +1,213 @@
+"""
+Per-statement timing for app/db/store.py.
+
+Off by default. With DB_QUERY_STATS=1, store._conn() / _read_conn() hand
+out connections whose execute()/executemany() are timed and attributed to
+the store function that issued them (the outermost app.db.store frame, so
+helpers such as _count() are reported under save_kit etc.). Per worker
+process it keeps, for each (function, statement) pair, a count, total time,
+rows and a window of recent durations for p50/p95/p99.
+
+DB_SLOW_QUERY_MS (default 0 = off) logs statements slower than the
+threshold with their plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on
+Postgres) and keeps the latest ones for snapshot().
+
+execute() time covers running the statement; on SQLite, rows after the
+first are produced while fetching, which is reported separately as fetch_ms.
+"""
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+ENABLED = os.getenv('DB_QUERY_STATS', '0').strip() == '1'
+_SLOW_MS = float(os.getenv('DB_SLOW_QUERY_MS', '0'))
+_WINDOW = 1024          # durations kept per statement for percentiles
+_SLOW_KEEP = 50         # slow statements kept for snapshot()
+_STORE_MODULE = 'app.db.store'
+
+_lock = threading.Lock()
+_slow: Deque[Dict[str, Any]] = deque(maxlen=_SLOW_KEEP)
+_WS_RE = re.compile(r'\s+')
+
+
+class _Stat:
+    __slots__ = ('count', 'total_ms', 'fetch_ms', 'rows', 'durations')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.fetch_ms = 0.0
+        self.rows = 0
+        self.durations: Deque[float] = deque(maxlen=_WINDOW)
+
+
+_stats: Dict[Tuple[str, str], _Stat] = {}
+
+
+@lru_cache(maxsize=2048)
+def _shape(sql: str) -> str:
+    return _WS_RE.sub(' ', sql).strip()
+
+
+def _caller() -> str:
+    """Name of the outermost store function on the stack."""
+    frame = sys._getframe(2)
+    name = '?'
+    while frame is not None:
+        if frame.f_globals.get('__name__') == _STORE_MODULE:
+            name = frame.f_code.co_name
+        elif name != '?':
+            break
+        frame = frame.f_back
+    return name
+
+
+def _stat(key: Tuple[str, str]) -> _Stat:
+    stat = _stats.get(key)
+    if stat is None:
+        with _lock:
+            stat = _stats.setdefault(key, _Stat())
+    return stat
+
+
+def _explain(conn, sql: str, params) -> List[str]:
+    try:
+        if isinstance(conn, sqlite3.Connection):
+            return [r[3] for r in conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+        # Savepoint, so a statement EXPLAIN rejects can't abort the caller's transaction
+        with conn.raw.transaction():
+            return [r[0] for r in conn.execute('EXPLAIN ' + sql, params).fetchall()]
+    except Exception as exc:
+        return [f'(no plan: {exc})']
+
+
+class _TimedCursor:
+    def __init__(self, cursor, stat: _Stat) -> None:
+        self._cursor = cursor
+        self._stat = stat
+
+    def _fetched(self, started: float, rows: int) -> None:
+        self._stat.fetch_ms += (time.perf_counter() - started) * 1000
+        self._stat.rows += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchmany(self, size: Optional[int] = None):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    def __init__(self, conn) -> None:
+        self._conn = conn
+
+    def _run(self, method: str, sql: str, params):
+        key = (_caller(), _shape(sql))
+        stat = _stat(key)
+        started = time.perf_counter()
+        cursor = getattr(self._conn, method)(sql, params)
+        elapsed = (time.perf_counter() - started) * 1000
+        stat.count += 1
+        stat.total_ms += elapsed
+        stat.durations.append(elapsed)
+        if method == 'executemany' or not (cursor.description or ()):
+            stat.rows += max(cursor.rowcount, 0)
+        if _SLOW_MS and elapsed >= _SLOW_MS:
+            plan = _explain(self._conn, sql, params) if method == 'execute' else []
+            log.warning('slow query %.1f ms in %s: %s\n  %s', elapsed, key[0], key[1][:500], '\n  '.join(plan))
+            _slow.append({'function': key[0], 'sql': key[1][:500], 'ms': round(elapsed, 2),
+                          'plan': plan, 'at': int(time.time())})
+        return _TimedCursor(cursor, stat)
+
+    def execute(self, sql: str, params: Sequence[Any] = ()):
+        return self._run('execute', sql, params)
+
+    def executemany(self, sql: str, seq_of_params):
+        return self._run('executemany', sql, list(seq_of_params))
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+class _TimedScope:
+    """Wraps whatever store._conn() returned; `with` yields a timed connection."""
+
+    def __init__(self, scope) -> None:
+        self._scope = scope
+
+    def __enter__(self) -> _TimedConnection:
+        return _TimedConnection(self._scope.__enter__())
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._scope.__exit__(exc_type, exc, tb)
+
+
+def wrap(scope):
+    return _TimedScope(scope)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def snapshot(top: int = 50) -> Dict[str, Any]:
+    """Statements by total time, slowest first, plus recent slow queries."""
+    with _lock:
+        items = list(_stats.items())
+    queries = []
+    for (function, sql), s in items:
+        ordered = sorted(s.durations)
+        queries.append({
+            'function': function,
+            'sql': sql[:500],
+            'count': s.count,
+            'total_ms': round(s.total_ms, 2),
+            'fetch_ms': round(s.fetch_ms, 2),
+            'rows': s.rows,
+            'p50_ms': round(_percentile(ordered, 0.50), 3),
+            'p95_ms': round(_percentile(ordered, 0.95), 3),
+            'p99_ms': round(_percentile(ordered, 0.99), 3),
+        })
+    queries.sort(key=lambda q: q['total_ms'], reverse=True)
+    return {
+        'enabled': ENABLED,
+        'pid': os.getpid(),
+        'slow_query_ms': _SLOW_MS or None,
+        'queries': queries[:top],
+        'slow_queries': list(_slow),
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+        _slow.clear()
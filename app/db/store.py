@@ -1,16 +1,69 @@
+import atexit
+import os
+import queue
+import logging
+import random
 import sqlite3
 import json
+import threading
 import time
 import uuid
 import datetime
-from urllib.parse import urlparse
-from typing import Optional, Dict, Any, List
+from collections import OrderedDict
+from urllib.parse import quote, urlparse
+from typing import Optional, Dict, Any, Callable, Iterator, List, Tuple
 
-_DB_PATH: Optional[str] = None
+from flask import g, has_request_context
 
-_SCHEMA_SQL = """
-PRAGMA journal_mode=WAL;
+from . import audit_archive as _audit_archive
+from . import blobs as _blobs
+from . import codec as _codec
+from . import migrate as _migrate
+from . import pg as _pg
+from . import querystats as _querystats
+from ..utils import pwhash as _pwhash
+
+log = logging.getLogger(__name__)
 
+_DB_PATH: Optional[str] = None
+# 'sqlite' (default, single host) or 'postgres' (DATABASE_URL=postgresql://…)
+_BACKEND = 'sqlite'
+
+# Connection manager — one long-lived connection per worker thread (gthread).
+# Bumped by init_db() so handles opened against a previous path are dropped.
+_DB_GENERATION = 0
+_local = threading.local()
+# Separate per-thread read-only handles for reporting (see _read_conn)
+_read_local = threading.local()
+
+_STATEMENT_CACHE_SIZE = int(os.getenv('SQLITE_STATEMENT_CACHE', '512'))
+# Set DB_MIGRATE_ON_BOOT=0 to run `flask db migrate` as a separate release step
+_MIGRATE_ON_BOOT = os.getenv('DB_MIGRATE_ON_BOOT', '1').strip() != '0'
+_BUSY_TIMEOUT_S = float(os.getenv('SQLITE_BUSY_TIMEOUT_S', '5'))
+_CONN_MAX_AGE_S = int(os.getenv('SQLITE_CONN_MAX_AGE_S', '3600'))
+_CONN_PING_IDLE_S = 60
+
+# Handles inherited across fork() must never be used or closed by the child
+# (SQLite forbids it); they are parked here so GC does not close them either.
+_ORPHANED_CONNS: List[sqlite3.Connection] = []
+
+# Blob metadata columns on verification_sessions (the *_b64 columns they
+# replace are kept, emptied, for databases created before the blob store)
+_SESSION_DOCS = {'front': 'doc_front', 'back': 'doc_back', 'video': 'video'}
+_SESSION_BLOB_COLUMNS = {
+    f'{prefix}_{suffix}': kind
+    for prefix in _SESSION_DOCS.values()
+    for suffix, kind in (('sha256', 'TEXT'), ('size', 'INTEGER'), ('mime', 'TEXT'))
+}
+
+# Credit holds not committed within this window are released back to the user
+_HOLD_TTL_S = int(os.getenv('CREDIT_HOLD_TTL_S', '300'))
+_HOLD_SWEEP_INTERVAL_S = 60
+_last_hold_sweep = 0.0
+
+# Baseline schema (migration 1). Later changes are numbered migrations at the
+# bottom of this module; don't edit tables here.
+_SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS auth_accounts (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     sub TEXT UNIQUE NOT NULL,
@@ -71,6 +124,30 @@ CREATE TABLE IF NOT EXISTS credit_ledger (
 
 CREATE INDEX IF NOT EXISTS credit_ledger_sub_time_idx ON credit_ledger(sub, created_at DESC);
 
+-- Materialised SUM(credit_ledger.delta) per user, maintained by add_credits()
+CREATE TABLE IF NOT EXISTS credit_balances (
+    sub TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL
+);
+
+-- Credits reserved by in-flight paid requests: debited from credit_balances
+-- on reserve, written to credit_ledger only when the hold is committed
+CREATE TABLE IF NOT EXISTS credit_holds (
+    id TEXT PRIMARY KEY,
+    sub TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    ref_type TEXT,
+    ref_id TEXT,
+    status TEXT NOT NULL DEFAULT 'held',
+    created_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL,
+    settled_at INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS credit_holds_status_exp_idx ON credit_holds(status, expires_at);
+
 CREATE TABLE IF NOT EXISTS kits (
     id TEXT PRIMARY KEY,
     sub TEXT NOT NULL,
@@ -166,9 +243,20 @@ CREATE TABLE IF NOT EXISTS candidate_visibility (
     desired_roles_json TEXT,
     desired_locations_json TEXT,
     keywords_json TEXT,
+    latest_ats INTEGER,
     updated_at INTEGER NOT NULL
 );
 
+-- Recruiter listing order for keyset pagination (see search_candidates)
+CREATE INDEX IF NOT EXISTS candidate_visibility_rank_idx
+    ON candidate_visibility(COALESCE(latest_ats, -1) DESC, sub) WHERE visible = 1;
+
+-- Recruiter search index over visible candidates (rowid = users.id),
+-- maintained by _index_candidate(); trigram tokens give substring matching
+CREATE VIRTUAL TABLE IF NOT EXISTS candidate_search USING fts5(
+    roles, keywords, title, skills, locations, tokenize='trigram'
+);
+
 -- Identity verification sessions (tri-channel: agent → AI → manager)
 CREATE TABLE IF NOT EXISTS verification_sessions (
     id TEXT PRIMARY KEY,
@@ -182,6 +270,15 @@ CREATE TABLE IF NOT EXISTS verification_sessions (
     doc_back_b64 TEXT,
     video_b64 TEXT,
     video_duration_s REAL,
+    doc_front_sha256 TEXT,
+    doc_front_size INTEGER,
+    doc_front_mime TEXT,
+    doc_back_sha256 TEXT,
+    doc_back_size INTEGER,
+    doc_back_mime TEXT,
+    video_sha256 TEXT,
+    video_size INTEGER,
+    video_mime TEXT,
     manager_decision TEXT,
     manager_note TEXT,
     manager_sub TEXT,
@@ -194,6 +291,31 @@ CREATE TABLE IF NOT EXISTS verification_sessions (
 CREATE INDEX IF NOT EXISTS vsess_sub_idx ON verification_sessions(sub, created_at DESC);
 CREATE INDEX IF NOT EXISTS vsess_status_idx ON verification_sessions(status);
 
+-- Files in the content-addressed blob store (app/db/blobs.py); a blob is
+-- deleted once no row references it
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mime TEXT,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at INTEGER NOT NULL
+);
+
+-- Chunked, resumable document uploads; bytes are staged under
+-- BLOB_STORE_DIR/uploads/<id>.part until finalised into the blob store
+CREATE TABLE IF NOT EXISTS verification_uploads (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    sub TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mime TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open',
+    sha256 TEXT,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
 -- Anti-bot psychology test results
 CREATE TABLE IF NOT EXISTS psychology_tests (
     id TEXT PRIMARY KEY,
@@ -222,63 +344,334 @@ CREATE TABLE IF NOT EXISTS guarantee_requests (
 
 
 def init_db(database_url: str) -> None:
-    global _DB_PATH
+    global _DB_PATH, _DB_GENERATION, _BACKEND
     u = urlparse(database_url)
-    if u.scheme != 'sqlite':
-        raise RuntimeError('MVP template supports sqlite only. Set DATABASE_URL=sqlite:///careerforge.db')
-    path = (u.path or '').lstrip('/')
-    if not path:
-        path = 'careerforge.db'
-    _DB_PATH = path
-
-    conn = sqlite3.connect(_DB_PATH)
+    _seen_users.clear()
+    if u.scheme in ('postgres', 'postgresql'):
+        _BACKEND = 'postgres'
+        _pg.init(database_url, os.getenv('DATABASE_READ_URL') or None)
+    elif u.scheme == 'sqlite':
+        _BACKEND = 'sqlite'
+        path = (u.path or '').lstrip('/')
+        if not path:
+            path = 'careerforge.db'
+        _DB_PATH = path
+        _DB_GENERATION += 1
+    else:
+        raise RuntimeError(f"Unsupported DATABASE_URL scheme '{u.scheme}'. Use sqlite:/// or postgresql://")
+
+    if _MIGRATE_ON_BOOT:
+        migrate_schema()
+    if _AUDIT_ARCHIVE_INTERVAL_S > 0 and _AUDIT_RETENTION_DAYS > 0:
+        _audit_archiver.start()
+
+
+def _ensure_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> List[str]:
+    """ALTER TABLE ADD COLUMN for each missing column of an existing table."""
+    have = {r[1] for r in conn.execute(f'PRAGMA table_info({table})')}
+    if not have:
+        return []
+    added = [name for name in columns if name not in have]
+    for name in added:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {columns[name]}')
+    return added
+
+
+def _open_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(_DB_PATH, timeout=_BUSY_TIMEOUT_S,
+                           cached_statements=_STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _open_read_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(f'file:{quote(os.path.abspath(_DB_PATH))}?mode=ro', uri=True,
+                           timeout=_BUSY_TIMEOUT_S, cached_statements=_STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA query_only = ON')
+    return conn
+
+
+def _discard_conn(local: threading.local = _local) -> None:
+    conn = getattr(local, 'conn', None)
+    local.conn = None
+    if conn is None:
+        return
+    if local.pid != os.getpid():
+        _ORPHANED_CONNS.append(conn)
+        return
     try:
-        conn.executescript(_SCHEMA_SQL)
-        conn.commit()
-    finally:
         conn.close()
+    except sqlite3.Error:
+        pass
+
 
+def _conn_healthy(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute('SELECT 1').fetchone()
+        return True
+    except sqlite3.Error:
+        return False
 
-def _conn() -> sqlite3.Connection:
+
+def _thread_conn(local: threading.local = _local,
+                 opener: Callable[[], sqlite3.Connection] = _open_conn) -> sqlite3.Connection:
+    """Return this thread's pooled connection, opening or recycling it as needed."""
     if not _DB_PATH:
         raise RuntimeError('DB not initialized')
-    conn = sqlite3.connect(_DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    now = time.monotonic()
+    conn = getattr(local, 'conn', None)
+    if conn is not None:
+        stale = (
+            local.pid != os.getpid()
+            or local.generation != _DB_GENERATION
+            or now - local.opened_at > _CONN_MAX_AGE_S
+        )
+        if not stale and now - local.last_used > _CONN_PING_IDLE_S and not conn.in_transaction:
+            stale = not _conn_healthy(conn)
+        if stale:
+            _discard_conn(local)
+            conn = None
+    if conn is None:
+        conn = opener()
+        local.conn = conn
+        local.pid = os.getpid()
+        local.generation = _DB_GENERATION
+        local.opened_at = now
+    local.last_used = now
     return conn
 
 
-def _iso(ts: int) -> str:
-    return datetime.datetime.utcfromtimestamp(ts).strftime('%Y-%m-%dT%H:%M:%SZ')
+def _conn():
+    """Return a transaction scope for `with _conn() as c:`.
+
+    Inside a Flask request the block joins the request's unit of work (one
+    connection, committed once when the response is ready). Elsewhere it is
+    this thread's pooled sqlite3 connection, which commits or rolls back on
+    exit and must never be closed, or on Postgres a connection checked out
+    of the psycopg pool (see app/db/pg.py). With DB_QUERY_STATS=1 each
+    statement is timed (see app/db/querystats.py).
+    """
+    unit = _request_unit()
+    if unit is not None:
+        scope = _JoinedUnit(unit)
+    elif _BACKEND == 'postgres':
+        scope = _pg.session()
+    else:
+        scope = _thread_conn()
+    return _querystats.wrap(scope) if _querystats.ENABLED else scope
+
+
+def _read_conn():
+    """Like _conn(), but read-only and outside the request's unit of work.
+
+    For reporting scans that must not hold locks or snapshots the write path
+    needs: a `mode=ro`, `query_only` SQLite handle per thread, or on Postgres
+    a read-only session against DATABASE_READ_URL (a replica) when set.
+    Reads see committed data only — not the current request's own writes —
+    and a replica may lag the primary slightly.
+    """
+    if _BACKEND == 'postgres':
+        scope = _pg.session(readonly=True)
+    else:
+        scope = _thread_conn(_read_local, _open_read_conn)
+    return _querystats.wrap(scope) if _querystats.ENABLED else scope
 
 
 # ---------------------------------------------------------------------------
-# Auth accounts (CareerForge native login)
+# Request unit of work
 # ---------------------------------------------------------------------------
 
-import hashlib
-import secrets as _secrets
+# Set by install_unit_of_work(); scripts and the CLI keep per-call transactions.
+_UOW_ENABLED = False
+
+
+class _UnitOfWork:
+    """One connection and one transaction shared by every store call in a request.
+
+    A store call that raises marks the unit failed, so the whole request rolls
+    back rather than committing half of it. Callbacks registered with
+    _after_commit() run once the writes before them are committed; those
+    registered with _on_rollback() run after a rollback, each in its own
+    transaction.
+
+    On Postgres the connection is checked out of the pool on the first store
+    call and handed back at each commit_point(), so a request waiting on a
+    slow outbound call does not hold a pool slot; the next store call checks
+    one out again.
+    """
+
+    def __init__(self) -> None:
+        self._session = None
+        self.conn = None if _BACKEND == 'postgres' else _thread_conn()
+        self.joined = 0     # `with _conn()` blocks currently using the connection
+        self.failed = False
+        self.commit_hooks: List[Callable[[], None]] = []
+        self.rollback_hooks: List[Callable[[], None]] = []
+
+    def connection(self):
+        if self.conn is None:
+            self._session = _pg.session()
+            self.conn = self._session.__enter__()
+        return self.conn
+
+    def release(self) -> None:
+        """Return a committed Postgres connection to the pool (no-op on SQLite)."""
+        session, self._session = self._session, None
+        if session is not None:
+            self.conn = None
+            session.__exit__(None, None, None)
+
+    def commit(self) -> None:
+        if self.conn is not None and self.conn.in_transaction:
+            self.conn.commit()
+        hooks, self.commit_hooks = self.commit_hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception:
+                log.exception('commit hook %r failed', hook)
+
+    def finish(self, commit: bool) -> None:
+        committed = False
+        try:
+            if commit:
+                self.commit()
+                committed = True
+        finally:
+            if not committed and self.conn is not None:
+                try:
+                    self.conn.rollback()
+                except Exception:
+                    log.exception('request rollback failed')
+            self.release()
+        if not committed:
+            for hook in self.rollback_hooks:
+                try:
+                    hook()
+                except Exception:
+                    log.exception('rollback hook %r failed', hook)
+
+
+class _JoinedUnit:
+    def __init__(self, unit: _UnitOfWork) -> None:
+        self._unit = unit
+
+    def __enter__(self):
+        conn = self._unit.connection()
+        self._unit.joined += 1
+        return conn
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._unit.joined -= 1
+        if exc_type is not None:
+            self._unit.failed = True
+        return False
+
+
+def _request_unit() -> Optional[_UnitOfWork]:
+    """The current request's unit, opened on first use; None outside a request
+    or once it has been finished."""
+    if not (_UOW_ENABLED and has_request_context()):
+        return None
+    if '_store_unit' not in g:
+        g._store_unit = _UnitOfWork()
+    return g._store_unit
+
+
+def _finish_request_unit(commit: bool) -> None:
+    unit = g.get('_store_unit')
+    g._store_unit = None
+    if unit is not None:
+        unit.finish(commit and not unit.failed)
+
+
+def _after_commit(hook: Callable[[], None]) -> None:
+    """Run `hook` once the current writes are committed (immediately outside a request)."""
+    unit = _request_unit()
+    if unit is None:
+        hook()
+    else:
+        unit.commit_hooks.append(hook)
+
+
+def _on_rollback(hook: Callable[[], None]) -> None:
+    """Run `hook` if the current request's unit of work ends up rolled back."""
+    unit = _request_unit()
+    if unit is not None:
+        unit.rollback_hooks.append(hook)
+
+
+def commit_point() -> None:
+    """Commit what the current request has written so far.
 
+    Called before slow outbound calls (AI core, chain, Stripe) so no
+    transaction, SQLite write lock or Postgres pool connection is held while
+    waiting on the network. A no-op outside a request.
+    """
+    unit = _request_unit()
+    if unit is not None and not unit.failed:
+        unit.commit()
+        if not unit.joined:
+            unit.release()
 
-def _hash_password(password: str, salt: str) -> str:
-    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 260_000).hex()
 
+def install_unit_of_work(app) -> None:
+    """Give every request of `app` a single store transaction.
+
+    It is committed in after_request (a failed commit becomes a 500), unless
+    the response is a 5xx — which includes unhandled exceptions — in which
+    case it is rolled back. teardown_request rolls back anything left open.
+    """
+    global _UOW_ENABLED
+    _UOW_ENABLED = True
+
+    @app.after_request
+    def _commit_store_unit(response):
+        _finish_request_unit(commit=response.status_code < 500)
+        return response
+
+    @app.teardown_request
+    def _close_store_unit(exc):
+        _finish_request_unit(commit=False)
+
+
+def _iso(ts: int) -> str:
+    return datetime.datetime.utcfromtimestamp(ts).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _pack(text: Optional[str]):
+    """Stored form of a large text column value (see app/db/codec.py)."""
+    return _codec.encode(text, binary=_BACKEND != 'postgres')
+
+
+def _unpack(value) -> Optional[str]:
+    return _codec.decode(value)
+
+
+# ---------------------------------------------------------------------------
+# Auth accounts (CareerForge native login)
+# ---------------------------------------------------------------------------
+
+# Password hashes go through app/utils/pwhash.py (bounded pool, self-describing
+# format); both raise pwhash.Saturated when the pool is full.
 
 def create_account(email: str, password: str, full_name: str = '') -> Optional[Dict]:
     """Create a new auth account. Returns account dict or None if email taken."""
     now = int(time.time())
     sub = 'cf_' + uuid.uuid4().hex
-    salt = _secrets.token_hex(16)
-    pw_hash = f"{salt}:{_hash_password(password, salt)}"
+    pw_hash = _pwhash.make(password)
     with _conn() as c:
-        try:
-            c.execute(
-                'INSERT INTO auth_accounts (sub, email, password_hash, full_name, created_at) VALUES (?,?,?,?,?)',
-                (sub, email.lower().strip(), pw_hash, full_name, now)
-            )
-            return {'sub': sub, 'email': email.lower().strip(), 'full_name': full_name}
-        except sqlite3.IntegrityError:
-            return None
+        rows = c.execute(
+            '''INSERT INTO auth_accounts (sub, email, password_hash, full_name, created_at) VALUES (?,?,?,?,?)
+               ON CONFLICT DO NOTHING
+               RETURNING sub''',
+            (sub, email.lower().strip(), pw_hash, full_name, now)
+        ).fetchall()
+    if not rows:
+        return None
+    return {'sub': sub, 'email': email.lower().strip(), 'full_name': full_name}
 
 
 def verify_account(email: str, password: str) -> Optional[Dict]:
@@ -290,10 +683,22 @@ def verify_account(email: str, password: str) -> Optional[Dict]:
         ).fetchone()
     if not row:
         return None
-    stored = row['password_hash']
-    salt, expected = stored.split(':', 1)
-    if not _secrets.compare_digest(_hash_password(password, salt), expected):
+    ok, outdated = _pwhash.check(password, row['password_hash'])
+    if not ok:
         return None
+    new_hash = None
+    if outdated:
+        # Upgrade to the current parameters while we have the password;
+        # a busy pool just leaves it for the next login
+        try:
+            new_hash = _pwhash.make(password)
+        except _pwhash.Saturated:
+            pass
+    with _conn() as c:
+        if new_hash:
+            c.execute('UPDATE auth_accounts SET password_hash=? WHERE sub=? AND password_hash=?',
+                      (new_hash, row['sub'], row['password_hash']))
+        _touch_activity(c, row['sub'], int(time.time()), last_login_at=True)
     return {'sub': row['sub'], 'email': row['email'], 'full_name': row['full_name']}
 
 
@@ -309,17 +714,239 @@ def get_account_by_sub(sub: str) -> Optional[Dict]:
 # Users
 # ---------------------------------------------------------------------------
 
+# Per-worker LRU of users rows known to match the token claims, so the
+# upsert below (and its write lock) only runs when the claims change. Store
+# functions that modify users rows evict the entry; the TTL bounds staleness
+# from writes made by other workers.
+_USER_CACHE_TTL_S = int(os.getenv('USER_CACHE_TTL_S', '300'))
+_USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+
+
+class _SeenUsers:
+    def __init__(self, maxsize: int, ttl_s: float) -> None:
+        self._maxsize = maxsize
+        self._ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+
+    def matches(self, sub: str, claims: tuple) -> bool:
+        with self._lock:
+            entry = self._entries.get(sub)
+            if entry is None:
+                return False
+            cached, expires = entry
+            if expires < time.monotonic():
+                del self._entries[sub]
+                return False
+            self._entries.move_to_end(sub)
+            return cached == claims
+
+    def put(self, sub: str, claims: tuple) -> None:
+        with self._lock:
+            self._entries[sub] = (claims, time.monotonic() + self._ttl_s)
+            self._entries.move_to_end(sub)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, sub: str) -> None:
+        with self._lock:
+            self._entries.pop(sub, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_seen_users = _SeenUsers(_USER_CACHE_SIZE, _USER_CACHE_TTL_S)
+
+
 def upsert_user(sub: str, email: Optional[str], tenant_id: Optional[str], verifyid_verified: bool) -> None:
+    claims = (email, tenant_id, 1 if verifyid_verified else 0)
+    if _USER_CACHE_TTL_S > 0 and _seen_users.matches(sub, claims):
+        return
     now = int(time.time())
     with _conn() as c:
-        c.execute('''
-        INSERT INTO users (sub, email, tenant_id, verifyid_verified, created_at)
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(sub) DO UPDATE SET
-            email=excluded.email,
-            tenant_id=excluded.tenant_id,
-            verifyid_verified=excluded.verifyid_verified
-        ''', (sub, email, tenant_id, 1 if verifyid_verified else 0, now))
+        created = c.execute('''
+        INSERT INTO users (sub, email, tenant_id, verifyid_verified, verified_at, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(sub) DO NOTHING
+        RETURNING id
+        ''', (sub, email, tenant_id, claims[2], now if claims[2] else None, now)).fetchall()
+        if created:
+            _count(c, now, users=1, verified_users=claims[2])
+            _touch_activity(c, sub, now)
+        else:
+            # Conditional update so a verification flip is counted exactly once
+            flipped = c.execute(
+                'UPDATE users SET email=?, tenant_id=?, verifyid_verified=?, verified_at=? '
+                'WHERE sub=? AND COALESCE(verifyid_verified, 0) <> ?',
+                (email, tenant_id, claims[2], now if claims[2] else None, sub, claims[2])
+            ).rowcount
+            if flipped:
+                _count(c, now, verified_users=1 if claims[2] else -1)
+            else:
+                c.execute('UPDATE users SET email=?, tenant_id=? WHERE sub=?', (email, tenant_id, sub))
+    if _USER_CACHE_TTL_S > 0:
+        # Only remember rows that actually got committed
+        _after_commit(lambda: _seen_users.put(sub, claims))
+
+
+def mark_user_verified(sub: str) -> None:
+    now = int(time.time())
+    with _conn() as c:
+        if c.execute(
+            'UPDATE users SET verifyid_verified=1, verified_at=? WHERE sub=? AND COALESCE(verifyid_verified, 0) <> 1',
+            (now, sub)
+        ).rowcount:
+            _count(c, now, verified_users=1)
+    _seen_users.evict(sub)
+
+
+# ---------------------------------------------------------------------------
+# Platform counters (n8n stats)
+# ---------------------------------------------------------------------------
+# Each write that changes one of these counts adds its delta to the bucket for
+# the UTC day it happened, in the same transaction, so totals and time series
+# are sums over a few rows per day instead of COUNT(*) over the source tables.
+# Verification and visibility are counted on the day they were switched on
+# (users.verified_at, candidate_visibility.visible_since).
+_COUNTER_METRICS = ('users', 'verified_users', 'kits', 'cv_analyses', 'visible_candidates')
+
+
+def _count(c, ts: int, **deltas: int) -> None:
+    for metric, delta in deltas.items():
+        if delta:
+            c.execute(
+                '''INSERT INTO platform_counters (day, metric, delta) VALUES (?,?,?)
+                   ON CONFLICT(day, metric) DO UPDATE SET delta = platform_counters.delta + excluded.delta''',
+                (ts // 86400, metric, delta)
+            )
+
+
+def get_platform_counters(days: int = 7) -> Dict[str, Any]:
+    """Return {'totals': {metric: n}, 'series': [{'date', metric: n, ...}]}
+    with one series entry per UTC day for the last `days` days, oldest first."""
+    today = int(time.time()) // 86400
+    first = today - max(days, 1) + 1
+    with _read_conn() as c:
+        totals = dict.fromkeys(_COUNTER_METRICS, 0)
+        for r in c.execute('SELECT metric, SUM(delta) FROM platform_counters GROUP BY metric').fetchall():
+            if r[0] in totals:
+                totals[r[0]] = int(r[1] or 0)
+        by_day: Dict[int, Dict[str, int]] = {}
+        for r in c.execute(
+            'SELECT day, metric, delta FROM platform_counters WHERE day >= ?', (first,)
+        ).fetchall():
+            by_day.setdefault(r['day'], {})[r['metric']] = r['delta']
+    series = []
+    for day in range(first, today + 1):
+        counts = by_day.get(day, {})
+        series.append({
+            'date': datetime.datetime.fromtimestamp(day * 86400, datetime.timezone.utc).strftime('%Y-%m-%d'),
+            **{m: counts.get(m, 0) for m in _COUNTER_METRICS},
+        })
+    return {'totals': totals, 'series': series}
+
+
+def rebuild_platform_counters() -> int:
+    """Recompute every day bucket from the source tables. Returns rows written.
+
+    Rows are bucketed by the same timestamps as the live counts, so the
+    series is unchanged except where the current state no longer records an
+    event: a verification or opt-in that was later switched off, and the
+    opt-ins of deleted users, drop out of both the day they happened and the
+    day they were undone. Totals always match.
+    """
+    with _conn() as c:
+        return _rebuild_platform_counters(c)
+
+
+def _rebuild_platform_counters(c) -> int:
+    c.execute('DELETE FROM platform_counters')
+    cur = c.execute(
+        '''INSERT INTO platform_counters (day, metric, delta)
+           SELECT created_at / 86400, 'users', COUNT(*) FROM users GROUP BY created_at / 86400
+           UNION ALL
+           SELECT COALESCE(verified_at, created_at) / 86400, 'verified_users', COUNT(*) FROM users
+            WHERE verifyid_verified = 1 GROUP BY COALESCE(verified_at, created_at) / 86400
+           UNION ALL
+           SELECT created_at / 86400, 'kits', COUNT(*) FROM kits GROUP BY created_at / 86400
+           UNION ALL
+           SELECT created_at / 86400, 'cv_analyses', COUNT(*) FROM cv_analyses GROUP BY created_at / 86400
+           UNION ALL
+           SELECT COALESCE(visible_since, updated_at) / 86400, 'visible_candidates', COUNT(*)
+             FROM candidate_visibility
+            WHERE visible = 1 GROUP BY COALESCE(visible_since, updated_at) / 86400'''
+    )
+    return cur.rowcount
+
+
+# ---------------------------------------------------------------------------
+# User activity summary
+# ---------------------------------------------------------------------------
+# One row per user, kept current by the writes below, so inactivity and
+# guarantee checks read a row (or an index range) instead of aggregating kits.
+# created_at is the user's first-seen time; COALESCE(last_kit_at, created_at)
+# is "idle since" for the inactive-user scan.
+
+def _touch_activity(c, sub: str, now: int, kit: bool = False,
+                    last_cv_at: bool = False, last_login_at: bool = False) -> None:
+    sets = []
+    if kit:
+        sets += ['kit_count = user_activity.kit_count + 1',
+                 'first_kit_at = COALESCE(user_activity.first_kit_at, excluded.first_kit_at)',
+                 'last_kit_at = excluded.last_kit_at']
+    if last_cv_at:
+        sets.append('last_cv_at = excluded.last_cv_at')
+    if last_login_at:
+        sets.append('last_login_at = excluded.last_login_at')
+    c.execute(
+        f'''INSERT INTO user_activity
+               (sub, kit_count, first_kit_at, last_kit_at, last_cv_at, last_login_at, created_at)
+            VALUES (?,?,?,?,?,?,?)
+            ON CONFLICT(sub) DO {'UPDATE SET ' + ', '.join(sets) if sets else 'NOTHING'}''',
+        (sub, 1 if kit else 0, now if kit else None, now if kit else None,
+         now if last_cv_at else None, now if last_login_at else None, now)
+    )
+
+
+def list_inactive_users(cutoff: int, limit: int = 1000,
+                        after: Optional[List[Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+    """Users with no kit since `cutoff` (or none at all, if first seen before
+    it), least recently active first. Returns (rows, next_key) where next_key
+    is [idle_since, sub] to pass back as `after`, or None on the last page."""
+    sql = '''SELECT a.sub, u.email, a.kit_count, a.last_kit_at, a.created_at,
+                    COALESCE(a.last_kit_at, a.created_at) AS idle_since
+             FROM user_activity a JOIN users u ON u.sub = a.sub
+             WHERE COALESCE(a.last_kit_at, a.created_at) < ?'''
+    params: List[Any] = [cutoff]
+    if after:
+        sql += ' AND (COALESCE(a.last_kit_at, a.created_at), a.sub) > (?, ?)'
+        params += [after[0], after[1]]
+    sql += ' ORDER BY COALESCE(a.last_kit_at, a.created_at), a.sub LIMIT ?'
+    params.append(limit + 1)
+    with _read_conn() as c:
+        rows = [dict(r) for r in c.execute(sql, params).fetchall()]
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = [rows[-1]['idle_since'], rows[-1]['sub']]
+    return rows, next_key
+
+
+def _rebuild_user_activity(c) -> int:
+    c.execute('DELETE FROM user_activity')
+    cur = c.execute(
+        '''INSERT INTO user_activity
+               (sub, kit_count, first_kit_at, last_kit_at, last_cv_at, last_login_at, created_at)
+           SELECT u.sub, COALESCE(k.n, 0), k.first_at, k.last_at, a.last_at, NULL, u.created_at
+           FROM users u
+           LEFT JOIN (SELECT sub, COUNT(*) AS n, MIN(created_at) AS first_at, MAX(created_at) AS last_at
+                      FROM kits GROUP BY sub) k ON k.sub = u.sub
+           LEFT JOIN (SELECT sub, MAX(created_at) AS last_at
+                      FROM cv_analyses GROUP BY sub) a ON a.sub = u.sub'''
+    )
+    return cur.rowcount
 
 
 # ---------------------------------------------------------------------------
@@ -328,23 +955,24 @@ def upsert_user(sub: str, email: Optional[str], tenant_id: Optional[str], verify
 
 def upsert_profile(sub: str, tenant_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
     now = int(time.time())
+    data_json = _pack(json.dumps(data, ensure_ascii=False))
     with _conn() as c:
-        row = c.execute('SELECT id, version FROM profiles WHERE sub=?', (sub,)).fetchone()
-        if row:
-            profile_id = row['id']
-            new_version = row['version'] + 1
-            c.execute(
-                'UPDATE profiles SET version=?, data_json=?, tenant_id=?, updated_at=? WHERE id=?',
-                (new_version, json.dumps(data, ensure_ascii=False), tenant_id, now, profile_id)
-            )
+        rows = c.execute(
+            'UPDATE profiles SET version=version+1, data_json=?, tenant_id=?, updated_at=? WHERE sub=? '
+            'RETURNING id, version',
+            (data_json, tenant_id, now, sub)
+        ).fetchall()
+        if rows:
+            profile_id = rows[0]['id']
+            new_version = rows[0]['version']
         else:
             profile_id = 'pro_' + uuid.uuid4().hex[:20]
             new_version = 1
             c.execute(
                 'INSERT INTO profiles (id, sub, tenant_id, version, data_json, created_at, updated_at) VALUES (?,?,?,?,?,?,?)',
-                (profile_id, sub, tenant_id, new_version,
-                 json.dumps(data, ensure_ascii=False), now, now)
+                (profile_id, sub, tenant_id, new_version, data_json, now, now)
             )
+        _index_candidate(c, sub)
     return {'profile_id': profile_id, 'profile_version': new_version, 'stored_at': _iso(now)}
 
 
@@ -356,7 +984,7 @@ def get_profile(sub: str) -> Optional[Dict[str, Any]]:
         return {
             'profile_id': row['id'],
             'profile_version': row['version'],
-            'data': json.loads(row['data_json']),
+            'data': json.loads(_unpack(row['data_json'])),
             'stored_at': _iso(row['updated_at']),
         }
 
@@ -370,22 +998,18 @@ def upsert_job(sub: str, tenant_id: str, source_type: str, raw_text: str,
                parsed: Optional[Dict]) -> Dict[str, Any]:
     now = int(time.time())
     with _conn() as c:
-        row = c.execute(
-            'SELECT id FROM jobs WHERE sub=? AND job_fingerprint_sha256=?', (sub, fingerprint)
-        ).fetchone()
-        if row:
-            job_id = row['id']
-            if parsed:
-                c.execute('UPDATE jobs SET parsed_json=? WHERE id=?',
-                          (json.dumps(parsed, ensure_ascii=False), job_id))
-        else:
-            job_id = 'job_' + uuid.uuid4().hex[:20]
-            c.execute(
-                'INSERT INTO jobs (id, sub, tenant_id, source_type, source_url, raw_text, parsed_json, job_fingerprint_sha256, created_at) VALUES (?,?,?,?,?,?,?,?,?)',
-                (job_id, sub, tenant_id, source_type, source_url, raw_text,
-                 json.dumps(parsed, ensure_ascii=False) if parsed else None,
-                 fingerprint, now)
-            )
+        # Re-ingesting the same text keeps the existing job id (and only refreshes parsed_json)
+        rows = c.execute(
+            '''INSERT INTO jobs (id, sub, tenant_id, source_type, source_url, raw_text, parsed_json, job_fingerprint_sha256, created_at)
+               VALUES (?,?,?,?,?,?,?,?,?)
+               ON CONFLICT(sub, job_fingerprint_sha256) DO UPDATE SET
+                 parsed_json=COALESCE(excluded.parsed_json, jobs.parsed_json)
+               RETURNING id''',
+            ('job_' + uuid.uuid4().hex[:20], sub, tenant_id, source_type, source_url, _pack(raw_text),
+             json.dumps(parsed, ensure_ascii=False) if parsed else None,
+             fingerprint, now)
+        ).fetchall()
+        job_id = rows[0]['id']
     return {'job_id': job_id, 'job_fingerprint_sha256': fingerprint}
 
 
@@ -398,7 +1022,7 @@ def get_job(job_id: str, sub: str) -> Optional[Dict[str, Any]]:
             'job_id': row['id'],
             'source_type': row['source_type'],
             'source_url': row['source_url'],
-            'raw_text': row['raw_text'],
+            'raw_text': _unpack(row['raw_text']),
             'parsed': json.loads(row['parsed_json']) if row['parsed_json'] else None,
             'job_fingerprint_sha256': row['job_fingerprint_sha256'],
         }
@@ -416,14 +1040,188 @@ def add_credits(sub: str, delta: int, reason: str,
             'INSERT INTO credit_ledger (sub, delta, reason, ref_type, ref_id, created_at) VALUES (?,?,?,?,?,?)',
             (sub, delta, reason, ref_type, ref_id, now)
         )
+        c.execute(
+            '''INSERT INTO credit_balances (sub, balance, updated_at) VALUES (?,?,?)
+               ON CONFLICT(sub) DO UPDATE SET
+                 balance=credit_balances.balance + excluded.balance,
+                 updated_at=excluded.updated_at''',
+            (sub, delta, now)
+        )
 
 
 def get_balance(sub: str) -> int:
     with _conn() as c:
         row = c.execute(
-            'SELECT COALESCE(SUM(delta),0) AS bal FROM credit_ledger WHERE sub=?', (sub,)
+            'SELECT balance FROM credit_balances WHERE sub=?', (sub,)
         ).fetchone()
-        return int(row['bal']) if row else 0
+        return int(row['balance']) if row else 0
+
+
+# Balance = committed ledger entries minus credits still held by in-flight requests
+_EXPECTED_BALANCES_SQL = '''
+    SELECT sub, SUM(delta) AS total FROM (
+        SELECT sub, delta FROM credit_ledger
+        UNION ALL
+        SELECT sub, -amount FROM credit_holds WHERE status = 'held'
+    ) t GROUP BY sub'''
+
+
+def rebuild_credit_balances() -> int:
+    """Recompute every materialised balance from the ledger. Returns users written."""
+    with _conn() as c:
+        return _rebuild_credit_balances(c)
+
+
+def _rebuild_credit_balances(c) -> int:
+    c.execute('DELETE FROM credit_balances')
+    cur = c.execute(
+        f'''INSERT INTO credit_balances (sub, balance, updated_at)
+            SELECT sub, total, ? FROM ({_EXPECTED_BALANCES_SQL}) e''',
+        (int(time.time()),)
+    )
+    return cur.rowcount
+
+
+def verify_credit_balances() -> List[Dict[str, Any]]:
+    """Return users whose materialised balance disagrees with the ledger (net of holds)."""
+    with _read_conn() as c:
+        rows = c.execute(
+            f'''SELECT e.sub, e.total AS ledger_balance, b.balance AS stored_balance
+                FROM ({_EXPECTED_BALANCES_SQL}) e
+                LEFT JOIN credit_balances b ON b.sub = e.sub
+                WHERE b.balance IS NULL OR b.balance <> e.total
+                UNION ALL
+                SELECT b.sub, 0, b.balance
+                FROM credit_balances b
+                WHERE b.balance <> 0
+                  AND NOT EXISTS (SELECT 1 FROM credit_ledger l WHERE l.sub = b.sub)
+                  AND NOT EXISTS (SELECT 1 FROM credit_holds h WHERE h.sub = b.sub AND h.status = 'held')'''
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# Credit holds (reserve → commit | release)
+# ---------------------------------------------------------------------------
+
+def reserve_credits(sub: str, amount: int, reason: str,
+                    ref_type: str = None, ref_id: str = None,
+                    ttl_s: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Debit `amount` from the user's balance if (and only if) it is available.
+
+    The check and the debit are one conditional UPDATE, so concurrent requests
+    cannot both spend the same credits. Returns {'hold_id', 'amount',
+    'balance_after'}, or None when the balance is insufficient. The hold must be
+    settled with commit_credits() or release_credits(); unsettled holds are
+    released automatically once they expire, or as soon as the request that
+    took them rolls back.
+    """
+    _maybe_release_expired_holds()
+    if amount <= 0:
+        return {'hold_id': None, 'amount': 0, 'balance_after': get_balance(sub)}
+    now = int(time.time())
+    hold_id = 'hold_' + uuid.uuid4().hex[:20]
+    with _conn() as c:
+        rows = c.execute(
+            '''UPDATE credit_balances SET balance=balance-?, updated_at=?
+               WHERE sub=? AND balance>=?
+               RETURNING balance''',
+            (amount, now, sub, amount)
+        ).fetchall()
+        if not rows:
+            return None
+        c.execute(
+            '''INSERT INTO credit_holds (id, sub, amount, reason, ref_type, ref_id, status, created_at, expires_at)
+               VALUES (?,?,?,?,?,?,?,?,?)''',
+            (hold_id, sub, amount, reason, ref_type, ref_id, 'held', now, now + (ttl_s or _HOLD_TTL_S))
+        )
+    # Make the hold durable before the (slow) paid work starts, and hand the
+    # credits back if the request's transaction is later rolled back.
+    commit_point()
+    _on_rollback(lambda: release_credits(hold_id))
+    return {'hold_id': hold_id, 'amount': amount, 'balance_after': int(rows[0]['balance'])}
+
+
+def commit_credits(hold_id: Optional[str], ref_type: str = None, ref_id: str = None) -> None:
+    """Turn a hold into a permanent ledger debit. Idempotent."""
+    if not hold_id:
+        return
+    now = int(time.time())
+    with _conn() as c:
+        rows = c.execute(
+            '''UPDATE credit_holds SET status='committed', settled_at=?
+               WHERE id=? AND status='held'
+               RETURNING sub, amount, reason, ref_type, ref_id''',
+            (now, hold_id)
+        ).fetchall()
+        late = False
+        if not rows:
+            # The hold expired mid-request and was refunded; the work was still
+            # delivered, so charge it (the balance may dip below zero, as before holds).
+            rows = c.execute(
+                '''UPDATE credit_holds SET status='committed', settled_at=?
+                   WHERE id=? AND status='released'
+                   RETURNING sub, amount, reason, ref_type, ref_id''',
+                (now, hold_id)
+            ).fetchall()
+            late = True
+        if not rows:
+            return
+        h = rows[0]
+        c.execute(
+            'INSERT INTO credit_ledger (sub, delta, reason, ref_type, ref_id, created_at) VALUES (?,?,?,?,?,?)',
+            (h['sub'], -h['amount'], h['reason'], ref_type or h['ref_type'], ref_id or h['ref_id'], now)
+        )
+        if late:
+            c.execute(
+                'UPDATE credit_balances SET balance=balance-?, updated_at=? WHERE sub=?',
+                (h['amount'], now, h['sub'])
+            )
+
+
+def release_credits(hold_id: Optional[str]) -> None:
+    """Return a held amount to the user's balance. Idempotent."""
+    if not hold_id:
+        return
+    now = int(time.time())
+    with _conn() as c:
+        rows = c.execute(
+            '''UPDATE credit_holds SET status='released', settled_at=?
+               WHERE id=? AND status='held'
+               RETURNING sub, amount''',
+            (now, hold_id)
+        ).fetchall()
+        for r in rows:
+            c.execute(
+                'UPDATE credit_balances SET balance=balance+?, updated_at=? WHERE sub=?',
+                (r['amount'], now, r['sub'])
+            )
+
+
+def release_expired_holds() -> int:
+    """Release every hold past its expiry. Returns the number released."""
+    now = int(time.time())
+    with _conn() as c:
+        rows = c.execute(
+            '''UPDATE credit_holds SET status='released', settled_at=?
+               WHERE status='held' AND expires_at < ?
+               RETURNING sub, amount''',
+            (now, now)
+        ).fetchall()
+        c.executemany(
+            'UPDATE credit_balances SET balance=balance+?, updated_at=? WHERE sub=?',
+            [(r['amount'], now, r['sub']) for r in rows]
+        )
+    return len(rows)
+
+
+def _maybe_release_expired_holds() -> None:
+    global _last_hold_sweep
+    now = time.monotonic()
+    if now - _last_hold_sweep < _HOLD_SWEEP_INTERVAL_S:
+        return
+    _last_hold_sweep = now
+    release_expired_holds()
 
 
 # ---------------------------------------------------------------------------
@@ -435,7 +1233,11 @@ def get_kit_by_idempotency(sub: str, idem_key: str) -> Optional[Dict[str, Any]]:
         row = c.execute(
             'SELECT * FROM kits WHERE sub=? AND idempotency_key=?', (sub, idem_key)
         ).fetchone()
-        return dict(row) if row else None
+        if not row:
+            return None
+        d = dict(row)
+        d['artifacts_json'] = _unpack(d['artifacts_json'])
+        return d
 
 
 def save_kit(kit_id: str, sub: str, tenant_id: str, job_id: Optional[str],
@@ -450,17 +1252,36 @@ def save_kit(kit_id: str, sub: str, tenant_id: str, job_id: Optional[str],
                           idempotency_key, artifacts_json, attestation_txid, artifact_sha256, created_at)
         VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
         ''', (kit_id, sub, tenant_id, job_id, profile_id, kind, credits_charged,
-              idempotency_key, artifacts_json, attestation_txid, artifact_sha256, now))
-
-
-def list_kits(sub: str, limit: int = 25) -> List[Dict[str, Any]]:
+              idempotency_key, _pack(artifacts_json), attestation_txid, artifact_sha256, now))
+        _count(c, now, kits=1)
+        _touch_activity(c, sub, now, kit=True)
+
+
+def list_kits(sub: str, limit: int = 25,
+              after: Optional[List[Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+    """Newest first. Returns (kits, next_key); pass next_key back as `after`."""
+    return _list_newest(
+        'SELECT id, kind, job_id, credits_charged, attestation_txid, artifact_sha256, created_at '
+        'FROM kits WHERE sub=?', [sub], limit, after
+    )
+
+
+def _list_newest(sql: str, params: List[Any], limit: int,
+                 after: Optional[List[Any]]) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+    """Keyset page of a per-user listing ordered by (created_at, id) descending;
+    the key is [created_at, id] of the last row, None on the last page."""
+    params = list(params)
+    if after:
+        sql += ' AND (created_at, id) < (?, ?)'
+        params += [after[0], after[1]]
+    sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
     with _conn() as c:
-        rows = c.execute(
-            'SELECT id, kind, job_id, credits_charged, attestation_txid, artifact_sha256, created_at '
-            'FROM kits WHERE sub=? ORDER BY created_at DESC LIMIT ?',
-            (sub, limit)
-        ).fetchall()
-        return [dict(r) for r in rows]
+        rows = [dict(r) for r in c.execute(sql, params).fetchall()]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, [rows[-1]['created_at'], rows[-1]['id']]
 
 
 # ---------------------------------------------------------------------------
@@ -488,9 +1309,9 @@ def mark_stripe_event(event_id: str, event_type: str = '',
     now = int(time.time())
     with _conn() as c:
         c.execute(
-            'INSERT OR IGNORE INTO stripe_events (id, type, created_at, raw_json) VALUES (?,?,?,?)',
+            'INSERT INTO stripe_events (id, type, created_at, raw_json) VALUES (?,?,?,?) ON CONFLICT(id) DO NOTHING',
             (event_id, event_type, now,
-             json.dumps(raw, ensure_ascii=False) if raw else None)
+             _pack(json.dumps(raw, ensure_ascii=False)) if raw else None)
         )
 
 
@@ -498,16 +1319,327 @@ def mark_stripe_event(event_id: str, event_type: str = '',
 # Audits
 # ---------------------------------------------------------------------------
 
+# Routes enqueue audit rows; a background thread group-commits them in batches
+# every AUDIT_FLUSH_MS or AUDIT_BATCH_MAX rows. AUDIT_MODE=sync restores the
+# old write-through behaviour, and actions listed in AUDIT_SYNC_ACTIONS are
+# always written before write_audit() returns.
+_AUDIT_MODE = os.getenv('AUDIT_MODE', 'async').strip().lower()
+_AUDIT_QUEUE_MAX = int(os.getenv('AUDIT_QUEUE_MAX', '10000'))
+_AUDIT_BATCH_MAX = int(os.getenv('AUDIT_BATCH_MAX', '200'))
+_AUDIT_FLUSH_S = int(os.getenv('AUDIT_FLUSH_MS', '200')) / 1000
+_AUDIT_SYNC_ACTIONS = {
+    a.strip() for a in os.getenv('AUDIT_SYNC_ACTIONS', 'GUARANTEE_RESOLVE,GDPR_DELETE').split(',') if a.strip()
+}
+
+_INSERT_AUDIT_SQL = (
+    'INSERT INTO audits (tenant_id, actor_sub, action, target_type, target_id, details_json, created_at) '
+    'VALUES (?,?,?,?,?,?,?)'
+)
+
+
+class _AuditWriter:
+    """Bounded queue + daemon thread that flushes audit rows with executemany."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._queue: Optional[queue.Queue] = None
+
+    def _ensure_started(self) -> queue.Queue:
+        # Threads do not survive fork(); each worker process starts its own
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=_AUDIT_QUEUE_MAX)
+                threading.Thread(target=self._run, args=(self._queue,),
+                                 name='audit-writer', daemon=True).start()
+                self._pid = os.getpid()
+        return self._queue
+
+    def submit(self, row: tuple) -> bool:
+        """Enqueue a row; False when the queue is full (caller writes it inline)."""
+        try:
+            self._ensure_started().put_nowait(row)
+            return True
+        except queue.Full:
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything enqueued so far is committed."""
+        if self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _run(self, q: queue.Queue) -> None:
+        while True:
+            batch: List[tuple] = []
+            waiters: List[threading.Event] = []
+            item = q.get()
+            deadline = time.monotonic() + _AUDIT_FLUSH_S
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= _AUDIT_BATCH_MAX:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for w in waiters:
+                w.set()
+
+    @staticmethod
+    def _write(batch: List[tuple]) -> None:
+        try:
+            with _conn() as c:
+                c.executemany(_INSERT_AUDIT_SQL, batch)
+            return
+        except Exception:
+            log.exception('audit batch of %d failed; retrying row by row', len(batch))
+        for row in batch:
+            try:
+                with _conn() as c:
+                    c.execute(_INSERT_AUDIT_SQL, row)
+            except Exception:
+                log.exception('dropping audit row %r', row[:5])
+
+
+_audit_writer = _AuditWriter()
+
+
 def write_audit(tenant_id: str, actor_sub: Optional[str], action: str,
                 target_type: Optional[str] = None, target_id: Optional[str] = None,
-                details: Optional[Dict] = None) -> None:
+                details: Optional[Dict] = None, sync: Optional[bool] = None) -> None:
+    """Record an audit row. Queued for the background writer unless `sync`
+    (or AUDIT_MODE=sync, or the action is in AUDIT_SYNC_ACTIONS)."""
     now = int(time.time())
+    row = (tenant_id, actor_sub, action, target_type, target_id,
+           json.dumps(details, ensure_ascii=False) if details else None, now)
+    if sync is None:
+        sync = _AUDIT_MODE == 'sync' or action in _AUDIT_SYNC_ACTIONS
+    if not sync and _audit_writer.submit(row):
+        return
     with _conn() as c:
-        c.execute(
-            'INSERT INTO audits (tenant_id, actor_sub, action, target_type, target_id, details_json, created_at) VALUES (?,?,?,?,?,?,?)',
-            (tenant_id, actor_sub, action, target_type, target_id,
-             json.dumps(details, ensure_ascii=False) if details else None, now)
-        )
+        c.execute(_INSERT_AUDIT_SQL, row)
+
+
+def flush_audits(timeout: float = 5.0) -> bool:
+    """Wait for queued audit rows to be committed. Registered to run at exit."""
+    return _audit_writer.flush(timeout)
+
+
+atexit.register(flush_audits)
+
+
+# Retention: `audits` is the hot table. Rows older than AUDIT_RETENTION_DAYS
+# are moved, oldest id first, into compressed segment files
+# (app/db/audit_archive.py) listed in audit_segments. The DELETE and the
+# segment rows commit together, so each audit row is either in the table or
+# in exactly one recorded segment; iter_audits() reads across both.
+_AUDIT_RETENTION_DAYS = int(os.getenv('AUDIT_RETENTION_DAYS', '90'))
+_AUDIT_ARCHIVE_INTERVAL_S = int(os.getenv('AUDIT_ARCHIVE_INTERVAL_S', '3600'))
+_AUDIT_ARCHIVE_BATCH = int(os.getenv('AUDIT_ARCHIVE_BATCH', '5000'))
+_AUDIT_READ_BATCH = 1000
+_AUDIT_COLUMNS = ('id', 'tenant_id', 'actor_sub', 'action', 'target_type',
+                  'target_id', 'details_json', 'created_at')
+
+
+def _utc_day(ts: int) -> str:
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime('%Y-%m-%d')
+
+
+def archive_audits(retention_days: Optional[int] = None) -> Dict[str, int]:
+    """Move audit rows older than the retention window into archive segments.
+
+    Returns the number of rows moved, segments written and leftover segment
+    files (from runs that rolled back) removed.
+    """
+    days = _AUDIT_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = int(time.time()) - days * 86400
+    result = {'rows': 0, 'segments': 0, 'leftovers': _clear_audit_leftovers()}
+    while True:
+        moved, segments, more = _archive_audit_batch(cutoff)
+        result['rows'] += moved
+        result['segments'] += segments
+        if not more:
+            return result
+
+
+def _archive_audit_batch(cutoff: int) -> Tuple[int, int, bool]:
+    written: List[str] = []
+    try:
+        with _conn() as c:
+            # Oldest ids first, stopping at the first row inside the window:
+            # a PK range scan, no index on created_at needed
+            head = c.execute('SELECT id, created_at FROM audits ORDER BY id LIMIT ?',
+                             (_AUDIT_ARCHIVE_BATCH,)).fetchall()
+            upto = None
+            for r in head:
+                if r[1] >= cutoff:
+                    break
+                upto = r[0]
+            if upto is None:
+                return 0, 0, False
+            more = upto == head[-1][0] and len(head) == _AUDIT_ARCHIVE_BATCH
+            rows = sorted(
+                (dict(r) for r in c.execute(
+                    f"DELETE FROM audits WHERE id <= ? RETURNING {', '.join(_AUDIT_COLUMNS)}", (upto,)
+                ).fetchall()),
+                key=lambda r: r['id'],
+            )
+            # One segment per run of consecutive rows from the same UTC day
+            runs: List[List[Dict[str, Any]]] = []
+            for row in rows:
+                if runs and _utc_day(runs[-1][-1]['created_at']) == _utc_day(row['created_at']):
+                    runs[-1].append(row)
+                else:
+                    runs.append([row])
+            now = int(time.time())
+            for run in runs:
+                name = _audit_archive.segment_name(_utc_day(run[0]['created_at']), run[0]['id'], run[-1]['id'])
+                written.append(name)
+                size, digest = _audit_archive.write_segment(name, run)
+                c.execute(
+                    '''INSERT INTO audit_segments
+                       (name, first_id, last_id, first_at, last_at, row_count, bytes, sha256, created_at)
+                       VALUES (?,?,?,?,?,?,?,?,?)''',
+                    (name, run[0]['id'], run[-1]['id'], min(r['created_at'] for r in run),
+                     max(r['created_at'] for r in run), len(run), size, digest, now)
+                )
+    except BaseException:
+        for name in written:
+            _audit_archive.remove(name)
+        raise
+    return len(rows), len(runs), more
+
+
+def _clear_audit_leftovers(min_age_s: int = 3600) -> int:
+    """Remove segment files with no audit_segments row (their run rolled back)."""
+    with _conn() as c:
+        known = {r[0] for r in c.execute('SELECT name FROM audit_segments').fetchall()}
+    cutoff = time.time() - min_age_s
+    removed = 0
+    for name, path in _audit_archive.iter_segments():
+        if name not in known and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def iter_audits(since: Optional[int] = None, until: Optional[int] = None,
+                tenant_id: Optional[str] = None, action: Optional[str] = None,
+                target_type: Optional[str] = None, target_id: Optional[str] = None
+                ) -> Iterator[Dict[str, Any]]:
+    """Stream audit rows in id order from the archive and then the hot table.
+
+    `since`/`until` are epoch seconds (until exclusive); the other filters
+    are exact matches. Memory use is one segment line or one page of rows.
+    """
+    filters = {'tenant_id': tenant_id, 'action': action,
+               'target_type': target_type, 'target_id': target_id}
+    filters = {k: v for k, v in filters.items() if v is not None}
+    where, params = [], []
+    for column, value in filters.items():
+        where.append(f'a.{column} = ?')
+        params.append(value)
+    if since is not None:
+        where.append('a.created_at >= ?')
+        params.append(since)
+    if until is not None:
+        where.append('a.created_at < ?')
+        params.append(until)
+    sql = (f"SELECT {', '.join('a.' + col for col in _AUDIT_COLUMNS)}, "
+           '(SELECT COALESCE(MAX(last_id), 0) FROM audit_segments) AS archived_upto '
+           f"FROM audits a WHERE {' AND '.join(['a.id > ?'] + where)} ORDER BY a.id LIMIT ?")
+
+    def matches(row: Dict[str, Any]) -> bool:
+        if any(row.get(k) != v for k, v in filters.items()):
+            return False
+        return (since is None or row['created_at'] >= since) and (until is None or row['created_at'] < until)
+
+    last = 0   # every row with id <= last has been considered
+    while True:
+        with _read_conn() as c:
+            page = [dict(r) for r in c.execute(sql, [last] + params + [_AUDIT_READ_BATCH]).fetchall()]
+            # archived_upto comes from the same snapshot as the page: rows up
+            # to it had already left the table, so they are read from segments
+            if page:
+                upto = page[0]['archived_upto']
+            else:
+                upto = c.execute('SELECT COALESCE(MAX(last_id), 0) FROM audit_segments').fetchone()[0]
+        if upto > last:
+            yield from _iter_archived_audits(last, upto, since, until, matches)
+            last = upto
+        for row in page:
+            del row['archived_upto']
+            yield row
+            last = row['id']
+        if len(page) < _AUDIT_READ_BATCH:
+            return
+
+
+def _iter_archived_audits(after_id: int, upto_id: int, since: Optional[int], until: Optional[int],
+                          matches: Callable[[Dict[str, Any]], bool]) -> Iterator[Dict[str, Any]]:
+    where, params = ['last_id > ?', 'first_id <= ?'], [after_id, upto_id]
+    if since is not None:
+        where.append('last_at >= ?')
+        params.append(since)
+    if until is not None:
+        where.append('first_at < ?')
+        params.append(until)
+    with _read_conn() as c:
+        names = [r[0] for r in c.execute(
+            f"SELECT name FROM audit_segments WHERE {' AND '.join(where)} ORDER BY first_id", params
+        ).fetchall()]
+    for name in names:
+        for row in _audit_archive.read_segment(name):
+            if after_id < row['id'] <= upto_id and matches(row):
+                yield row
+
+
+class _AuditArchiver:
+    """Daemon thread that runs archive_audits() every AUDIT_ARCHIVE_INTERVAL_S."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+
+    def start(self) -> None:
+        # One per worker process; whichever runs first moves the rows and the
+        # others find nothing left outside the window
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name='audit-archiver', daemon=True).start()
+                self._pid = os.getpid()
+
+    @staticmethod
+    def _run() -> None:
+        while True:
+            time.sleep(_AUDIT_ARCHIVE_INTERVAL_S * random.uniform(0.5, 1.5))
+            try:
+                result = archive_audits()
+                if result['rows']:
+                    log.info('archived %d audit row(s) into %d segment(s)', result['rows'], result['segments'])
+            except Exception:
+                log.exception('audit archive run failed')
+
+
+_audit_archiver = _AuditArchiver()
 
 
 # ---------------------------------------------------------------------------
@@ -522,26 +1654,36 @@ def save_cv_analysis(
 ) -> Dict[str, Any]:
     now = int(time.time())
     with _conn() as c:
+        exists = c.execute('SELECT 1 FROM cv_analyses WHERE id=?', (analysis_id,)).fetchone()
         c.execute(
-            '''INSERT OR REPLACE INTO cv_analyses
+            '''INSERT INTO cv_analyses
                (id, sub, filename, raw_text, analysis_json, ats_score,
                 artifact_sha256, attestation_txid, credits_charged, created_at)
-               VALUES (?,?,?,?,?,?,?,?,?,?)''',
-            (analysis_id, sub, filename, raw_text,
+               VALUES (?,?,?,?,?,?,?,?,?,?)
+               ON CONFLICT(id) DO UPDATE SET
+                 sub=excluded.sub, filename=excluded.filename, raw_text=excluded.raw_text,
+                 analysis_json=excluded.analysis_json, ats_score=excluded.ats_score,
+                 artifact_sha256=excluded.artifact_sha256, attestation_txid=excluded.attestation_txid,
+                 credits_charged=excluded.credits_charged, created_at=excluded.created_at''',
+            (analysis_id, sub, filename, _pack(raw_text),
              json.dumps(analysis, ensure_ascii=False), ats_score_val,
              artifact_sha256, attestation_txid, credits_charged, now)
         )
+        # Denormalised for recruiter search ordering
+        c.execute('UPDATE candidate_visibility SET latest_ats=? WHERE sub=?', (ats_score_val, sub))
+        if not exists:
+            _count(c, now, cv_analyses=1)
+        _touch_activity(c, sub, now, last_cv_at=True)
     return {'analysis_id': analysis_id, 'created_at': _iso(now)}
 
 
-def list_cv_analyses(sub: str, limit: int = 20) -> List[Dict[str, Any]]:
-    with _conn() as c:
-        rows = c.execute(
-            'SELECT id, sub, filename, ats_score, credits_charged, created_at '
-            'FROM cv_analyses WHERE sub=? ORDER BY created_at DESC LIMIT ?',
-            (sub, limit)
-        ).fetchall()
-    return [dict(r) for r in rows]
+def list_cv_analyses(sub: str, limit: int = 20,
+                     after: Optional[List[Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+    """Newest first. Returns (analyses, next_key); pass next_key back as `after`."""
+    return _list_newest(
+        'SELECT id, sub, filename, ats_score, credits_charged, created_at '
+        'FROM cv_analyses WHERE sub=?', [sub], limit, after
+    )
 
 
 def get_cv_analysis(analysis_id: str, sub: str) -> Optional[Dict[str, Any]]:
@@ -552,6 +1694,7 @@ def get_cv_analysis(analysis_id: str, sub: str) -> Optional[Dict[str, Any]]:
         if not row:
             return None
         d = dict(row)
+        d['raw_text'] = _unpack(d['raw_text'])
         d['analysis'] = json.loads(d.pop('analysis_json') or '{}')
         return d
 
@@ -568,11 +1711,16 @@ def set_candidate_visibility(
 ) -> None:
     now = int(time.time())
     with _conn() as c:
+        prev = c.execute('SELECT visible FROM candidate_visibility WHERE sub=?', (sub,)).fetchone()
         c.execute(
             '''INSERT INTO candidate_visibility
-               (sub, visible, desired_roles_json, desired_locations_json, keywords_json, updated_at)
-               VALUES (?,?,?,?,?,?)
+               (sub, visible, desired_roles_json, desired_locations_json, keywords_json, latest_ats,
+                visible_since, updated_at)
+               VALUES (?,?,?,?,?,(SELECT ats_score FROM cv_analyses WHERE sub=? ORDER BY created_at DESC LIMIT 1),?,?)
                ON CONFLICT(sub) DO UPDATE SET
+                 visible_since=CASE WHEN excluded.visible = 0 THEN NULL
+                                    WHEN candidate_visibility.visible = 1 THEN candidate_visibility.visible_since
+                                    ELSE excluded.visible_since END,
                  visible=excluded.visible,
                  desired_roles_json=excluded.desired_roles_json,
                  desired_locations_json=excluded.desired_locations_json,
@@ -581,54 +1729,202 @@ def set_candidate_visibility(
             (sub, 1 if visible else 0,
              json.dumps(desired_roles or [], ensure_ascii=False),
              json.dumps(desired_locations or [], ensure_ascii=False),
-             json.dumps(keywords or [], ensure_ascii=False), now)
+             json.dumps(keywords or [], ensure_ascii=False), sub, now if visible else None, now)
+        )
+        _count(c, now, visible_candidates=(1 if visible else 0) - ((prev['visible'] or 0) if prev else 0))
+        _index_candidate(c, sub)
+
+
+def _backfill_latest_ats(c) -> None:
+    c.execute(
+        '''UPDATE candidate_visibility SET latest_ats = (
+               SELECT ats_score FROM cv_analyses a
+               WHERE a.sub = candidate_visibility.sub
+               ORDER BY a.created_at DESC LIMIT 1)'''
+    )
+
+
+# Search documents: one candidate_search row per visible candidate, keyed by
+# users.id (FTS5 rowid on SQLite, user_id column on Postgres).
+_ROLE_COLUMNS = ('roles', 'keywords', 'title', 'skills')
+_LOCATION_COLUMNS = ('locations',)
+# bm25 weights for roles, keywords, title, skills, locations
+_SEARCH_RANK = 'bm25(candidate_search, 10.0, 5.0, 8.0, 3.0, 1.0)'
+
+
+def _search_key() -> str:
+    return 'user_id' if _BACKEND == 'postgres' else 'rowid'
+
+
+def _lines(values: Any) -> str:
+    if isinstance(values, str):
+        return values
+    if isinstance(values, dict):
+        values = [v for group in values.values() if isinstance(group, list) for v in group]
+    if not isinstance(values, list):
+        return ''
+    return '\n'.join(str(v) for v in values if isinstance(v, (str, int, float)))
+
+
+def _candidate_document(row) -> tuple:
+    profile = json.loads(_unpack(row['data_json'])) if row['data_json'] else {}
+    identity = profile.get('identity') or {}
+    title = [identity.get('current_title'), profile.get('headline')]
+    return (
+        _lines(json.loads(row['desired_roles_json'] or '[]')),
+        _lines(json.loads(row['keywords_json'] or '[]')),
+        _lines([t for t in title if t]),
+        _lines(profile.get('skills') or []),
+        _lines(json.loads(row['desired_locations_json'] or '[]')),
+    )
+
+
+_CANDIDATE_SOURCE_SQL = '''
+SELECT u.id AS user_id, cv.visible, cv.desired_roles_json, cv.desired_locations_json,
+       cv.keywords_json, p.data_json
+FROM users u
+JOIN candidate_visibility cv ON cv.sub = u.sub
+LEFT JOIN profiles p ON p.sub = u.sub
+'''
+
+
+def _unindex_candidate(c, sub: str) -> None:
+    c.execute(
+        f'DELETE FROM candidate_search WHERE {_search_key()} IN (SELECT id FROM users WHERE sub=?)', (sub,)
+    )
+
+
+def _index_candidate(c, sub: str) -> None:
+    """Refresh `sub`'s search document inside the caller's transaction."""
+    _unindex_candidate(c, sub)
+    row = c.execute(_CANDIDATE_SOURCE_SQL + ' WHERE u.sub=? AND cv.visible=1', (sub,)).fetchone()
+    if row:
+        c.execute(
+            f'INSERT INTO candidate_search ({_search_key()}, roles, keywords, title, skills, locations) '
+            'VALUES (?,?,?,?,?,?)',
+            (row['user_id'],) + _candidate_document(row)
         )
 
 
+def rebuild_candidate_search() -> int:
+    """Recreate every search document from candidate_visibility and profiles."""
+    with _conn() as c:
+        return _rebuild_candidate_search(c)
+
+
+def _rebuild_candidate_search(c) -> int:
+    c.execute('DELETE FROM candidate_search')
+    rows = c.execute(_CANDIDATE_SOURCE_SQL + ' WHERE cv.visible=1').fetchall()
+    c.executemany(
+        f'INSERT INTO candidate_search ({_search_key()}, roles, keywords, title, skills, locations) '
+        'VALUES (?,?,?,?,?,?)',
+        [(r['user_id'],) + _candidate_document(r) for r in rows]
+    )
+    return len(rows)
+
+
+def _search_predicate(columns: tuple, term: str, fts: bool):
+    """SQL predicate on `cs` that is true when any of `columns` contains `term`."""
+    if fts:
+        expr = '{%s} : "%s"' % (' '.join(columns), term.replace('"', '""'))
+        return 'cs.rowid IN (SELECT rowid FROM candidate_search WHERE candidate_search MATCH ?)', [expr]
+    like = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    op = 'ILIKE' if _BACKEND == 'postgres' else 'LIKE'
+    sql = ' OR '.join(f"cs.{col} {op} ? ESCAPE '\\'" for col in columns)
+    return f'({sql})', [like] * len(columns)
+
+
 def search_candidates(
-    role_query: str = '', location: str = '', limit: int = 20, offset: int = 0
-) -> List[Dict[str, Any]]:
-    """Return visible candidates whose profile matches the query."""
+    role_query: str = '', location: str = '', limit: int = 20, offset: int = 0,
+    after: Optional[List[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+    """Return (candidates, next_key) for visible candidates matching the query.
+
+    Candidates must match at least one of the given terms. Pages follow
+    (match_score, latest ATS score, sub), where a missing ATS score sorts as
+    -1; within a page, rows of equal match_score are ordered by relevance
+    (bm25 on SQLite, nothing elsewhere). bm25 depends on the whole index, so
+    it shifts whenever any candidate is re-indexed and is kept out of the
+    page boundary. Without a query every visible candidate is returned, best
+    ATS score first. `next_key` is the page key of the last row when more
+    rows follow; pass it back as `after` for the next page (keyset
+    pagination, no OFFSET scan).
+    """
+    terms = [(cols, term, penalty) for cols, term, penalty in (
+        (_ROLE_COLUMNS, role_query.strip(), 40),
+        (_LOCATION_COLUMNS, location.strip(), 30),
+    ) if term]
+
+    if not terms:
+        keyset_sql, params = '', []
+        if after:
+            keyset_sql = 'AND (COALESCE(cv.latest_ats, -1) < ? OR (COALESCE(cv.latest_ats, -1) = ? AND cv.sub > ?))'
+            params = [after[1], after[1], after[2]]
+        sql = f'''SELECT cv.sub, cv.desired_roles_json, cv.desired_locations_json, cv.keywords_json,
+                          p.data_json, cv.latest_ats, 100 AS match_score, 0 AS relevance
+                   FROM candidate_visibility cv
+                   LEFT JOIN profiles p ON p.sub = cv.sub
+                   WHERE cv.visible = 1 {keyset_sql}
+                   ORDER BY COALESCE(cv.latest_ats, -1) DESC, cv.sub
+                   LIMIT ? OFFSET ?'''
+    else:
+        # Trigram FTS needs at least three characters per term
+        fts = _BACKEND != 'postgres' and all(len(term) >= 3 for _, term, _ in terms)
+        preds = [_search_predicate(cols, term, fts) for cols, term, _ in terms]
+        score_sql, params = '100', []
+        if len(terms) > 1:
+            for (pred, pred_params), (_, _, penalty) in zip(preds, terms):
+                score_sql += f' - CASE WHEN {pred} THEN 0 ELSE {penalty} END'
+                params += pred_params
+        if fts:
+            where_sql = 'candidate_search MATCH ?'
+            params.append(' OR '.join(f'({p[1][0]})' for p in preds))
+            rank_sql = _SEARCH_RANK
+        else:
+            where_sql = ' OR '.join(p[0] for p in preds)
+            params += [v for p in preds for v in p[1]]
+            rank_sql = '0'
+        keyset_sql = ''
+        if after:
+            # Row-value comparison over the ascending form of the sort key
+            keyset_sql = 'WHERE (-match_score, -COALESCE(latest_ats, -1), sub) > (?, ?, ?)'
+            params += [-after[0], -after[1], after[2]]
+        sql = f'''SELECT * FROM (
+                       SELECT u.sub, cv.desired_roles_json, cv.desired_locations_json, cv.keywords_json,
+                              p.data_json, cv.latest_ats,
+                              {score_sql} AS match_score, {rank_sql} AS relevance
+                       FROM candidate_search cs
+                       JOIN users u ON u.id = cs.{_search_key()}
+                       JOIN candidate_visibility cv ON cv.sub = u.sub
+                       LEFT JOIN profiles p ON p.sub = u.sub
+                       WHERE cv.visible = 1 AND ({where_sql})
+                   ) AS ranked
+                   {keyset_sql}
+                   ORDER BY match_score DESC, COALESCE(latest_ats, -1) DESC, sub
+                   LIMIT ? OFFSET ?'''
+    # One row past the page tells whether another page exists
+    params += [limit + 1, 0 if after else offset]
+
     with _conn() as c:
-        rows = c.execute(
-            '''SELECT cv.sub, cv.visible, cv.desired_roles_json, cv.desired_locations_json,
-                      cv.keywords_json, u.email,
-                      p.data_json,
-                      (SELECT ats_score FROM cv_analyses WHERE sub=cv.sub ORDER BY created_at DESC LIMIT 1) AS latest_ats
-               FROM candidate_visibility cv
-               JOIN users u ON u.sub = cv.sub
-               LEFT JOIN profiles p ON p.sub = cv.sub
-               WHERE cv.visible = 1
-               ORDER BY latest_ats DESC NULLS LAST
-               LIMIT ? OFFSET ?''',
-            (limit, offset)
-        ).fetchall()
+        rows = c.execute(sql, params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_key = None
+    if has_more:
+        last = rows[-1]
+        ats = last['latest_ats']
+        next_key = [last['match_score'], -1 if ats is None else ats, last['sub']]
+    # Best text matches first among equally scored rows (stable sort keeps the
+    # ATS/sub order for ties)
+    rows = sorted(rows, key=lambda r: (-r['match_score'], r['relevance']))
 
     candidates = []
-    role_lower = role_query.lower()
-    loc_lower = location.lower()
-
     for r in rows:
         roles = json.loads(r['desired_roles_json'] or '[]')
         locs = json.loads(r['desired_locations_json'] or '[]')
         kwds = json.loads(r['keywords_json'] or '[]')
-        profile_data = json.loads(r['data_json'] or '{}') if r['data_json'] else {}
+        profile_data = json.loads(_unpack(r['data_json'])) if r['data_json'] else {}
         identity = profile_data.get('identity', {})
-
-        # Simple keyword match score
-        match_score = 100
-        if role_lower:
-            role_match = any(role_lower in role.lower() for role in roles) or \
-                         any(role_lower in kw.lower() for kw in kwds)
-            if not role_match:
-                match_score -= 40
-        if loc_lower:
-            loc_match = any(loc_lower in loc.lower() for loc in locs)
-            if not loc_match:
-                match_score -= 30
-        if match_score <= 0:
-            continue
-
         candidates.append({
             'sub': r['sub'],
             'name': identity.get('full_name', 'Anonymous'),
@@ -638,25 +1934,51 @@ def search_candidates(
             'desired_locations': locs,
             'keywords': kwds,
             'latest_ats_score': r['latest_ats'],
-            'match_score': match_score,
+            'match_score': r['match_score'],
         })
-
-    return sorted(candidates, key=lambda x: x['match_score'], reverse=True)
+    return candidates, next_key
 
 
 # ---------------------------------------------------------------------------
 # GDPR: hard-delete all user data
 # ---------------------------------------------------------------------------
 
+def _uncount_user_rows(c, sub: str) -> None:
+    """Take a user's kits and CV analyses out of the day buckets they were
+    counted in, and their visibility out of today's."""
+    for metric, table in (('kits', 'kits'), ('cv_analyses', 'cv_analyses')):
+        for r in c.execute(
+            f'SELECT created_at / 86400 AS day, COUNT(*) AS n FROM {table} WHERE sub=? GROUP BY created_at / 86400',
+            (sub,)
+        ).fetchall():
+            _count(c, r['day'] * 86400, **{metric: -r['n']})
+    row = c.execute('SELECT visible FROM candidate_visibility WHERE sub=?', (sub,)).fetchone()
+    if row and row['visible']:
+        _count(c, int(time.time()), visible_candidates=-1)
+
+
 def delete_user_data(sub: str) -> Dict[str, Any]:
     """Remove all PII and generated content for a user. Keeps audit trail rows."""
     with _conn() as c:
+        # artifacts have no sub column; they go with their kits (ON DELETE CASCADE)
         tables = [
             'cv_analyses', 'candidate_visibility', 'profiles', 'jobs',
-            'kits', 'artifacts', 'applications', 'credit_ledger',
-            'verification_sessions', 'psychology_tests',
+            'kits', 'applications', 'credit_ledger', 'credit_balances', 'credit_holds',
+            'verification_sessions', 'verification_uploads', 'psychology_tests', 'user_activity',
         ]
         deleted: Dict[str, int] = {}
+        _unindex_candidate(c, sub)
+        for r in c.execute(
+            'SELECT doc_front_sha256, doc_back_sha256, video_sha256 FROM verification_sessions WHERE sub=?', (sub,)
+        ).fetchall():
+            for digest in r:
+                _blob_unref(c, digest)
+        staged = [r[0] for r in c.execute(
+            "SELECT id FROM verification_uploads WHERE sub=? AND status='open'", (sub,)
+        ).fetchall()]
+        for upload_id in staged:
+            _after_commit(lambda upload_id=upload_id: _blobs.upload_path(upload_id).unlink(missing_ok=True))
+        _uncount_user_rows(c, sub)
         for tbl in tables:
             cur = c.execute(f'DELETE FROM {tbl} WHERE sub=?', (sub,))
             deleted[tbl] = cur.rowcount
@@ -668,6 +1990,7 @@ def delete_user_data(sub: str) -> Dict[str, Any]:
         c.execute(
             "UPDATE users SET email='[deleted]@deleted' WHERE sub=?", (sub,)
         )
+    _seen_users.evict(sub)
     return {'deleted_rows': deleted}
 
 
@@ -677,20 +2000,15 @@ def delete_user_data(sub: str) -> Dict[str, Any]:
 
 def create_verification_session(
     session_id: str, sub: str, channel: str,
-    doc_front_b64: Optional[str] = None,
-    doc_back_b64: Optional[str] = None,
-    video_b64: Optional[str] = None,
     video_duration_s: Optional[float] = None,
 ) -> Dict[str, Any]:
     now = int(time.time())
     with _conn() as c:
         c.execute(
             '''INSERT INTO verification_sessions
-               (id, sub, status, channel, doc_front_b64, doc_back_b64,
-                video_b64, video_duration_s, created_at, updated_at)
-               VALUES (?,?,?,?,?,?,?,?,?,?)''',
-            (session_id, sub, 'pending', channel,
-             doc_front_b64, doc_back_b64, video_b64, video_duration_s, now, now)
+               (id, sub, status, channel, video_duration_s, created_at, updated_at)
+               VALUES (?,?,?,?,?,?,?)''',
+            (session_id, sub, 'pending', channel, video_duration_s, now, now)
         )
     return {'session_id': session_id, 'status': 'pending', 'created_at': _iso(now)}
 
@@ -699,7 +2017,7 @@ def update_verification_session(session_id: str, **kwargs: Any) -> None:
     now = int(time.time())
     allowed = {
         'status', 'channel', 'agent_sub', 'fraud_score', 'fraud_flags_json',
-        'manager_decision', 'manager_note', 'manager_sub', 'decided_at',
+        'video_duration_s', 'manager_decision', 'manager_note', 'manager_sub', 'decided_at',
     }
     sets = ', '.join(f'{k}=?' for k in kwargs if k in allowed)
     vals = [v for k, v in kwargs.items() if k in allowed]
@@ -743,12 +2061,235 @@ def list_pending_verifications(limit: int = 50) -> List[Dict[str, Any]]:
     return [dict(r) for r in rows]
 
 
-def get_session_doc(session_id: str, doc_type: str) -> Optional[str]:
-    """Return base64-encoded document — only for internal/manager use."""
-    col = 'doc_front_b64' if doc_type == 'front' else ('doc_back_b64' if doc_type == 'back' else 'video_b64')
+def _set_session_blob(c, session_id: str, doc_type: str,
+                      blob: Optional[Tuple[str, int, str]], now: int) -> bool:
+    """Point a session document at blob (digest, size, mime), or clear it.
+
+    Counts the new reference and drops the old one. The caller puts the file
+    in place (blobs.write / blobs.adopt) before the transaction commits.
+    """
+    prefix = _SESSION_DOCS[doc_type]
+    old = c.execute(
+        f'SELECT {prefix}_sha256 FROM verification_sessions WHERE id=?', (session_id,)
+    ).fetchone()
+    if old is None:
+        return False
+    digest, size, mime = blob or (None, None, None)
+    if digest:
+        _blob_ref(c, digest, size, mime)
+    c.execute(
+        f'''UPDATE verification_sessions
+            SET {prefix}_sha256=?, {prefix}_size=?, {prefix}_mime=?, {prefix}_b64=NULL, updated_at=?
+            WHERE id=?''',
+        (digest, size, mime, now, session_id)
+    )
+    _blob_unref(c, old[0])
+    return True
+
+
+def attach_session_documents(
+    session_id: str, documents: Dict[str, Optional[Tuple[bytes, str]]],
+) -> None:
+    """Store uploaded documents as blobs and point the session at them.
+
+    `documents` maps 'front' / 'back' / 'video' to (bytes, mime), or None to
+    clear that document. Blobs no longer referenced are deleted after commit.
+    """
+    now = int(time.time())
+    with _conn() as c:
+        for doc_type, doc in documents.items():
+            if doc is None:
+                _set_session_blob(c, session_id, doc_type, None, now)
+                continue
+            data, mime = doc
+            digest = _blobs.digest_of(data)
+            if _set_session_blob(c, session_id, doc_type, (digest, len(data), mime), now):
+                _blobs.write(data, digest)
+
+
+def get_session_doc(session_id: str, doc_type: str) -> Optional[Dict[str, Any]]:
+    """Return {'path', 'size', 'mime', 'sha256'} for a session document — only
+    for internal/manager use. Sessions still holding base64 are migrated first."""
+    prefix = _SESSION_DOCS[doc_type]
     with _conn() as c:
-        row = c.execute(f'SELECT {col} FROM verification_sessions WHERE id=?', (session_id,)).fetchone()
-        return row[0] if row else None
+        row = c.execute(
+            f'SELECT {prefix}_sha256, {prefix}_size, {prefix}_mime, {prefix}_b64 IS NOT NULL AS legacy '
+            'FROM verification_sessions WHERE id=?', (session_id,)
+        ).fetchone()
+        if row and row['legacy']:
+            _migrate_session_blobs(c, session_id)
+            row = c.execute(
+                f'SELECT {prefix}_sha256, {prefix}_size, {prefix}_mime '
+                'FROM verification_sessions WHERE id=?', (session_id,)
+            ).fetchone()
+    if not row or not row[0]:
+        return None
+    return {'path': _blobs.path_for(row[0]), 'size': row[1], 'mime': row[2], 'sha256': row[0]}
+
+
+def _migrate_session_blobs(c, session_id: str) -> bool:
+    """Move one session's legacy base64 columns into the blob store."""
+    row = c.execute(
+        'SELECT doc_front_b64, doc_back_b64, video_b64 FROM verification_sessions WHERE id=?',
+        (session_id,)
+    ).fetchone()
+    if row is None:
+        return False
+    now = int(time.time())
+    for doc_type, prefix in _SESSION_DOCS.items():
+        b64 = row[f'{prefix}_b64']
+        if b64 is None:
+            continue
+        try:
+            data, mime = _blobs.decode_data_url(b64, 'video/mp4' if doc_type == 'video' else 'image/jpeg')
+        except ValueError:
+            log.warning('session %s: %s is not valid base64; left in place', session_id, prefix)
+            continue
+        digest = _blobs.digest_of(data)
+        _set_session_blob(c, session_id, doc_type, (digest, len(data), mime), now)
+        _blobs.write(data, digest)
+    return True
+
+
+def migrate_session_blobs(batch_size: int = 20) -> int:
+    """Move every session's base64 documents into the blob store, committing
+    per batch. Returns the number of sessions migrated."""
+    moved, last_id = 0, ''
+    while True:
+        with _conn() as c:
+            ids = [r[0] for r in c.execute(
+                '''SELECT id FROM verification_sessions
+                   WHERE id > ? AND (doc_front_b64 IS NOT NULL OR doc_back_b64 IS NOT NULL OR video_b64 IS NOT NULL)
+                   ORDER BY id LIMIT ?''',
+                (last_id, batch_size)
+            ).fetchall()]
+            for session_id in ids:
+                moved += _migrate_session_blobs(c, session_id)
+        if len(ids) < batch_size:
+            return moved
+        last_id = ids[-1]
+
+
+# ---------------------------------------------------------------------------
+# Blob references
+# ---------------------------------------------------------------------------
+
+def _blob_ref(c, digest: str, size: int, mime: str) -> None:
+    """Count a new reference to a blob.
+
+    Callers write the file only after this upsert, in the same transaction,
+    so a concurrent _collect_blob() (which deletes the row first) cannot
+    remove the file out from under them.
+    """
+    c.execute(
+        '''INSERT INTO blobs (sha256, size, mime, refcount, created_at) VALUES (?,?,?,1,?)
+           ON CONFLICT(sha256) DO UPDATE SET refcount=blobs.refcount+1''',
+        (digest, size, mime, int(time.time()))
+    )
+
+
+def _blob_unref(c, digest: Optional[str]) -> None:
+    if not digest:
+        return
+    c.execute('UPDATE blobs SET refcount=refcount-1 WHERE sha256=?', (digest,))
+    _after_commit(lambda: _collect_blob(digest))
+
+
+def _collect_blob(digest: str) -> None:
+    with _conn() as c:
+        rows = c.execute(
+            'DELETE FROM blobs WHERE sha256=? AND refcount<=0 RETURNING sha256', (digest,)
+        ).fetchall()
+        if rows:
+            _blobs.remove(digest)
+
+
+def collect_blobs(min_age_s: int = 3600) -> Dict[str, int]:
+    """Delete unreferenced blobs, plus files older than `min_age_s` with no
+    row at all (left behind by transactions that rolled back), and expire
+    chunked uploads left unfinished for VERIFY_UPLOAD_TTL_S."""
+    with _conn() as c:
+        dead = [r[0] for r in c.execute('SELECT sha256 FROM blobs WHERE refcount<=0').fetchall()]
+    for digest in dead:
+        _collect_blob(digest)
+    cutoff = time.time() - min_age_s
+    orphans = 0
+    for digest, path in _blobs.iter_digests():
+        with _conn() as c:
+            known = c.execute('SELECT 1 FROM blobs WHERE sha256=?', (digest,)).fetchone()
+            if not known and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                orphans += 1
+    return {'unreferenced': len(dead), 'orphaned_files': orphans,
+            'expired_uploads': expire_verification_uploads()}
+
+
+# ---------------------------------------------------------------------------
+# Chunked verification uploads
+# ---------------------------------------------------------------------------
+
+_UPLOAD_TTL_S = int(os.getenv('VERIFY_UPLOAD_TTL_S', '86400'))
+
+
+def create_verification_upload(upload_id: str, session_id: str, sub: str,
+                               doc_type: str, size: int, mime: str) -> Dict[str, Any]:
+    now = int(time.time())
+    with _conn() as c:
+        c.execute(
+            '''INSERT INTO verification_uploads
+               (id, session_id, sub, doc_type, size, mime, status, created_at, updated_at)
+               VALUES (?,?,?,?,?,?,?,?,?)''',
+            (upload_id, session_id, sub, doc_type, size, mime, 'open', now, now)
+        )
+    return {'upload_id': upload_id, 'status': 'open', 'expires_at': _iso(now + _UPLOAD_TTL_S)}
+
+
+def get_verification_upload(upload_id: str) -> Optional[Dict[str, Any]]:
+    with _conn() as c:
+        row = c.execute('SELECT * FROM verification_uploads WHERE id=?', (upload_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def attach_session_upload(upload_id: str, digest: str) -> bool:
+    """Finalise an open upload whose staged file hashes to `digest`: move the
+    file into the blob store and attach it to the session."""
+    now = int(time.time())
+    with _conn() as c:
+        rows = c.execute(
+            '''UPDATE verification_uploads SET status='finalized', sha256=?, updated_at=?
+               WHERE id=? AND status='open'
+               RETURNING session_id, doc_type, size, mime''',
+            (digest, now, upload_id)
+        ).fetchall()
+        if not rows:
+            return False
+        up = rows[0]
+        if not _set_session_blob(c, up['session_id'], up['doc_type'], (digest, up['size'], up['mime']), now):
+            return False
+        _blobs.adopt(_blobs.upload_path(upload_id), digest)
+    return True
+
+
+def expire_verification_uploads() -> int:
+    """Drop open uploads older than VERIFY_UPLOAD_TTL_S and their staged bytes."""
+    now = int(time.time())
+    with _conn() as c:
+        ids = [r[0] for r in c.execute(
+            '''UPDATE verification_uploads SET status='expired', updated_at=?
+               WHERE status='open' AND created_at < ?
+               RETURNING id''',
+            (now, now - _UPLOAD_TTL_S)
+        ).fetchall()]
+        live = {r[0] for r in c.execute(
+            "SELECT id FROM verification_uploads WHERE status='open'"
+        ).fetchall()}
+    for upload_id in ids:
+        _blobs.upload_path(upload_id).unlink(missing_ok=True)
+    # Staged files whose row never committed (or was erased with the user)
+    for upload_id, path in _blobs.iter_uploads():
+        if upload_id not in live and path.stat().st_mtime < now - _UPLOAD_TTL_S:
+            path.unlink(missing_ok=True)
+    return len(ids)
 
 
 # ---------------------------------------------------------------------------
@@ -762,9 +2303,13 @@ def save_psychology_test(
     now = int(time.time())
     with _conn() as c:
         c.execute(
-            '''INSERT OR REPLACE INTO psychology_tests
+            '''INSERT INTO psychology_tests
                (id, sub, answers_json, score, flags_json, passed, duration_ms, created_at)
-               VALUES (?,?,?,?,?,?,?,?)''',
+               VALUES (?,?,?,?,?,?,?,?)
+               ON CONFLICT(id) DO UPDATE SET
+                 sub=excluded.sub, answers_json=excluded.answers_json, score=excluded.score,
+                 flags_json=excluded.flags_json, passed=excluded.passed,
+                 duration_ms=excluded.duration_ms, created_at=excluded.created_at''',
             (test_id, sub,
              json.dumps(answers, ensure_ascii=False),
              score,
@@ -822,10 +2367,10 @@ def resolve_guarantee_request(req_id: str, credits_refunded: int, reviewed_by: s
 def get_user_guarantee_status(sub: str) -> Dict[str, Any]:
     now = int(time.time())
     with _conn() as c:
-        # Kits generated (active search indicator)
-        kit_count = c.execute('SELECT COUNT(*) FROM kits WHERE sub=?', (sub,)).fetchone()[0]
-        # Days since first kit
-        first_kit = c.execute('SELECT MIN(created_at) FROM kits WHERE sub=?', (sub,)).fetchone()[0]
+        # Kits generated (active search indicator) and days since the first one
+        activity = c.execute('SELECT kit_count, first_kit_at FROM user_activity WHERE sub=?', (sub,)).fetchone()
+        kit_count = activity['kit_count'] if activity else 0
+        first_kit = activity['first_kit_at'] if activity else None
         days_active = int((now - first_kit) / 86400) if first_kit else 0
         # Pending request
         req = c.execute(
@@ -839,3 +2384,207 @@ def get_user_guarantee_status(sub: str) -> Dict[str, Any]:
         'eligible_for_refund': eligible,
         'existing_request': dict(req) if req else None,
     }
+
+
+# ---------------------------------------------------------------------------
+# Compressed columns
+# ---------------------------------------------------------------------------
+
+# Large text columns written through _pack() and read through _unpack()
+_COMPRESSED_COLUMNS = (
+    ('jobs', 'raw_text'),
+    ('cv_analyses', 'raw_text'),
+    ('kits', 'artifacts_json'),
+    ('stripe_events', 'raw_json'),
+    ('profiles', 'data_json'),
+)
+_RECOMPRESS_BATCH = 200
+
+
+def recompress_columns() -> Dict[str, int]:
+    """Rewrite compressible column values not yet in the current encoding
+    (rows from before compression, or an older dictionary). Returns rows
+    rewritten per table.column."""
+    with _conn() as c:
+        return _recompress_columns(c)
+
+
+def _recompress_columns(c) -> Dict[str, int]:
+    binary = _BACKEND != 'postgres'
+    # Outside a transaction (Postgres migration connection) each batch
+    # commits on its own, so no large table is rewritten in one go
+    own_batches = _BACKEND == 'postgres' and not c.in_transaction
+    result = {}
+    for table, column in _COMPRESSED_COLUMNS:
+        rewritten, last = 0, ''
+        while True:
+            rows = c.execute(
+                f'SELECT id, {column} FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                (last, _RECOMPRESS_BATCH)
+            ).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            stale = []
+            for r in rows:
+                stored = bytes(r[1]) if isinstance(r[1], memoryview) else r[1]
+                value = _codec.encode(_codec.decode(stored), binary)
+                if value != stored:
+                    stale.append((value, r[0]))
+            if stale:
+                if own_batches:
+                    with c.raw.transaction():
+                        c.executemany(f'UPDATE {table} SET {column}=? WHERE id=?', stale)
+                else:
+                    c.executemany(f'UPDATE {table} SET {column}=? WHERE id=?', stale)
+                rewritten += len(stale)
+        result[f'{table}.{column}'] = rewritten
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Schema migrations (engine in app/db/migrate.py)
+# ---------------------------------------------------------------------------
+# Append new migrations with the next version number; never edit or
+# renumber one that has shipped. Use _migrate.create_index() in a
+# transactional=False migration to build indexes on large tables online.
+
+def _m001_baseline(c) -> None:
+    """The schema as it stood before versioning. Idempotent, so it also
+    adopts databases created by earlier releases, adding the columns and
+    derived tables those may be missing."""
+    if _BACKEND == 'postgres':
+        existing = {r[0] for r in c.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = current_schema()"
+        ).fetchall()}
+        had_latest_ats = c.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+            "AND table_name = 'candidate_visibility' AND column_name = 'latest_ats'"
+        ).fetchone() is not None
+        _migrate.run_script(c, _pg.SCHEMA_PATH.read_text(encoding='utf-8'))
+        backfill_ats = 'candidate_visibility' in existing and not had_latest_ats
+    else:
+        existing = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        # Columns added after a table first shipped; must exist before the
+        # schema script creates indexes on them
+        backfill_ats = bool(_ensure_columns(c, 'candidate_visibility', {'latest_ats': 'INTEGER'}))
+        _ensure_columns(c, 'verification_sessions', _SESSION_BLOB_COLUMNS)
+        _migrate.run_script(c, _SCHEMA_SQL)
+
+    if backfill_ats:
+        _backfill_latest_ats(c)
+    # Existing databases: seed derived tables from their sources once
+    if 'credit_balances' not in existing:
+        _rebuild_credit_balances(c)
+    if 'candidate_search' not in existing:
+        _rebuild_candidate_search(c)
+
+
+def _add_counter_time_columns(c) -> None:
+    # When verification / opt-in was last switched on (see _rebuild_platform_counters)
+    if _BACKEND == 'postgres':
+        c.execute('ALTER TABLE users ADD COLUMN IF NOT EXISTS verified_at BIGINT')
+        c.execute('ALTER TABLE candidate_visibility ADD COLUMN IF NOT EXISTS visible_since BIGINT')
+    else:
+        _ensure_columns(c, 'users', {'verified_at': 'INTEGER'})
+        _ensure_columns(c, 'candidate_visibility', {'visible_since': 'INTEGER'})
+
+
+def _m002_platform_counters(c) -> None:
+    _add_counter_time_columns(c)
+    c.execute(
+        '''CREATE TABLE IF NOT EXISTS platform_counters (
+               day INTEGER NOT NULL,      -- days since the epoch (UTC)
+               metric TEXT NOT NULL,      -- one of _COUNTER_METRICS
+               delta INTEGER NOT NULL,    -- net change recorded that day
+               PRIMARY KEY (day, metric)
+           )'''
+    )
+    _rebuild_platform_counters(c)
+
+
+def _m003_user_activity(c) -> None:
+    c.execute(
+        '''CREATE TABLE IF NOT EXISTS user_activity (
+               sub TEXT PRIMARY KEY,
+               kit_count INTEGER NOT NULL DEFAULT 0,
+               first_kit_at BIGINT,
+               last_kit_at BIGINT,
+               last_cv_at BIGINT,
+               last_login_at BIGINT,
+               created_at BIGINT NOT NULL
+           )'''
+    )
+    c.execute('CREATE INDEX IF NOT EXISTS user_activity_idle_idx '
+              'ON user_activity ((COALESCE(last_kit_at, created_at)), sub)')
+    c.execute('CREATE INDEX IF NOT EXISTS guarantee_requests_sub_idx ON guarantee_requests(sub, created_at DESC)')
+    _rebuild_user_activity(c)
+
+
+def _m004_listing_indexes(c) -> None:
+    # Keyset pages of list_kits()/list_cv_analyses(); built online on Postgres
+    _migrate.create_index(c, 'kits_sub_time_idx', 'kits', 'sub, created_at DESC, id DESC')
+    _migrate.create_index(c, 'cv_analyses_sub_time_idx', 'cv_analyses', 'sub, created_at DESC, id DESC')
+    _migrate.drop_index(c, 'cv_analyses_sub_idx')
+
+
+def _m005_audit_archive(c) -> None:
+    c.execute(
+        '''CREATE TABLE IF NOT EXISTS audit_segments (
+               name TEXT PRIMARY KEY,       -- path under AUDIT_ARCHIVE_DIR
+               first_id BIGINT NOT NULL,
+               last_id BIGINT NOT NULL,
+               first_at BIGINT NOT NULL,
+               last_at BIGINT NOT NULL,
+               row_count INTEGER NOT NULL,
+               bytes BIGINT NOT NULL,
+               sha256 TEXT NOT NULL,
+               created_at BIGINT NOT NULL
+           )'''
+    )
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS audit_segments_last_id_idx ON audit_segments(last_id)')
+    _migrate.create_index(c, 'audits_tenant_time_idx', 'audits', 'tenant_id, created_at')
+    _migrate.create_index(c, 'audits_target_idx', 'audits', 'target_type, target_id')
+
+
+def _m006_compress_columns(c) -> None:
+    _recompress_columns(c)
+
+
+def _m007_counter_times(c) -> None:
+    # So a counters rebuild buckets verifications and opt-ins on the day the
+    # live counts did; existing rows keep the timestamps the rebuild used before
+    _add_counter_time_columns(c)
+    c.execute('UPDATE users SET verified_at = created_at WHERE verifyid_verified = 1 AND verified_at IS NULL')
+    c.execute('UPDATE candidate_visibility SET visible_since = updated_at WHERE visible = 1 AND visible_since IS NULL')
+
+
+_MIGRATIONS = [
+    _migrate.Migration(1, 'baseline', _m001_baseline),
+    _migrate.Migration(2, 'platform_counters', _m002_platform_counters),
+    _migrate.Migration(3, 'user_activity', _m003_user_activity),
+    _migrate.Migration(4, 'listing_indexes', _m004_listing_indexes, transactional=False),
+    _migrate.Migration(5, 'audit_archive', _m005_audit_archive, transactional=False),
+    _migrate.Migration(6, 'compress_columns', _m006_compress_columns, transactional=False),
+    _migrate.Migration(7, 'counter_times', _m007_counter_times),
+]
+
+
+def migrate_schema() -> List[int]:
+    """Apply pending migrations (one process at a time); returns the versions applied."""
+    if _BACKEND == 'postgres':
+        applied = _migrate.upgrade_postgres(_MIGRATIONS)
+    else:
+        applied = _migrate.upgrade_sqlite(_DB_PATH, _MIGRATIONS)
+    if applied:
+        _seen_users.clear()
+    return applied
+
+
+def schema_version() -> Tuple[int, int]:
+    """(version the database is at, latest version this code knows)."""
+    if _BACKEND == 'postgres':
+        current = _migrate.current_postgres()
+    else:
+        current = _migrate.current_sqlite(_DB_PATH)
+    return current, _migrate.latest(_MIGRATIONS)
@@ -5,7 +5,10 @@ import os
 from flask import Blueprint, jsonify, request
 
 from ..utils.auth import require_auth
-from ..db.store import upsert_user, get_job, get_balance, add_credits, write_audit
+from ..db.store import (
+    upsert_user, get_job, get_balance, reserve_credits, commit_credits,
+    release_credits, write_audit,
+)
 from ..services.ai_core import ats_score
 
 bp = Blueprint('ats', __name__, url_prefix='/v1/ats')
@@ -33,13 +36,17 @@ def score():
     if not job:
         return jsonify({'error': {'code': 'not_found', 'message': 'job_id not found or does not belong to user'}}), 404
 
-    bal = get_balance(u['sub'])
-    if bal < _COST_ATS:
-        return jsonify({'error': {'code': 'insufficient_credits', 'balance': bal, 'required': _COST_ATS}}), 402
+    hold = reserve_credits(u['sub'], _COST_ATS, reason='ats_score', ref_type='job', ref_id=job_id)
+    if not hold:
+        return jsonify({'error': {'code': 'insufficient_credits', 'balance': get_balance(u['sub']), 'required': _COST_ATS}}), 402
 
-    result = ats_score(cv_text, job.get('parsed') or {}, options)
+    try:
+        result = ats_score(cv_text, job.get('parsed') or {}, options)
+    except Exception:
+        release_credits(hold['hold_id'])
+        raise
 
-    add_credits(u['sub'], -_COST_ATS, reason='ats_score', ref_type='job', ref_id=job_id)
+    commit_credits(hold['hold_id'])
     write_audit(
         tenant_id=u.get('tenant_id') or 'default',
         actor_sub=u['sub'],
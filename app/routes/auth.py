@@ -1,4 +1,10 @@
-"""CareerForge native auth — email/password login, HS256 JWT."""
+"""CareerForge native auth — email/password login, HS256 JWT.
+
+Register and login are throttled per client IP and per email address
+(token buckets per worker process) before any password is hashed, and
+answer 429 when the password hashing pool is at capacity.
+"""
+import math
 import os
 from datetime import datetime, timedelta, timezone
 from flask import Blueprint, request, jsonify
@@ -6,6 +12,8 @@ import jwt
 
 from ..db.store import create_account, verify_account, get_account_by_sub
 from ..utils.auth import require_auth
+from ..utils.pwhash import Saturated
+from ..utils.ratelimit import TokenBuckets
 
 bp = Blueprint('auth', __name__, url_prefix='/v1/auth')
 
@@ -14,6 +22,24 @@ _EXPIRE_MINUTES = int(os.getenv('JWT_EXPIRE_MINUTES', '1440'))  # 24 h default
 _ISSUER = os.getenv('JWT_ISSUER', 'careerforge')
 _AUDIENCE = os.getenv('JWT_AUDIENCE', 'careerforge')
 
+_ip_buckets = TokenBuckets(float(os.getenv('AUTH_IP_PER_MIN', '30')), int(os.getenv('AUTH_IP_BURST', '30')))
+_email_buckets = TokenBuckets(float(os.getenv('AUTH_EMAIL_PER_MIN', '5')), int(os.getenv('AUTH_EMAIL_BURST', '10')))
+
+
+def _too_many(error: str, retry_after: float):
+    seconds = max(1, math.ceil(retry_after))
+    resp = jsonify({'error': error, 'retry_after': seconds})
+    resp.headers['Retry-After'] = str(seconds)
+    return resp, 429
+
+
+def _throttle(email: str):
+    """429 response if this client or email address is over its rate, else None."""
+    wait = _ip_buckets.take(request.remote_addr or '')
+    if not wait and email:
+        wait = _email_buckets.take(email.lower())
+    return _too_many('too_many_requests', wait) if wait else None
+
 
 def _make_token(sub: str, email: str, full_name: str) -> str:
     now = datetime.now(timezone.utc)
@@ -42,7 +68,13 @@ def register():
         return jsonify({'error': 'email and password required'}), 400
     if len(password) < 8:
         return jsonify({'error': 'password must be at least 8 characters'}), 400
-    account = create_account(email, password, full_name)
+    throttled = _throttle(email)
+    if throttled:
+        return throttled
+    try:
+        account = create_account(email, password, full_name)
+    except Saturated:
+        return _too_many('auth_busy', 1)
     if account is None:
         return jsonify({'error': 'email_already_registered'}), 409
     token = _make_token(account['sub'], account['email'], account['full_name'])
@@ -56,7 +88,13 @@ def login():
     body = request.get_json(force=True) or {}
     email = (body.get('email') or '').strip()
     password = (body.get('password') or '').strip()
-    account = verify_account(email, password)
+    throttled = _throttle(email)
+    if throttled:
+        return throttled
+    try:
+        account = verify_account(email, password)
+    except Saturated:
+        return _too_many('auth_busy', 1)
     if not account:
         return jsonify({'error': 'invalid_credentials'}), 401
     token = _make_token(account['sub'], account['email'], account['full_name'])
@@ -1,14 +1,16 @@
 """
-GET  /v1/candidates/search  — recruiter: search opt-in candidate pool (1 credit per search)
+GET  /v1/candidates/search  — recruiter: search opt-in candidate pool (1 credit per page;
+                              pass `next_cursor` back as ?after= for the next page)
 DELETE /v1/user/data        — GDPR: hard-delete all user data
 """
 import os
 from flask import Blueprint, jsonify, request
 
 from ..utils.auth import require_auth
+from ..utils.cursor import decode_cursor, encode_cursor
 from ..db.store import (
-    upsert_user, get_balance, add_credits, write_audit,
-    search_candidates, delete_user_data,
+    upsert_user, get_balance, reserve_credits, commit_credits, release_credits,
+    write_audit, search_candidates, delete_user_data,
 )
 
 bp = Blueprint('candidates', __name__)
@@ -30,15 +32,27 @@ def candidate_search():
         offset = max(0, int(request.args.get('offset', 0)))
     except (ValueError, TypeError):
         limit, offset = 20, 0
-
-    bal = get_balance(u['sub'])
-    if bal < _COST_SEARCH:
+    try:
+        after = decode_cursor(request.args.get('after'), size=3)
+        if after and not (all(isinstance(v, (int, float)) for v in after[:2]) and isinstance(after[2], str)):
+            raise ValueError('malformed cursor')
+    except ValueError:
+        return jsonify({'error': {'code': 'invalid_cursor', 'message': 'after must be a next_cursor value'}}), 400
+
+    hold = reserve_credits(u['sub'], _COST_SEARCH, reason='candidate_search',
+                           ref_type='search', ref_id=role[:32])
+    if not hold:
         return jsonify({'error': {'code': 'insufficient_credits',
-                                  'balance': bal, 'required': _COST_SEARCH}}), 402
+                                  'balance': get_balance(u['sub']), 'required': _COST_SEARCH}}), 402
 
-    results = search_candidates(role_query=role, location=location, limit=limit, offset=offset)
+    try:
+        results, next_key = search_candidates(role_query=role, location=location,
+                                              limit=limit, offset=offset, after=after)
+    except Exception:
+        release_credits(hold['hold_id'])
+        raise
 
-    add_credits(u['sub'], -_COST_SEARCH, reason='candidate_search', ref_type='search', ref_id=role[:32])
+    commit_credits(hold['hold_id'])
     write_audit(
         tenant_id=u.get('tenant_id') or 'default',
         actor_sub=u['sub'],
@@ -49,8 +63,9 @@ def candidate_search():
     return jsonify({
         'candidates': results,
         'count': len(results),
+        'next_cursor': encode_cursor(next_key) if next_key else None,
         'credits_charged': _COST_SEARCH,
-        'balance_after': get_balance(u['sub']),
+        'balance_after': hold['balance_after'],
     }), 200
 
 
@@ -3,7 +3,7 @@ from flask import Blueprint, jsonify, request
 import stripe
 
 from ..utils.auth import require_auth
-from ..db.store import upsert_user, get_balance
+from ..db.store import commit_point, upsert_user, get_balance
 
 bp = Blueprint('credits', __name__, url_prefix='/v1/credits')
 
@@ -45,6 +45,7 @@ def checkout_session():
 
     mode = 'subscription' if pack.startswith('sub_') else 'payment'
 
+    commit_point()
     s = _stripe().checkout.Session.create(
         mode=mode,
         line_items=[{'price': price_id, 'quantity': 1}],
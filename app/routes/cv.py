@@ -1,6 +1,6 @@
 """
 POST /v1/cv/analyze   — upload PDF/text CV, get AI analysis + ATS score (2 credits)
-GET  /v1/cv/list      — list user's CV analyses
+GET  /v1/cv/list      — list user's CV analyses, newest first (?limit=, ?after=<next_cursor>)
 GET  /v1/cv/<id>      — get full analysis detail
 POST /v1/cv/visibility — opt-in/out of recruiter candidate pool
 """
@@ -14,9 +14,10 @@ from flask import Blueprint, jsonify, request
 import pdfplumber
 
 from ..utils.auth import require_auth
+from ..utils.cursor import decode_cursor, encode_cursor
 from ..db.store import (
-    upsert_user, get_balance, add_credits, write_audit,
-    save_cv_analysis, list_cv_analyses, get_cv_analysis,
+    upsert_user, get_balance, reserve_credits, commit_credits, release_credits,
+    write_audit, save_cv_analysis, list_cv_analyses, get_cv_analysis,
     set_candidate_visibility,
 )
 from ..services.ai_core import analyze_cv
@@ -79,14 +80,18 @@ def analyze():
         return jsonify({'error': {'code': 'invalid_request',
                                   'message': 'CV text is too short (min 50 characters)'}}), 400
 
-    bal = get_balance(u['sub'])
-    if bal < _COST_ANALYZE:
+    hold = reserve_credits(u['sub'], _COST_ANALYZE, reason='cv_analyze', ref_type='cv')
+    if not hold:
         return jsonify({'error': {'code': 'insufficient_credits',
-                                  'balance': bal, 'required': _COST_ANALYZE}}), 402
+                                  'balance': get_balance(u['sub']), 'required': _COST_ANALYZE}}), 402
 
     # Run analysis
     options = {}
-    analysis = analyze_cv(cv_text, options)
+    try:
+        analysis = analyze_cv(cv_text, options)
+    except Exception:
+        release_credits(hold['hold_id'])
+        raise
     ats_score_val = int(analysis.get('ats_score', 0))
 
     # Hash for attestation
@@ -115,7 +120,7 @@ def analyze():
             chain_res = {'error': str(exc)}
 
     # Burn credits & persist
-    add_credits(u['sub'], -_COST_ANALYZE, reason='cv_analyze', ref_type='cv', ref_id=artifact_sha[:16])
+    commit_credits(hold['hold_id'], ref_id=artifact_sha[:16])
     analysis_id = 'cva_' + uuid.uuid4().hex[:20]
     save_cv_analysis(
         analysis_id=analysis_id,
@@ -141,7 +146,7 @@ def analyze():
     return jsonify({
         'analysis_id': analysis_id,
         'credits_charged': _COST_ANALYZE,
-        'balance_after': get_balance(u['sub']),
+        'balance_after': hold['balance_after'],
         'analysis': analysis,
         'attestation': {
             'enabled': attest_enabled,
@@ -156,7 +161,18 @@ def analyze():
 @require_auth(['careerforge:read'])
 def list_analyses():
     u = request.thronos_user
-    return jsonify({'analyses': list_cv_analyses(u['sub'])}), 200
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except (ValueError, TypeError):
+        limit = 20
+    try:
+        after = decode_cursor(request.args.get('after'), size=2)
+        if after and not (isinstance(after[0], int) and isinstance(after[1], str)):
+            raise ValueError('malformed cursor')
+    except ValueError:
+        return jsonify({'error': {'code': 'invalid_cursor', 'message': 'after must be a next_cursor value'}}), 400
+    analyses, next_key = list_cv_analyses(u['sub'], limit=limit, after=after)
+    return jsonify({'analyses': analyses, 'next_cursor': encode_cursor(next_key) if next_key else None}), 200
 
 
 @bp.get('/<analysis_id>')
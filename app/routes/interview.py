@@ -5,7 +5,10 @@ import os
 from flask import Blueprint, jsonify, request
 
 from ..utils.auth import require_auth
-from ..db.store import upsert_user, get_job, get_profile, get_balance, add_credits, write_audit
+from ..db.store import (
+    upsert_user, get_job, get_profile, get_balance, reserve_credits,
+    commit_credits, release_credits, write_audit,
+)
 from ..services.ai_core import generate_interview_pack
 
 bp = Blueprint('interview', __name__, url_prefix='/v1/interview')
@@ -34,13 +37,17 @@ def prepare():
     profile_rec = get_profile(u['sub'])
     profile_data = profile_rec['data'] if profile_rec else {}
 
-    bal = get_balance(u['sub'])
-    if bal < _COST:
-        return jsonify({'error': {'code': 'insufficient_credits', 'balance': bal, 'required': _COST}}), 402
+    hold = reserve_credits(u['sub'], _COST, reason='interview_prepare', ref_type='job', ref_id=job_id)
+    if not hold:
+        return jsonify({'error': {'code': 'insufficient_credits', 'balance': get_balance(u['sub']), 'required': _COST}}), 402
 
-    pack = generate_interview_pack(profile_data, job, company_context)
+    try:
+        pack = generate_interview_pack(profile_data, job, company_context)
+    except Exception:
+        release_credits(hold['hold_id'])
+        raise
 
-    add_credits(u['sub'], -_COST, reason='interview_prepare', ref_type='job', ref_id=job_id)
+    commit_credits(hold['hold_id'])
     write_audit(
         tenant_id=u.get('tenant_id') or 'default',
         actor_sub=u['sub'],
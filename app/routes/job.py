@@ -11,7 +11,7 @@ from flask import Blueprint, jsonify, request
 import requests as http_requests
 
 from ..utils.auth import require_auth
-from ..db.store import upsert_user, upsert_job, get_job, write_audit
+from ..db.store import commit_point, upsert_user, upsert_job, get_job, write_audit
 from ..services.ai_core import parse_job
 from ..services.country_context import country_summary, list_countries
 
@@ -27,6 +27,7 @@ _REMOTEOK_UA = 'CareerForge/1.0 (jobs integration)'
 
 def _fetch_remoteok(tag: str = '', limit: int = 20) -> list:
     url = _REMOTEOK_BASE if not tag else f'{_REMOTEOK_BASE}?tag={tag}'
+    commit_point()
     try:
         r = http_requests.get(url, timeout=10, headers={'User-Agent': _REMOTEOK_UA})
         r.raise_for_status()
@@ -1,5 +1,5 @@
 """
-GET  /v1/kit/list     — list user's kits
+GET  /v1/kit/list     — list user's kits, newest first (?limit=, ?after=<next_cursor>)
 POST /v1/kit/generate — full Application Kit generation with credit burn + chain attestation
 """
 import os
@@ -9,9 +9,10 @@ import hashlib
 from flask import Blueprint, jsonify, request
 
 from ..utils.auth import require_auth
+from ..utils.cursor import decode_cursor, encode_cursor
 from ..db.store import (
-    upsert_user, get_balance, add_credits, save_kit, list_kits,
-    get_job, get_profile, get_kit_by_idempotency, write_audit,
+    upsert_user, get_balance, reserve_credits, commit_credits, release_credits,
+    save_kit, list_kits, get_job, get_profile, get_kit_by_idempotency, write_audit,
 )
 from ..services.attestation import build_ai_attestation_payload, build_ai_attestation_tx
 from ..services.chain_client import submit_tx
@@ -32,17 +33,28 @@ _COSTS = {
 @require_auth(['careerforge:read'])
 def kits_list():
     u = request.thronos_user
-    return jsonify({'kits': list_kits(u['sub'])})
+    try:
+        limit = max(1, min(int(request.args.get('limit', 25)), 100))
+    except (ValueError, TypeError):
+        limit = 25
+    try:
+        after = decode_cursor(request.args.get('after'), size=2)
+        if after and not (isinstance(after[0], int) and isinstance(after[1], str)):
+            raise ValueError('malformed cursor')
+    except ValueError:
+        return jsonify({'error': {'code': 'invalid_cursor', 'message': 'after must be a next_cursor value'}}), 400
+    kits, next_key = list_kits(u['sub'], limit=limit, after=after)
+    return jsonify({'kits': kits, 'next_cursor': encode_cursor(next_key) if next_key else None})
 
 
 @bp.post('/generate')
 @require_auth(['careerforge:write'])
 def generate():
     """Full Application Kit generation:
-    1. Validate request + check credits
+    1. Validate request + reserve credits
     2. Idempotency check (Idempotency-Key header or body field)
     3. Call AI core (or stub) for kit content
-    4. Burn credits + write ledger
+    4. Commit the credit hold (released instead if generation fails)
     5. Hash artifacts + submit AI_ATTESTATION to chain
     6. Persist kit + return response
     """
@@ -85,17 +97,21 @@ def generate():
         return jsonify({'error': {'code': 'invalid_request', 'message': f"kit_kind must be one of {list(_COSTS)}"}}), 400
 
     cost = _COSTS[kind]
-    bal = get_balance(u['sub'])
-    if bal < cost:
-        return jsonify({'error': {'code': 'insufficient_credits', 'balance': bal, 'required': cost}}), 402
-
-    # Load job + profile
-    job = get_job(job_id, u['sub']) if job_id else {}
-    profile_rec = get_profile(u['sub'])
-    profile_data = profile_rec['data'] if profile_rec else {}
-
-    # Generate kit via AI core (or stub)
-    kit_content = generate_kit(profile_data, job or {}, outputs, constraints)
+    hold = reserve_credits(u['sub'], cost, reason='kit_generate', ref_type='kit', ref_id=job_id or kind)
+    if not hold:
+        return jsonify({'error': {'code': 'insufficient_credits', 'balance': get_balance(u['sub']), 'required': cost}}), 402
+
+    try:
+        # Load job + profile
+        job = get_job(job_id, u['sub']) if job_id else {}
+        profile_rec = get_profile(u['sub'])
+        profile_data = profile_rec['data'] if profile_rec else {}
+
+        # Generate kit via AI core (or stub)
+        kit_content = generate_kit(profile_data, job or {}, outputs, constraints)
+    except Exception:
+        release_credits(hold['hold_id'])
+        raise
 
     artifacts_json = json.dumps(kit_content, ensure_ascii=False, sort_keys=True)
     artifact_sha = hashlib.sha256(artifacts_json.encode('utf-8')).hexdigest()
@@ -125,7 +141,7 @@ def generate():
             chain_res = {'error': str(exc)}
 
     # Burn credits
-    add_credits(u['sub'], -cost, reason='kit_generate', ref_type='kit', ref_id=job_id or kind)
+    commit_credits(hold['hold_id'])
 
     # Persist kit
     kit_id = 'kit_' + uuid.uuid4().hex[:20]
@@ -155,7 +171,7 @@ def generate():
     return jsonify({
         'kit_id': kit_id,
         'credits_charged': cost,
-        'balance_after': get_balance(u['sub']),
+        'balance_after': hold['balance_after'],
         'artifacts': kit_content,
         'attestation': {
             'enabled': attest_enabled,
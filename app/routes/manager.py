@@ -3,7 +3,7 @@ Manager Review Portal
 ========================
 GET  /v1/manager/pending              — list sessions awaiting manual review
 GET  /v1/manager/session/<id>         — full session details (no binary blobs)
-GET  /v1/manager/session/<id>/doc/<t> — serve document inline (front|back|video)
+GET  /v1/manager/session/<id>/doc/<t> — stream document inline (front|back|video; Range supported)
 POST /v1/manager/session/<id>/review  — submit approve/reject decision
 
 Security
@@ -11,17 +11,17 @@ Security
 - Requires role claim `careerforge:manager` in the JWT.
 - Documents are served inline via Content-Disposition: inline to prevent
   downloads while still allowing browser/iframe display.
-- The raw base64 is NEVER returned in JSON responses.
+- Document bytes are NEVER returned in JSON responses; they are read from
+  the blob store (app/db/blobs.py) only by the /doc/<t> endpoint.
 """
-import base64
 import json
 import mimetypes
-from flask import Blueprint, jsonify, request, Response
+from flask import Blueprint, jsonify, request, send_file
 
 from ..utils.auth import require_auth
 from ..db.store import (
     list_pending_verifications, get_verification_session,
-    get_session_doc, update_verification_session, _conn,
+    get_session_doc, update_verification_session, mark_user_verified, _conn,
 )
 
 bp = Blueprint('manager', __name__, url_prefix='/v1/manager')
@@ -94,39 +94,26 @@ def view_doc(session_id: str, doc_type: str):
     if doc_type not in ('front', 'back', 'video'):
         return jsonify({'error': {'code': 'invalid_request', 'message': 'doc_type must be front|back|video'}}), 400
 
-    b64_data = get_session_doc(session_id, doc_type)
-    if not b64_data:
+    doc = get_session_doc(session_id, doc_type)
+    if not doc:
         return jsonify({'error': {'code': 'not_found', 'message': 'Document not found'}}), 404
 
-    # Strip data-URL prefix if present
-    if ',' in b64_data:
-        header, b64_data = b64_data.split(',', 1)
-        # Extract mime from header: "data:image/jpeg;base64"
-        mime_part = header.split(':')[1].split(';')[0] if ':' in header else ''
-    else:
-        mime_part = ''
-
-    # Determine MIME type
-    if doc_type == 'video':
-        content_type = mime_part or 'video/mp4'
-    else:
-        content_type = mime_part or 'image/jpeg'
-
-    b64_data += '=' * (-len(b64_data) % 4)
+    content_type = doc['mime'] or ('video/mp4' if doc_type == 'video' else 'image/jpeg')
+    # Streamed from disk in chunks; conditional=True answers Range requests
+    # with 206 partial content so the video player can seek
     try:
-        raw_bytes = base64.b64decode(b64_data)
-    except Exception:
-        return jsonify({'error': {'code': 'server_error', 'message': 'Could not decode document'}}), 500
+        resp = send_file(doc['path'], mimetype=content_type, conditional=True, etag=doc['sha256'])
+    except OSError:
+        return jsonify({'error': {'code': 'server_error', 'message': 'Document file is missing'}}), 500
 
     # Content-Disposition: inline prevents downloads while allowing display
-    headers = {
+    resp.headers.update({
         'Content-Disposition': 'inline',
         'Cache-Control': 'no-store, no-cache',
         'X-Content-Type-Options': 'nosniff',
         'Content-Security-Policy': "default-src 'none'",
-    }
-
-    return Response(raw_bytes, status=200, mimetype=content_type, headers=headers)
+    })
+    return resp
 
 
 @bp.post('/session/<session_id>/review')
@@ -165,8 +152,7 @@ def review(session_id: str):
     )
 
     if decision == 'approved':
-        with _conn() as c:
-            c.execute('UPDATE users SET verifyid_verified=1 WHERE sub=?', (session['sub'],))
+        mark_user_verified(session['sub'])
 
     return jsonify({
         'session_id': session_id,
@@ -8,7 +8,8 @@ Flow A — Profile & Kit bootstrap
                                    to create baseline profile and first kit.
 
 Flow B — Job match → email/kit decision
-  GET  /v1/n8n/inactive-users     Poll users idle for N days (threshold_days param).
+  GET  /v1/n8n/inactive-users     Poll users idle for N days (days param; paginated,
+                                   follow next_cursor via ?after=).
   POST /v1/n8n/send-alert         Log that n8n sent an email to a user.
 
 Flow C — Daily job alert drip (email)
@@ -24,14 +25,22 @@ Flow E — AI Interview Coach trigger
                                    returns interview prepare endpoint + user profile summary.
 
 Platform stats
-  GET  /v1/n8n/stats              Aggregate KPIs for n8n dashboard reporting.
+  GET  /v1/n8n/stats              Aggregate KPIs for n8n dashboard reporting, plus
+                                   a per-day series (?days=N, max 90).
+  GET  /v1/n8n/perf-stats         Per-statement DB latency (p50/p95/p99) and recent
+                                   slow queries for the answering worker (needs
+                                   DB_QUERY_STATS=1), plus AI core call latency
+                                   and connection reuse.
 """
 import os
 import time
 from functools import wraps
 from flask import Blueprint, jsonify, request
 
-from ..db.store import _conn  # internal helper — read-only queries
+# Reporting scans use a read-only connection (replica on Postgres) so they
+# never hold locks or snapshots the write path needs
+from ..db.store import _conn, _read_conn  # internal helpers
+from ..utils.cursor import decode_cursor, encode_cursor
 
 bp = Blueprint('n8n', __name__, url_prefix='/v1/n8n')
 
@@ -52,53 +61,55 @@ def _require_n8n_secret(f):
 @bp.get('/inactive-users')
 @_require_n8n_secret
 def inactive_users():
-    """Return users whose last kit was more than `days` days ago (or who never generated one)."""
+    """
+    Return users whose last kit was more than `days` days ago (or who never
+    generated one), least recently active first. Pages of `limit` users
+    (default 1000); pass `next_cursor` back as ?after= for the next page.
+    """
+    from ..db.store import list_inactive_users
     try:
         days = max(1, min(int(request.args.get('days', 3)), 90))
     except (ValueError, TypeError):
         days = 3
+    try:
+        limit = max(1, min(int(request.args.get('limit', 1000)), 5000))
+    except (ValueError, TypeError):
+        limit = 1000
+    try:
+        after = decode_cursor(request.args.get('after'), size=2)
+        if after and not (isinstance(after[0], int) and isinstance(after[1], str)):
+            raise ValueError('malformed cursor')
+    except ValueError:
+        return jsonify({'error': {'code': 'invalid_cursor', 'message': 'after must be a next_cursor value'}}), 400
 
-    cutoff = int(time.time()) - days * 86400
-
-    with _conn() as c:
-        # Users who never generated a kit
-        no_kit_rows = c.execute('''
-            SELECT u.sub, u.email, u.created_at
-            FROM users u
-            LEFT JOIN kits k ON k.sub = u.sub
-            WHERE k.sub IS NULL
-              AND u.created_at < ?
-        ''', (cutoff,)).fetchall()
-
-        # Users whose last kit was before the cutoff
-        inactive_rows = c.execute('''
-            SELECT u.sub, u.email, MAX(k.created_at) AS last_kit_at
-            FROM users u
-            JOIN kits k ON k.sub = u.sub
-            GROUP BY u.sub
-            HAVING MAX(k.created_at) < ?
-        ''', (cutoff,)).fetchall()
+    now = int(time.time())
+    rows, next_key = list_inactive_users(now - days * 86400, limit=limit, after=after)
 
     result = []
-    for r in no_kit_rows:
-        result.append({
-            'sub': r['sub'],
-            'email': r['email'],
-            'reason': 'never_generated',
-            'days_inactive': days,
-        })
-    for r in inactive_rows:
-        last = r['last_kit_at'] or 0
-        days_ago = int((time.time() - last) / 86400)
-        result.append({
-            'sub': r['sub'],
-            'email': r['email'],
-            'reason': 'no_recent_kit',
-            'days_inactive': days_ago,
-            'last_kit_at': last,
-        })
+    for r in rows:
+        if not r['kit_count']:
+            result.append({
+                'sub': r['sub'],
+                'email': r['email'],
+                'reason': 'never_generated',
+                'days_inactive': days,
+            })
+        else:
+            last = r['last_kit_at'] or 0
+            result.append({
+                'sub': r['sub'],
+                'email': r['email'],
+                'reason': 'no_recent_kit',
+                'days_inactive': int((now - last) / 86400),
+                'last_kit_at': last,
+            })
 
-    return jsonify({'users': result, 'count': len(result), 'threshold_days': days})
+    return jsonify({
+        'users': result,
+        'count': len(result),
+        'threshold_days': days,
+        'next_cursor': encode_cursor(next_key) if next_key else None,
+    })
 
 
 @bp.post('/send-alert')
@@ -167,7 +178,7 @@ def job_alert_targets():
     and send personalised job alert emails via SendGrid.
     """
     import json as _json
-    with _conn() as c:
+    with _read_conn() as c:
         rows = c.execute('''
             SELECT cv.sub, u.email, cv.keywords_json, cv.desired_roles_json,
                    cv.desired_locations_json
@@ -276,29 +287,58 @@ def coach_trigger():
 @bp.get('/stats')
 @_require_n8n_secret
 def stats():
-    """Aggregate platform stats for n8n reporting workflows."""
-    now = int(time.time())
-    day_start = now - 86400
-    week_start = now - 7 * 86400
+    """
+    Aggregate platform stats for n8n reporting workflows, read from the
+    per-day platform_counters rollup. "today" is the current UTC day and
+    "this week" the last 7 UTC days; `series` has one entry per day for the
+    last `days` days (default 7, max 90).
+    """
+    from ..db.store import get_platform_counters
+    try:
+        days = max(1, min(int(request.args.get('days', 7)), 90))
+    except (ValueError, TypeError):
+        days = 7
 
-    with _conn() as c:
-        total_users = c.execute('SELECT COUNT(*) FROM users').fetchone()[0]
-        verified_users = c.execute('SELECT COUNT(*) FROM users WHERE verifyid_verified=1').fetchone()[0]
-        total_kits = c.execute('SELECT COUNT(*) FROM kits').fetchone()[0]
-        kits_today = c.execute('SELECT COUNT(*) FROM kits WHERE created_at >= ?', (day_start,)).fetchone()[0]
-        kits_week = c.execute('SELECT COUNT(*) FROM kits WHERE created_at >= ?', (week_start,)).fetchone()[0]
-        new_users_today = c.execute('SELECT COUNT(*) FROM users WHERE created_at >= ?', (day_start,)).fetchone()[0]
-        cv_analyses_total = c.execute('SELECT COUNT(*) FROM cv_analyses').fetchone()[0]
-        candidates_visible = c.execute('SELECT COUNT(*) FROM candidate_visibility WHERE visible=1').fetchone()[0]
+    counters = get_platform_counters(days=max(days, 7))
+    totals = counters['totals']
+    series = counters['series']
+    today = series[-1]
 
     return jsonify({
-        'total_users': total_users,
-        'verified_users': verified_users,
-        'total_kits': total_kits,
-        'kits_today': kits_today,
-        'kits_this_week': kits_week,
-        'new_users_today': new_users_today,
-        'cv_analyses_total': cv_analyses_total,
-        'candidates_in_pool': candidates_visible,
-        'generated_at': now,
+        'total_users': totals['users'],
+        'verified_users': totals['verified_users'],
+        'total_kits': totals['kits'],
+        'kits_today': today['kits'],
+        'kits_this_week': sum(d['kits'] for d in series[-7:]),
+        'new_users_today': today['users'],
+        'cv_analyses_total': totals['cv_analyses'],
+        'candidates_in_pool': totals['visible_candidates'],
+        'series': series[-days:],
+        'generated_at': int(time.time()),
     })
+
+
+@bp.get('/perf-stats')
+@_require_n8n_secret
+def perf_stats():
+    """
+    Store query timings collected by this worker process since it started
+    (or since the last ?reset=1), and its AI core call stats since it
+    started. Each gunicorn worker keeps its own, so `pid` says which one
+    answered.
+    """
+    from ..db import querystats
+    from ..services import ai_core
+    try:
+        top = max(1, min(int(request.args.get('top', 50)), 500))
+    except (ValueError, TypeError):
+        top = 50
+    snapshot = querystats.snapshot(top=top)
+    try:
+        snapshot['ai_core'] = ai_core.stats()
+    except Exception as exc:
+        # AI core stats are a side report; they must not take the DB timings down with them
+        snapshot['ai_core'] = {'error': str(exc)}
+    if request.args.get('reset') == '1':
+        querystats.reset()
+    return jsonify(snapshot)
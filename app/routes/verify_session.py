@@ -3,6 +3,11 @@ Identity Verification Pipeline
 ================================
 POST /v1/verify/start            — create a new verification session
 POST /v1/verify/upload           — upload documents + video (base64 JSON)
+POST /v1/verify/uploads          — open a chunked, resumable upload for one document
+GET  /v1/verify/uploads/<id>     — current offset of a chunked upload (also HEAD)
+PUT  /v1/verify/uploads/<id>     — append bytes at the Upload-Offset header
+POST /v1/verify/uploads/<id>/finalize — verify sha256 and attach to the session
+POST /v1/verify/complete         — submit a session whose documents were uploaded in chunks
 GET  /v1/verify/status           — get current user's session status
 GET  /v1/verify/session/<id>     — get any session by ID (manager / agent only)
 
@@ -11,27 +16,117 @@ Flow
 1. User calls /start  → status=pending, channel determined automatically:
      • if an agent is declared available (env AGENT_AVAILABLE=1) → channel=agent
      • otherwise → channel=ai
-2. User calls /upload with doc_front, doc_back, video
+2. User calls /upload with doc_front, doc_back, video — or, for large files,
+   opens one /uploads per document, PUTs raw bytes in order (resuming from
+   the offset GET reports after a dropped connection), finalizes each with
+   its sha256, then calls /complete
 3. If channel=ai:  fraud service runs immediately; if score<30 → approved,
                    if 30–65 → manager_review, if ≥65 → rejected
    If channel=agent: session waits for agent to complete video call externally,
                      then POST /v1/verify/session/<id>/agent-decision
 4. manager_review sessions surface in /v1/manager/pending
 """
+import fcntl
+import json
 import os
+import re
 import uuid
 from flask import Blueprint, jsonify, request
 
 from ..utils.auth import require_auth
+from ..db.blobs import decode_data_url, upload_path, file_digest
 from ..db.store import (
-    upsert_user, create_verification_session, update_verification_session,
-    get_verification_session, get_user_verification_session,
+    upsert_user, create_verification_session, update_verification_session, attach_session_documents,
+    get_verification_session, get_user_verification_session, mark_user_verified, get_session_doc,
+    create_verification_upload, get_verification_upload, attach_session_upload, _conn,
 )
-from ..services.fraud_detect import analyse as fraud_analyse
+from ..services.fraud_detect import analyse_files as fraud_analyse_files
 
 bp = Blueprint('verify', __name__, url_prefix='/v1/verify')
 
 _AGENT_AVAILABLE = os.getenv('AGENT_AVAILABLE', '0').strip() == '1'
+_UPLOAD_MAX_BYTES = int(float(os.getenv('VERIFY_UPLOAD_MAX_MB', '30')) * 1024 * 1024)
+_CHUNK_BYTES = 64 * 1024
+_DEFAULT_MIME = {'front': 'image/jpeg', 'back': 'image/jpeg', 'video': 'video/mp4'}
+
+
+def _error(code: str, message: str, status: int, **extra):
+    return jsonify({'error': {'code': code, 'message': message}, **extra}), status
+
+
+def _pending_session(session_id: str, sub: str):
+    """Return (session, None) if `sub` owns a pending session, else (None, error response)."""
+    if not session_id:
+        return None, _error('invalid_request', 'session_id required', 400)
+    session = get_verification_session(session_id)
+    if not session:
+        return None, _error('not_found', 'Session not found', 404)
+    if session['sub'] != sub:
+        return None, _error('forbidden', 'Not your session', 403)
+    if session['status'] not in ('pending',):
+        return None, _error('conflict', f"Session is already in status '{session['status']}'", 409)
+    return session, None
+
+
+def _submit(session: dict, sub: str, duration):
+    """Run the channel's review once a session's documents are stored."""
+    session_id = session['id']
+    update_verification_session(session_id, video_duration_s=float(duration) if duration else None)
+
+    # For AI channel: run fraud analysis immediately
+    if session['channel'] == 'ai':
+        # Get user's declared name for cross-check
+        with _conn() as c:
+            row = c.execute('SELECT full_name FROM auth_accounts WHERE sub=?', (sub,)).fetchone()
+            declared_name = row['full_name'] if row else ''
+
+        docs = {doc_type: get_session_doc(session_id, doc_type) for doc_type in ('front', 'back', 'video')}
+        result = fraud_analyse_files(
+            doc_front_path=docs['front'] and str(docs['front']['path']),
+            doc_back_path=docs['back'] and str(docs['back']['path']),
+            video_path=docs['video'] and str(docs['video']['path']),
+            video_duration_s=float(duration) if duration else None,
+            declared_name=declared_name,
+        )
+
+        fraud_score = result['fraud_score']
+        recommendation = result['recommendation']
+
+        new_status = {
+            'approve': 'approved',
+            'manual_review': 'manager_review',
+            'reject': 'rejected',
+        }.get(recommendation, 'manager_review')
+
+        update_verification_session(
+            session_id,
+            status=new_status,
+            fraud_score=fraud_score,
+            fraud_flags_json=json.dumps(result['flags']),
+        )
+
+        # If approved by AI, mark user as verified
+        if new_status == 'approved':
+            mark_user_verified(sub)
+
+        return jsonify({
+            'session_id': session_id,
+            'status': new_status,
+            'fraud_score': fraud_score,
+            'flags': result['flags'],
+            'message': {
+                'approved': 'Identity verified successfully.',
+                'manager_review': 'Documents received. A manager will review shortly.',
+                'rejected': 'Verification could not be completed. Please contact support.',
+            }.get(new_status, ''),
+        }), 200
+
+    # Agent channel: just store docs, session stays pending for agent action
+    return jsonify({
+        'session_id': session_id,
+        'status': 'pending',
+        'message': 'Documents uploaded. Your agent will review them during the video call.',
+    }), 200
 
 
 @bp.post('/start')
@@ -88,91 +183,206 @@ def upload():
     u = request.thronos_user
     body = request.get_json(force=True) or {}
 
-    session_id = body.get('session_id', '').strip()
-    if not session_id:
-        return jsonify({'error': {'code': 'invalid_request', 'message': 'session_id required'}}), 400
-
-    session = get_verification_session(session_id)
-    if not session:
-        return jsonify({'error': {'code': 'not_found', 'message': 'Session not found'}}), 404
-    if session['sub'] != u['sub']:
-        return jsonify({'error': {'code': 'forbidden', 'message': 'Not your session'}}), 403
-    if session['status'] not in ('pending',):
-        return jsonify({'error': {'code': 'conflict', 'message': f"Session is already in status '{session['status']}'"}}), 409
+    session, err = _pending_session(body.get('session_id', '').strip(), u['sub'])
+    if err:
+        return err
 
     doc_front = body.get('doc_front', '')
     doc_back = body.get('doc_back', '')
     video = body.get('video', '')
-    duration = body.get('video_duration_s')
 
     if not doc_front:
-        return jsonify({'error': {'code': 'invalid_request', 'message': 'doc_front is required'}}), 400
+        return _error('invalid_request', 'doc_front is required', 400)
 
-    # Persist uploads regardless of channel
-    update_verification_session(
-        session_id,
-        doc_front_b64=doc_front,
-        doc_back_b64=doc_back or None,
-        video_b64=video or None,
-        video_duration_s=float(duration) if duration else None,
-    )
-
-    # For AI channel: run fraud analysis immediately
-    if session['channel'] == 'ai':
-        # Get user's declared name for cross-check
-        from ..db.store import _conn
-        with _conn() as c:
-            row = c.execute('SELECT full_name FROM auth_accounts WHERE sub=?', (u['sub'],)).fetchone()
-            declared_name = row['full_name'] if row else ''
-
-        result = fraud_analyse(
-            doc_front_b64=doc_front,
-            doc_back_b64=doc_back or None,
-            video_b64=video or None,
-            video_duration_s=float(duration) if duration else None,
-            declared_name=declared_name,
-        )
+    try:
+        documents = {
+            'front': decode_data_url(doc_front, 'image/jpeg'),
+            'back': decode_data_url(doc_back, 'image/jpeg') if doc_back else None,
+            'video': decode_data_url(video, 'video/mp4') if video else None,
+        }
+    except ValueError:
+        return _error('invalid_request', 'Documents must be base64-encoded', 400)
 
-        fraud_score = result['fraud_score']
-        recommendation = result['recommendation']
+    # Persist uploads regardless of channel
+    attach_session_documents(session['id'], documents)
+    return _submit(session, u['sub'], body.get('video_duration_s'))
 
-        import json
-        new_status = {
-            'approve': 'approved',
-            'manual_review': 'manager_review',
-            'reject': 'rejected',
-        }.get(recommendation, 'manager_review')
 
-        update_verification_session(
-            session_id,
-            status=new_status,
-            fraud_score=fraud_score,
-            fraud_flags_json=json.dumps(result['flags']),
-        )
+@bp.post('/uploads')
+@require_auth(['careerforge:write'])
+def create_upload():
+    """
+    Open a resumable upload for one session document.
 
-        # If approved by AI, mark user as verified
-        if new_status == 'approved':
-            with _conn() as c:
-                c.execute('UPDATE users SET verifyid_verified=1 WHERE sub=?', (u['sub'],))
+    Body (JSON):
+      session_id : str
+      doc_type   : "front" | "back" | "video"
+      size       : int, total bytes that will be sent
+      mime       : str (optional)
+    """
+    u = request.thronos_user
+    body = request.get_json(force=True) or {}
 
-        return jsonify({
-            'session_id': session_id,
-            'status': new_status,
-            'fraud_score': fraud_score,
-            'flags': result['flags'],
-            'message': {
-                'approved': 'Identity verified successfully.',
-                'manager_review': 'Documents received. A manager will review shortly.',
-                'rejected': 'Verification could not be completed. Please contact support.',
-            }.get(new_status, ''),
-        }), 200
+    session, err = _pending_session(str(body.get('session_id', '')).strip(), u['sub'])
+    if err:
+        return err
+
+    doc_type = body.get('doc_type')
+    if doc_type not in _DEFAULT_MIME:
+        return _error('invalid_request', 'doc_type must be front|back|video', 400)
+    try:
+        size = int(body.get('size'))
+    except (TypeError, ValueError):
+        return _error('invalid_request', 'size must be an integer', 400)
+    if not 0 < size <= _UPLOAD_MAX_BYTES:
+        return _error('too_large', f'size must be between 1 and {_UPLOAD_MAX_BYTES} bytes', 413)
+    mime = str(body.get('mime') or _DEFAULT_MIME[doc_type])[:100]
+
+    upload_id = uuid.uuid4().hex
+    path = upload_path(upload_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    created = create_verification_upload(upload_id, session['id'], u['sub'], doc_type, size, mime)
+
+    return jsonify({**created, 'offset': 0, 'size': size}), 201
+
+
+def _own_upload(upload_id: str, sub: str):
+    """Return (upload, None) if `sub` owns the open upload, else (None, error response)."""
+    if not re.match(r'^[0-9a-f]{32}$', upload_id):
+        return None, _error('not_found', 'Upload not found', 404)
+    up = get_verification_upload(upload_id)
+    if not up or up['sub'] != sub:
+        return None, _error('not_found', 'Upload not found', 404)
+    if up['status'] != 'open':
+        return None, _error('conflict', f"Upload is already {up['status']}", 409)
+    return up, None
+
+
+def _offset(upload_id: str) -> int:
+    try:
+        return upload_path(upload_id).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+@bp.get('/uploads/<upload_id>')
+@require_auth(['careerforge:write'])
+def upload_status(upload_id: str):
+    """Bytes received so far; a client resumes its PUTs from `offset`."""
+    up, err = _own_upload(upload_id, request.thronos_user['sub'])
+    if err:
+        return err
+    offset = _offset(upload_id)
+    resp = jsonify({'upload_id': upload_id, 'offset': offset, 'size': up['size']})
+    resp.headers['Upload-Offset'] = str(offset)
+    resp.headers['Upload-Length'] = str(up['size'])
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp, 200
+
+
+@bp.put('/uploads/<upload_id>')
+@require_auth(['careerforge:write'])
+def upload_chunk(upload_id: str):
+    """
+    Append the raw request body at the offset given in the Upload-Offset
+    header. The body is streamed to disk; it is never held in memory.
+    """
+    up, err = _own_upload(upload_id, request.thronos_user['sub'])
+    if err:
+        return err
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return _error('invalid_request', 'Upload-Offset header required', 400)
+
+    path = upload_path(upload_id)
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        return _error('conflict', 'Upload has expired', 409)
+    with f:
+        # One writer per upload: a retried request must not interleave with one still running
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return _error('conflict', 'Another request is writing to this upload', 409)
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            return _error('offset_mismatch', f'Expected Upload-Offset {current}', 409, offset=current)
+
+        f.seek(current)
+        written = current
+        too_large = False
+        try:
+            while True:
+                chunk = request.stream.read(_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if written + len(chunk) > up['size']:
+                    too_large = True
+                    break
+                f.write(chunk)
+                written += len(chunk)
+        finally:
+            # Keep whatever arrived before a dropped connection so the client can resume
+            f.flush()
+            os.fsync(f.fileno())
+
+    if too_large:
+        return _error('too_large', f"Upload exceeds its declared size of {up['size']} bytes", 413, offset=written)
+    resp = jsonify({'upload_id': upload_id, 'offset': written, 'size': up['size']})
+    resp.headers['Upload-Offset'] = str(written)
+    return resp, 200
+
+
+@bp.post('/uploads/<upload_id>/finalize')
+@require_auth(['careerforge:write'])
+def finalize_upload(upload_id: str):
+    """Body: { "sha256": hex digest of the whole file }"""
+    up, err = _own_upload(upload_id, request.thronos_user['sub'])
+    if err:
+        return err
+    body = request.get_json(force=True) or {}
+    expected = str(body.get('sha256', '')).strip().lower()
+    if not re.match(r'^[0-9a-f]{64}$', expected):
+        return _error('invalid_request', 'sha256 must be a hex digest', 400)
+
+    path = upload_path(upload_id)
+    offset = _offset(upload_id)
+    if offset != up['size']:
+        return _error('incomplete', f"Received {offset} of {up['size']} bytes", 409, offset=offset)
+    if file_digest(path) != expected:
+        # Corrupt somewhere we can't locate: start over rather than keep bad bytes
+        with open(path, 'r+b') as f:
+            f.truncate(0)
+        return _error('checksum_mismatch', 'sha256 does not match the uploaded bytes; re-send from offset 0', 422, offset=0)
+
+    session, err = _pending_session(up['session_id'], up['sub'])
+    if err:
+        return err
+    if not attach_session_upload(upload_id, expected):
+        return _error('conflict', 'Upload is no longer open', 409)
+    return jsonify({'upload_id': upload_id, 'status': 'finalized', 'doc_type': up['doc_type'],
+                    'sha256': expected}), 200
+
+
+@bp.post('/complete')
+@require_auth(['careerforge:write'])
+def complete():
+    """
+    Submit a session whose documents were sent via /uploads.
+    Body: { "session_id": str, "video_duration_s": float (optional) }
+    """
+    u = request.thronos_user
+    body = request.get_json(force=True) or {}
 
-    # Agent channel: just store docs, session stays pending for agent action
-    return jsonify({
-        'session_id': session_id,
-        'status': 'pending',
-        'message': 'Documents uploaded. Your agent will review them during the video call.',
-    }), 200
+    session, err = _pending_session(str(body.get('session_id', '')).strip(), u['sub'])
+    if err:
+        return err
+    if not get_session_doc(session['id'], 'front'):
+        return _error('invalid_request', 'doc_front is required', 400)
+    return _submit(session, u['sub'], body.get('video_duration_s'))
 
 
 @bp.get('/status')
@@ -219,8 +429,6 @@ def agent_decision(session_id: str):
     )
 
     if new_status == 'approved':
-        from ..db.store import _conn
-        with _conn() as c:
-            c.execute('UPDATE users SET verifyid_verified=1 WHERE sub=?', (session['sub'],))
+        mark_user_verified(session['sub'])
 
     return jsonify({'session_id': session_id, 'status': new_status}), 200
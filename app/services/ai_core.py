@@ -3,28 +3,173 @@ AI Core client — calls Render node 4 (LLM/RAG/Templates) for inference.
 
 If AICORE_API_URL is not set, falls back to built-in stubs so the service
 boots and is testable without a live AI core.
+
+Calls go through one keep-alive requests.Session per worker process, so
+consecutive calls reuse a pooled TCP+TLS connection instead of handshaking
+each time. AICORE_POOL_SIZE caps the connections kept open (size it to the
+gunicorn --threads count); beyond that a call opens a one-off connection
+rather than waiting. Each endpoint has its own read timeout below, all share
+AICORE_CONNECT_TIMEOUT_S. Request bodies of at least AICORE_GZIP_MIN_BYTES
+(0 = off; the AI core must accept Content-Encoding: gzip) are sent gzipped,
+which matters for long CV and job texts. stats() reports per-endpoint
+latency and how many calls reused a connection.
 """
 import os
 import json
+import gzip
 import hashlib
+import logging
+import threading
+import time
 from typing import Dict, Any, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from ..db.store import commit_point
+
+log = logging.getLogger(__name__)
+
+_POOL_SIZE = max(1, int(os.getenv('AICORE_POOL_SIZE', '10')))
+_CONNECT_TIMEOUT_S = float(os.getenv('AICORE_CONNECT_TIMEOUT_S', '5'))
+_GZIP_MIN_BYTES = int(os.getenv('AICORE_GZIP_MIN_BYTES', '0'))
+
+# Read timeout per endpoint: parsing and scoring are quick, generation is not
+_READ_TIMEOUT_S = {
+    '/v1/ats/score': 30,
+    '/v1/job/parse': 30,
+    '/v1/cv/analyze': 60,
+    '/v1/interview/prepare': 60,
+    '/v1/outreach/generate': 60,
+    '/v1/kit/generate': 90,
+}
+_DEFAULT_READ_TIMEOUT_S = 60
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_session: Optional[requests.Session] = None
+_calls: Dict[str, Dict[str, float]] = {}
+_opened = 0                 # connections this process has opened to the AI core
+_counting = False           # whether _CountingAdapter could install its pools
+
+
+def _connected() -> None:
+    global _opened
+    with _lock:
+        _opened += 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        super().connect()
+        _connected()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _connected()
+
+
+class _CountingHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools count the connections they open, so stats()
+    can tell new connections from reused ones."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        global _counting
+        super().init_poolmanager(*args, **kwargs)
+        # Without the hook the session still works; stats() just reports no counts
+        if isinstance(getattr(self.poolmanager, 'pool_classes_by_scheme', None), dict):
+            self.poolmanager.pool_classes_by_scheme = {'http': _CountingHTTPPool, 'https': _CountingHTTPSPool}
+            _counting = True
+        else:
+            log.warning('urllib3 PoolManager has no pool_classes_by_scheme; AI core connection reuse is not counted')
 
 
 def _base() -> Optional[str]:
     return os.getenv('AICORE_API_URL', '').rstrip('/') or None
 
 
+def _http() -> requests.Session:
+    global _pid, _session, _opened
+    # Pooled sockets must not be shared with a forked worker; each process opens its own
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                session = requests.Session()
+                adapter = _CountingAdapter(pool_connections=1, pool_maxsize=_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session, _pid = session, os.getpid()
+                _calls.clear()
+                _opened = 0
+    return _session
+
+
+def _record(path: str, started: float, ok: bool, answered: bool) -> None:
+    elapsed = (time.perf_counter() - started) * 1000
+    with _lock:
+        c = _calls.setdefault(path, {'count': 0, 'answered': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        c['count'] += 1
+        c['answered'] += answered
+        c['errors'] += not ok
+        c['total_ms'] += elapsed
+        c['max_ms'] = max(c['max_ms'], elapsed)
+
+
 def _post(path: str, body: Dict) -> Dict:
     base = _base()
     if not base:
         return {}
     url = f"{base}{path}"
-    r = requests.post(url, json=body, timeout=60,
-                      headers={'Authorization': f"Bearer {os.getenv('AICORE_API_KEY','')}"})
-    r.raise_for_status()
-    return r.json()
+    commit_point()
+    headers = {'Authorization': f"Bearer {os.getenv('AICORE_API_KEY','')}",
+               'Content-Type': 'application/json'}
+    data = json.dumps(body).encode('utf-8')
+    if _GZIP_MIN_BYTES and len(data) >= _GZIP_MIN_BYTES:
+        data = gzip.compress(data, compresslevel=5)
+        headers['Content-Encoding'] = 'gzip'
+    timeout = (_CONNECT_TIMEOUT_S, _READ_TIMEOUT_S.get(path, _DEFAULT_READ_TIMEOUT_S))
+    started, ok, answered = time.perf_counter(), False, False
+    try:
+        r = _http().post(url, data=data, timeout=timeout, headers=headers)
+        answered = True
+        r.raise_for_status()
+        result = r.json()
+        ok = True
+        return result
+    finally:
+        _record(path, started, ok, answered)
+
+
+def stats() -> Dict[str, Any]:
+    """Calls, latency and connection reuse for this worker process."""
+    with _lock:
+        endpoints = {
+            path: {'count': int(c['count']), 'errors': int(c['errors']),
+                   'avg_ms': round(c['total_ms'] / c['count'], 1) if c['count'] else 0.0,
+                   'max_ms': round(c['max_ms'], 1)}
+            for path, c in _calls.items()
+        }
+        answered = int(sum(c['answered'] for c in _calls.values()))
+        opened = _opened if _counting else None
+    return {
+        'pool_size': _POOL_SIZE,
+        'requests': answered,
+        'connections_opened': opened,
+        'connections_reused': max(0, answered - opened) if opened is not None else None,
+        'endpoints': endpoints,
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -2,6 +2,8 @@ import os
 import requests
 from typing import Dict, Any
 
+from ..db.store import commit_point
+
 
 def submit_tx(tx: Dict[str, Any]) -> Dict[str, Any]:
     base = os.getenv('THRONOS_CHAIN_API_URL', '').rstrip('/')
@@ -10,6 +12,7 @@ def submit_tx(tx: Dict[str, Any]) -> Dict[str, Any]:
         raise RuntimeError('THRONOS_CHAIN_API_URL not configured')
 
     url = f"{base}{path}"
+    commit_point()
     r = requests.post(url, json=tx, timeout=20)
     try:
         data = r.json()
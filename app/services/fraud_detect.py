@@ -8,6 +8,9 @@ Inputs
 - video_duration_s             : reported duration in seconds
 - declared_name                : full name from the user's profile
 
+analyse_files() takes paths to the same documents in the blob store instead
+of base64 strings.
+
 Returns
 -------
 {
@@ -26,8 +29,9 @@ from __future__ import annotations
 import base64
 import hashlib
 import math
+import os
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
 
 
 # ---------------------------------------------------------------------------
@@ -45,37 +49,72 @@ def analyse(
     """
     Run all heuristic checks and return a consolidated fraud report.
     """
+    return _analyse(
+        _load(_sample_b64, doc_front_b64),
+        _load(_sample_b64, doc_back_b64),
+        _load(_sample_b64, video_b64),
+        video_duration_s, declared_name,
+    )
+
+
+def analyse_files(
+    *,
+    doc_front_path: Optional[str] = None,
+    doc_back_path: Optional[str] = None,
+    video_path: Optional[str] = None,
+    video_duration_s: Optional[float] = None,
+    declared_name: Optional[str] = '',
+) -> Dict[str, Any]:
+    """
+    Same checks as analyse() for documents already on disk (blob store).
+    Only the first few KB of each file are read.
+    """
+    return _analyse(
+        _load(_sample_file, doc_front_path),
+        _load(_sample_file, doc_back_path),
+        _load(_sample_file, video_path),
+        video_duration_s, declared_name,
+    )
+
+
+def _analyse(
+    front: Optional['_Sample'],
+    back: Optional['_Sample'],
+    video: Optional['_Sample'],
+    video_duration_s: Optional[float],
+    declared_name: Optional[str],
+) -> Dict[str, Any]:
     flags: List[str] = []
     score = 0.0
 
     # 1. Document presence checks
-    if not doc_front_b64:
+    if front is None:
         flags.append('missing_doc_front')
         score += 25
     else:
-        s, f = _check_document(doc_front_b64, 'front')
+        s, f = _check_document(front, 'front')
         score += s
         flags.extend(f)
 
-    if not doc_back_b64:
+    if back is None:
         flags.append('missing_doc_back')
         score += 15
     else:
-        s, f = _check_document(doc_back_b64, 'back')
+        s, f = _check_document(back, 'back')
         score += s
         flags.extend(f)
 
     # 2. Video / liveness checks
-    if not video_b64:
+    if video is None:
         flags.append('missing_liveness_video')
         score += 20
     else:
-        s, f = _check_video(video_b64, video_duration_s)
+        s, f = _check_video(video, video_duration_s)
         score += s
         flags.extend(f)
 
     # 3. Cross-checks
-    s, f = _cross_check(doc_front_b64, video_b64, declared_name)
+    s, f = _cross_check(front, video, declared_name)
     score += s
     flags.extend(f)
 
@@ -99,6 +138,38 @@ def analyse(
 # Internal helpers
 # ---------------------------------------------------------------------------
 
+# Every check looks at the leading bytes and the total size only
+_HEAD_BYTES = 4096
+
+
+class _Sample(NamedTuple):
+    head: bytes   # first _HEAD_BYTES bytes
+    size: int     # total size in bytes
+
+
+# Stands in for an input that was supplied but could not be decoded/read
+_UNREADABLE = _Sample(b'', -1)
+
+
+def _load(loader: Callable[[Any], _Sample], source: Any) -> Optional[_Sample]:
+    if not source:
+        return None
+    try:
+        return loader(source)
+    except Exception:
+        return _UNREADABLE
+
+
+def _sample_b64(b64: str) -> _Sample:
+    data = _b64_bytes(b64)
+    return _Sample(data[:_HEAD_BYTES], len(data))
+
+
+def _sample_file(path: str) -> _Sample:
+    with open(path, 'rb') as f:
+        return _Sample(f.read(_HEAD_BYTES), os.fstat(f.fileno()).st_size)
+
+
 def _b64_bytes(b64: str) -> bytes:
     """Decode base64, stripping data-URL prefix if present."""
     if ',' in b64:
@@ -108,7 +179,7 @@ def _b64_bytes(b64: str) -> bytes:
     return base64.b64decode(b64)
 
 
-def _check_document(b64: str, side: str) -> tuple[float, List[str]]:
+def _check_document(sample: _Sample, side: str) -> tuple[float, List[str]]:
     """
     Analyse a document image.
     Returns (score_penalty, flags).
@@ -116,12 +187,11 @@ def _check_document(b64: str, side: str) -> tuple[float, List[str]]:
     flags: List[str] = []
     penalty = 0.0
 
-    try:
-        data = _b64_bytes(b64)
-    except Exception:
+    if sample is _UNREADABLE:
         return 20.0, [f'doc_{side}_decode_error']
 
-    size_kb = len(data) / 1024
+    data = sample.head
+    size_kb = sample.size / 1024
 
     # Too small — probably a placeholder / screenshot thumbnail
     if size_kb < 10:
@@ -147,7 +217,7 @@ def _check_document(b64: str, side: str) -> tuple[float, List[str]]:
     return penalty, flags
 
 
-def _check_video(b64: str, duration_s: Optional[float]) -> tuple[float, List[str]]:
+def _check_video(sample: _Sample, duration_s: Optional[float]) -> tuple[float, List[str]]:
     """
     Analyse a liveness video.
     Returns (score_penalty, flags).
@@ -155,12 +225,11 @@ def _check_video(b64: str, duration_s: Optional[float]) -> tuple[float, List[str
     flags: List[str] = []
     penalty = 0.0
 
-    try:
-        data = _b64_bytes(b64)
-    except Exception:
+    if sample is _UNREADABLE:
         return 20.0, ['video_decode_error']
 
-    size_kb = len(data) / 1024
+    data = sample.head
+    size_kb = sample.size / 1024
 
     # Too short a video (< 2 s)
     if duration_s is not None and duration_s < 2:
@@ -193,8 +262,8 @@ def _check_video(b64: str, duration_s: Optional[float]) -> tuple[float, List[str
 
 
 def _cross_check(
-    doc_front_b64: Optional[str],
-    video_b64: Optional[str],
+    front: Optional[_Sample],
+    video: Optional[_Sample],
     declared_name: Optional[str],
 ) -> tuple[float, List[str]]:
     """
@@ -205,22 +274,18 @@ def _cross_check(
     flags: List[str] = []
     penalty = 0.0
 
-    if not doc_front_b64 or not video_b64:
+    if front is None or video is None:
         return 0.0, []
 
     # Heuristic: compare entropy fingerprints of first 512 bytes of each
     # as a rough proxy for "are these from completely different sources"
-    try:
-        doc_data = _b64_bytes(doc_front_b64)
-        vid_data = _b64_bytes(video_b64)
-        doc_fp = hashlib.sha256(doc_data[:512]).hexdigest()
-        vid_fp = hashlib.sha256(vid_data[:512]).hexdigest()
+    if _UNREADABLE not in (front, video):
+        doc_fp = hashlib.sha256(front.head[:512]).hexdigest()
+        vid_fp = hashlib.sha256(video.head[:512]).hexdigest()
         # If the first 512 bytes are identical → same file submitted twice
         if doc_fp == vid_fp:
             flags.append('doc_and_video_identical_source')
             penalty += 30
-    except Exception:
-        pass
 
     # Name validation: if declared name looks like a placeholder
     if declared_name:
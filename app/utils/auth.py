@@ -1,45 +1,203 @@
+import hashlib
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Dict, Optional, Tuple
 
 import jwt
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
 from flask import request, jsonify
 
+from .jwks import KeySet
+
+log = logging.getLogger(__name__)
+
+_HS256_MIN_SECRET_LENGTH = 32  # NIST recommends >= 256-bit keys for HMAC
+
+# Per-worker cache of verified claims, keyed by the token's digest, so a
+# caller presenting the same bearer token again skips signature checks.
+# Entries expire at the token's `exp`; 0 disables.
+_TOKEN_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '10000'))
+# How often JWT_PUBLIC_KEY_PATH is stat'ed for a rotated key
+_KEY_CHECK_INTERVAL_S = 5
+# JWKS refresh period and the minimum gap between early refreshes for unknown kids
+_JWKS_TTL_S = float(os.getenv('JWT_JWKS_TTL_S', '300'))
+_JWKS_MIN_REFRESH_S = float(os.getenv('JWT_JWKS_MIN_REFRESH_S', '30'))
 
-def _decode_token(token: str) -> Dict[str, Any]:
-    """Try HS256 (native CareerForge login) first, fall back to RS256 (Thronos SSO)."""
-    aud = os.getenv('JWT_AUDIENCE') or None
-    iss = os.getenv('JWT_ISSUER') or None
-    opts = {'require': ['exp', 'sub']}
 
-    _HS256_MIN_SECRET_LENGTH = 32  # NIST recommends >= 256-bit keys for HMAC
+class _KeyMaterial:
+    """The HS256 secret and RS256 public keys, loaded once per process.
 
-    secret = os.getenv('JWT_SECRET_KEY', '')
-    if secret:
-        if len(secret) < _HS256_MIN_SECRET_LENGTH:
+    A key file (JWT_PUBLIC_KEY_PATH) is re-read only when its mtime changes;
+    a JWKS (JWT_JWKS_URL) is refreshed in the background (app/utils/jwks.py).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._secret = ''
+        self._env_key = None
+        self._path = ''
+        self._file_key = None
+        self._file_mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._file_generation = 0   # bumped whenever the key file changes
+        self._jwks: Optional[KeySet] = None
+        self._jwks_loaded = False
+        self.audience: Optional[str] = None
+        self.issuer: Optional[str] = None
+        self.key_error: Optional[Exception] = None
+
+    def _load(self) -> None:
+        secret = os.getenv('JWT_SECRET_KEY', '')
+        if secret and len(secret) < _HS256_MIN_SECRET_LENGTH:
             raise ValueError(
                 f'JWT_SECRET_KEY is too short ({len(secret)} chars). '
                 f'HS256 requires at least {_HS256_MIN_SECRET_LENGTH} characters '
                 f'to meet minimum security requirements.'
             )
-        try:
-            return jwt.decode(token, secret, algorithms=['HS256'],
-                              audience=aud, issuer=iss, options=opts)
-        except jwt.InvalidTokenError:
-            pass  # Not a native token, try RS256
-
-    # RS256 fallback (external Thronos SSO)
-    pem = os.getenv('JWT_PUBLIC_KEY_PEM', '').strip()
-    if not pem:
-        path = os.getenv('JWT_PUBLIC_KEY_PATH', '')
-        if path:
-            with open(path, 'r', encoding='utf-8') as f:
-                pem = f.read()
-    if not pem:
-        raise RuntimeError('No JWT secret or public key configured')
+        pem = os.getenv('JWT_PUBLIC_KEY_PEM', '').strip()
+        self._env_key = None
+        if pem:
+            try:
+                self._env_key = load_pem_public_key(pem.encode('utf-8'))
+            except ValueError as exc:
+                log.error('JWT_PUBLIC_KEY_PEM is not a valid public key: %s', exc)
+                self.key_error = exc
+        self._path = '' if pem else os.getenv('JWT_PUBLIC_KEY_PATH', '')
+        self._secret = secret
+        self.audience = os.getenv('JWT_AUDIENCE') or None
+        self.issuer = os.getenv('JWT_ISSUER') or None
+        self._loaded = True
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever a public key is replaced or withdrawn."""
+        return self._file_generation + (self._jwks.generation if self._jwks else 0)
+
+    def jwks(self) -> Optional[KeySet]:
+        if not self._jwks_loaded:
+            with self._lock:
+                if not self._jwks_loaded:
+                    url = os.getenv('JWT_JWKS_URL', '').strip()
+                    self._jwks = KeySet(url, _JWKS_TTL_S, _JWKS_MIN_REFRESH_S) if url else None
+                    self._jwks_loaded = True
+        return self._jwks
+
+    def secret(self) -> str:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+        return self._secret
+
+    def public_key(self):
+        self.secret()
+        if not self._path:
+            return self._env_key
+        now = time.monotonic()
+        if self._file_key is not None and now - self._checked_at < _KEY_CHECK_INTERVAL_S:
+            return self._file_key
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self._path).st_mtime_ns
+                if mtime != self._file_mtime:
+                    with open(self._path, 'rb') as f:
+                        self._file_key = load_pem_public_key(f.read())
+                    self._file_mtime = mtime
+                    self._file_generation += 1
+                self.key_error = None
+            except (OSError, ValueError) as exc:
+                # Keep verifying with the last good key (if any) until the file is fixed
+                if self.key_error is None:
+                    log.error('cannot load JWT public key from %s: %s', self._path, exc)
+                self.key_error = exc
+            return self._file_key
 
-    return jwt.decode(token, pem, algorithms=['RS256'],
-                      audience=aud, issuer=iss, options=opts)
+
+class _VerifiedTokens:
+    """LRU of token digest -> (claims, exp, key generation)."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[bytes, Tuple[Dict[str, Any], float, int]]' = OrderedDict()
+
+    def get(self, digest: bytes, generation: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            claims, exp, gen = entry
+            if exp <= time.time() or gen != generation:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return dict(claims)
+
+    def put(self, digest: bytes, claims: Dict[str, Any], generation: int) -> None:
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (dict(claims), float(claims['exp']), generation)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+
+_keys = _KeyMaterial()
+_verified = _VerifiedTokens(_TOKEN_CACHE_SIZE)
+
+
+def start_key_refresh() -> None:
+    """Begin loading JWT_JWKS_URL in the background; called from create_app()
+    so the keys are usually in place before the first request."""
+    jwks = _keys.jwks()
+    if jwks is not None:
+        jwks.start()
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    """Verify `token` with the key its header names: HS256 (native
+    CareerForge login) or RS256 (Thronos SSO), the RS256 key chosen by `kid`
+    from the JWKS when one is configured. Verified claims are cached until
+    the token expires, or until its key is rotated out."""
+    secret = _keys.secret()
+    public_key = _keys.public_key()
+    jwks = _keys.jwks()
+    digest = hashlib.sha256(token.encode('utf-8')).digest()
+    cached = _verified.get(digest, _keys.generation)
+    if cached is not None:
+        return cached
+
+    if not secret and public_key is None and jwks is None:
+        raise RuntimeError('No JWT secret or public key configured')
+    header = jwt.get_unverified_header(token)
+    alg = header.get('alg')
+    if alg == 'HS256':
+        key = secret or None
+    elif alg == 'RS256':
+        key = jwks.get(header.get('kid')) if jwks is not None else None
+        if key is None:
+            key = public_key
+        if key is None and jwks is not None:
+            if not jwks.loaded:
+                raise RuntimeError(f'JWKS not loaded yet (last error: {jwks.error})')
+            raise jwt.InvalidKeyError(f"Unknown signing key id {header.get('kid')!r}")
+        if key is None and _keys.key_error is not None:
+            raise RuntimeError(f'JWT public key unavailable: {_keys.key_error}')
+    else:
+        key = None
+    if key is None:
+        raise jwt.InvalidAlgorithmError(f'The specified alg value is not allowed: {alg!r}')
+    claims = jwt.decode(token, key, algorithms=[alg], audience=_keys.audience,
+                        issuer=_keys.issuer, options={'require': ['exp', 'sub']})
+    _verified.put(digest, claims, _keys.generation)
+    return claims
 
 
 def require_auth(scopes_required=None):
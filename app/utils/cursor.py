@@ -0,0 +1,23 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+
+def encode_cursor(key: List[Any]) -> str:
+    """Opaque, URL-safe token for a keyset pagination position."""
+    raw = json.dumps(key, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str], size: int) -> Optional[List[Any]]:
+    """Inverse of encode_cursor(). None for an empty token; ValueError if malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('malformed cursor')
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError('malformed cursor')
+    return key
@@ -0,0 +1,139 @@
+"""
+JWKS key set for RS256 tokens (JWT_JWKS_URL).
+
+Keys are held in-process by `kid` and refreshed by a daemon thread every
+JWT_JWKS_TTL_S (jittered by ±20% so workers do not fetch in step), so a
+request only ever reads the keys already loaded. A failed refresh keeps the
+last good keys in service (stale-while-revalidate) and is retried with
+backoff. A token naming a kid that is not loaded wakes the thread for an
+early refresh, at most every JWT_JWKS_MIN_REFRESH_S, and is rejected
+meanwhile rather than waiting on the fetch.
+
+The source is an http(s) URL (fetched with If-None-Match) or a local file,
+as a path or file:// URL (re-read when its mtime changes).
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import jwt
+import requests
+
+log = logging.getLogger(__name__)
+
+_FETCH_TIMEOUT_S = 5
+_RETRY_MIN_S = 5
+
+
+class KeySet:
+    def __init__(self, source: str, ttl_s: float = 300, min_refresh_s: float = 30) -> None:
+        self.source = source
+        self._ttl_s = ttl_s
+        self._min_refresh_s = min_refresh_s
+        self._keys: Dict[str, Any] = {}         # kid -> public key object
+        self._jwks: Dict[str, Dict] = {}        # kid -> JWK as published
+        self.generation = 0                     # bumped when a kid is removed or replaced
+        self.error: Optional[Exception] = None  # last refresh failure, None once one succeeds
+        self._validator: Any = None             # ETag or file mtime of the loaded set
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid: Optional[int] = None
+        self._last_wake = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._keys)
+
+    def get(self, kid: Optional[str]):
+        """Key for `kid` (or the only key, for a token without one); None if
+        not loaded, in which case a refresh is requested."""
+        self.start()
+        keys = self._keys
+        if kid is None:
+            return next(iter(keys.values())) if len(keys) == 1 else None
+        key = keys.get(kid)
+        if key is None:
+            now = time.monotonic()
+            if now - self._last_wake >= self._min_refresh_s:
+                self._last_wake = now
+                self._wake.set()
+        return key
+
+    def start(self) -> None:
+        """Start the refresh thread for this process (threads do not survive fork())."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name='jwks-refresh', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self) -> None:
+        delay, backoff = 0.0, _RETRY_MIN_S
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                self.refresh()
+                delay, backoff = self._ttl_s * random.uniform(0.8, 1.2), _RETRY_MIN_S
+            except Exception as exc:
+                log.warning('JWKS refresh from %s failed (serving %d cached key(s)): %s',
+                            self.source, len(self._keys), exc)
+                delay, backoff = min(backoff, self._ttl_s), min(backoff * 2, self._ttl_s)
+
+    def refresh(self) -> bool:
+        """Fetch the key set now; False if the source is unchanged. Raises on
+        failure, leaving the current keys in place."""
+        try:
+            fetched = self._fetch()
+            if fetched is None:
+                self.error = None
+                return False
+            doc, validator = fetched
+            jwks, keys = {}, {}
+            for jwk in doc.get('keys') or []:
+                kid = jwk.get('kid')
+                if not kid or jwk.get('kty') != 'RSA' or jwk.get('use', 'sig') != 'sig' \
+                        or jwk.get('alg', 'RS256') != 'RS256':
+                    continue
+                try:
+                    keys[kid] = jwt.PyJWK(jwk, algorithm='RS256').key
+                except jwt.PyJWTError as exc:
+                    log.warning('skipping JWKS key %r: %s', kid, exc)
+                    continue
+                jwks[kid] = jwk
+            if not keys:
+                raise ValueError('no usable RS256 signing keys in the key set')
+        except Exception as exc:
+            self.error = exc
+            raise
+        with self._lock:
+            if any(jwks.get(kid) != jwk for kid, jwk in self._jwks.items()):
+                self.generation += 1
+            self._jwks, self._keys = jwks, keys
+            self._validator = validator
+            self.error = None
+        log.info('loaded %d JWKS key(s) from %s', len(keys), self.source)
+        return True
+
+    def _fetch(self) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """(document, validator), or None when unchanged since the last load."""
+        u = urlparse(self.source)
+        if u.scheme in ('http', 'https'):
+            headers = {'If-None-Match': self._validator} if self._validator else {}
+            r = requests.get(self.source, headers=headers, timeout=_FETCH_TIMEOUT_S)
+            if r.status_code == 304:
+                return None
+            r.raise_for_status()
+            return r.json(), r.headers.get('ETag')
+        path = u.path if u.scheme == 'file' else self.source
+        mtime = os.stat(path).st_mtime_ns
+        if mtime == self._validator:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f), mtime
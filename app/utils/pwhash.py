@@ -0,0 +1,131 @@
+"""
+Password hashing off the request threads, with admission control.
+
+PBKDF2 runs on a small dedicated pool (PASSWORD_HASH_WORKERS per worker
+process). hashlib releases the GIL for the whole derivation, so the pool
+uses other cores without slowing the request threads, and no more than
+that many hashes ever run at once. At most PASSWORD_HASH_QUEUE_MAX more
+may wait; beyond that, and for any wait longer than PASSWORD_HASH_TIMEOUT_S,
+Saturated is raised straight away so the route answers 429 and the request
+thread goes back to serving other endpoints.
+
+Stored hashes describe their own parameters as
+`pbkdf2_sha256$<iterations>$<salt>$<hex>`. New hashes use
+PASSWORD_HASH_ITERATIONS; check() reports a hash made with other
+parameters (including the original `salt:hex` form, 260k iterations) so
+the caller can rehash it while it has the password. `flask auth
+calibrate-hash` suggests an iteration count for a target latency.
+"""
+import hashlib
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+WORKERS = max(1, int(os.getenv('PASSWORD_HASH_WORKERS', '2')))
+_QUEUE_MAX = int(os.getenv('PASSWORD_HASH_QUEUE_MAX', '8'))
+_TIMEOUT_S = float(os.getenv('PASSWORD_HASH_TIMEOUT_S', '5'))
+ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '260000'))
+
+_ALGORITHM = 'pbkdf2_sha256'
+_LEGACY_ITERATIONS = 260_000    # hashes stored as salt:hex before the format carried it
+_HEX_RE = re.compile(r'[0-9a-f]+')
+
+
+class Saturated(Exception):
+    """Too many password hashes in flight; the caller should retry later."""
+
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_pool: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def _executor():
+    global _pid, _pool, _slots
+    # Threads do not survive fork(); each worker process builds its own pool
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                _pool = ThreadPoolExecutor(WORKERS, thread_name_prefix='pwhash')
+                _slots = threading.BoundedSemaphore(WORKERS + _QUEUE_MAX)
+                _pid = os.getpid()
+    return _pool, _slots
+
+
+def pbkdf2_sha256(password: str, salt: str, iterations: int) -> str:
+    """Hex PBKDF2-HMAC-SHA256 of `password`; raises Saturated when the pool
+    is full or the hash cannot finish within PASSWORD_HASH_TIMEOUT_S."""
+    pool, slots = _executor()
+    if not slots.acquire(blocking=False):
+        raise Saturated('password hashing is at capacity')
+    try:
+        future = pool.submit(hashlib.pbkdf2_hmac, 'sha256', password.encode(), salt.encode(), iterations)
+    except BaseException:
+        slots.release()
+        raise
+    # The slot is held until the hash really finishes, even if we stop waiting
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=_TIMEOUT_S).hex()
+    except FutureTimeout:
+        future.cancel()
+        raise Saturated('password hashing timed out') from None
+
+
+def make(password: str) -> str:
+    """New stored hash for `password` with the current parameters."""
+    salt = secrets.token_hex(16)
+    return f'{_ALGORITHM}${ITERATIONS}${salt}${pbkdf2_sha256(password, salt, ITERATIONS)}'
+
+
+def _parse(stored: str) -> Tuple[int, str, str]:
+    """(iterations, salt, hex digest); 0 iterations for the original salt:hex form."""
+    if '$' in stored:
+        algorithm, iterations, salt, expected = stored.split('$', 3)
+        if algorithm != _ALGORITHM:
+            raise ValueError(f'unsupported password hash algorithm {algorithm!r}')
+        if not iterations.isdigit() or int(iterations) < 1:
+            raise ValueError(f'bad iteration count {iterations!r}')
+        iterations = int(iterations)
+    elif ':' in stored:
+        iterations = 0
+        salt, expected = stored.split(':', 1)
+    else:
+        raise ValueError('unrecognised password hash format')
+    if not _HEX_RE.fullmatch(expected):
+        raise ValueError('digest is not hex')
+    return iterations, salt, expected
+
+
+def check(password: str, stored: str) -> Tuple[bool, bool]:
+    """(password matches, stored hash should be replaced by make(password)).
+    A stored value that is not a hash this module wrote (such as the
+    placeholder left on a deleted account) never matches."""
+    try:
+        iterations, salt, expected = _parse(stored or '')
+    except ValueError as exc:
+        log.warning('unusable stored password hash: %s', exc)
+        return False, False
+    ok = secrets.compare_digest(pbkdf2_sha256(password, salt, iterations or _LEGACY_ITERATIONS), expected)
+    return ok, ok and iterations != ITERATIONS
+
+
+def calibrate(target_ms: float, sample_iterations: int = 100_000, rounds: int = 3) -> Tuple[int, float]:
+    """Iterations (rounded to 10k) for one hash to take about `target_ms` on
+    this host, and the measured milliseconds per 100k iterations. Runs inline."""
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac('sha256', b'calibration', b'calibration-salt', sample_iterations)
+        best = min(best, time.perf_counter() - started)
+    ms_per_100k = best * 1000 * 100_000 / sample_iterations
+    iterations = max(10_000, round(target_ms / ms_per_100k * 100_000 / 10_000) * 10_000)
+    return iterations, ms_per_100k
@@ -0,0 +1,39 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class TokenBuckets:
+    """Per-key token buckets held by this worker process.
+
+    Each key may spend `burst` tokens at once, refilled at `per_minute`.
+    The least recently used keys are dropped beyond `maxsize` (a dropped key
+    simply starts again with a full bucket).
+    """
+
+    def __init__(self, per_minute: float, burst: int, maxsize: int = 100_000) -> None:
+        self._rate = per_minute / 60.0
+        self._burst = float(burst)
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+
+    def take(self, key: str) -> float:
+        """Spend a token for `key`: 0 if allowed, else seconds until one is available."""
+        if self._rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - last) * self._rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self._rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self._maxsize:
+                self._buckets.popitem(last=False)
+        return wait
@@ -1,15 +1,27 @@
 -- CareerForge Thronos AI — PostgreSQL schema (production)
--- For SQLite MVP the schema is applied automatically in app/db/store.py
+-- Baseline (schema_version 1), applied by app/db/migrate.py when
+-- DATABASE_URL is postgresql://…; the SQLite baseline is _SCHEMA_SQL in
+-- app/db/store.py. Later changes are numbered migrations in store.py.
+-- Column names and types mirror the SQLite schema so the same store
+-- functions run unchanged on either backend (timestamps are epoch seconds).
+
+CREATE TABLE IF NOT EXISTS auth_accounts (
+    id BIGSERIAL PRIMARY KEY,
+    sub TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    full_name TEXT,
+    created_at BIGINT NOT NULL
+);
 
 -- users: maps gateway sub -> internal user
 CREATE TABLE IF NOT EXISTS users (
     id BIGSERIAL PRIMARY KEY,
-    gateway_sub TEXT NOT NULL,
-    tenant_id TEXT NOT NULL,
+    sub TEXT UNIQUE NOT NULL,
     email TEXT,
-    verifyid_verified BOOLEAN NOT NULL DEFAULT FALSE,
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    UNIQUE (gateway_sub, tenant_id)
+    tenant_id TEXT,
+    verifyid_verified INTEGER DEFAULT 0,
+    created_at BIGINT NOT NULL
 );
 
 CREATE TABLE IF NOT EXISTS plans (
@@ -42,57 +54,79 @@ CREATE TABLE IF NOT EXISTS subscriptions (
 
 CREATE TABLE IF NOT EXISTS profiles (
     id TEXT PRIMARY KEY,              -- pro_<hex>
-    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
     tenant_id TEXT NOT NULL,
     version INTEGER NOT NULL DEFAULT 1,
-    data_json JSONB NOT NULL,
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    data_json TEXT NOT NULL,
+    created_at BIGINT NOT NULL,
+    updated_at BIGINT NOT NULL
 );
 
-CREATE INDEX IF NOT EXISTS profiles_user_idx ON profiles(user_id);
+CREATE INDEX IF NOT EXISTS profiles_sub_idx ON profiles(sub);
 
 CREATE TABLE IF NOT EXISTS jobs (
     id TEXT PRIMARY KEY,              -- job_<hex>
-    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
     tenant_id TEXT NOT NULL,
     source_type TEXT NOT NULL,        -- url/paste/pdf_text
     source_url TEXT,
     raw_text TEXT NOT NULL,
-    parsed_json JSONB,
+    parsed_json TEXT,
     job_fingerprint_sha256 TEXT NOT NULL,
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    created_at BIGINT NOT NULL
 );
 
-CREATE UNIQUE INDEX IF NOT EXISTS jobs_user_fp_idx ON jobs(user_id, job_fingerprint_sha256);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_sub_fp_idx ON jobs(sub, job_fingerprint_sha256);
 
 CREATE TABLE IF NOT EXISTS credit_ledger (
     id BIGSERIAL PRIMARY KEY,
-    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    tenant_id TEXT NOT NULL,
-    delta INT NOT NULL,               -- +grant, -consume, -refund
-    reason TEXT NOT NULL,             -- e.g. STRIPE_PACK_PURCHASE, KIT_GENERATE
-    ref_type TEXT,                    -- STRIPE_EVENT, KIT, MANUAL_ADJUST
-    ref_id TEXT,                      -- stripe_event_id, kit_id, etc.
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    sub TEXT NOT NULL,
+    delta INTEGER NOT NULL,           -- +grant, -consume, -refund
+    reason TEXT NOT NULL,             -- e.g. stripe_purchase, kit_generate
+    ref_type TEXT,                    -- stripe_session, kit, guarantee, ...
+    ref_id TEXT,
+    created_at BIGINT NOT NULL
 );
 
-CREATE INDEX IF NOT EXISTS credit_ledger_user_time_idx ON credit_ledger(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS credit_ledger_sub_time_idx ON credit_ledger(sub, created_at DESC);
+
+-- Materialised SUM(credit_ledger.delta) per user, maintained by add_credits()
+CREATE TABLE IF NOT EXISTS credit_balances (
+    sub TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    updated_at BIGINT NOT NULL
+);
+
+-- Credits reserved by in-flight paid requests
+CREATE TABLE IF NOT EXISTS credit_holds (
+    id TEXT PRIMARY KEY,              -- hold_<hex>
+    sub TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    ref_type TEXT,
+    ref_id TEXT,
+    status TEXT NOT NULL DEFAULT 'held', -- held/committed/released
+    created_at BIGINT NOT NULL,
+    expires_at BIGINT NOT NULL,
+    settled_at BIGINT
+);
+
+CREATE INDEX IF NOT EXISTS credit_holds_status_exp_idx ON credit_holds(status, expires_at);
 
 CREATE TABLE IF NOT EXISTS kits (
     id TEXT PRIMARY KEY,              -- kit_<hex>
-    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
     tenant_id TEXT NOT NULL,
-    job_id TEXT REFERENCES jobs(id) ON DELETE SET NULL,
-    profile_id TEXT REFERENCES profiles(id) ON DELETE SET NULL,
-    kind TEXT NOT NULL,               -- full/cv_only/ats_only/cover_only
-    credits_charged INT NOT NULL,
+    job_id TEXT,
+    profile_id TEXT,
+    kind TEXT NOT NULL DEFAULT 'full', -- full/cv_only/ats_only/cover_only
+    credits_charged INTEGER NOT NULL DEFAULT 0,
     idempotency_key TEXT,
-    artifacts_json JSONB NOT NULL,
+    artifacts_json TEXT NOT NULL,
     attestation_txid TEXT,
     artifact_sha256 TEXT,
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    UNIQUE (user_id, idempotency_key)
+    created_at BIGINT NOT NULL,
+    UNIQUE (sub, idempotency_key)
 );
 
 CREATE TABLE IF NOT EXISTS artifacts (
@@ -101,40 +135,182 @@ CREATE TABLE IF NOT EXISTS artifacts (
     type TEXT NOT NULL,               -- cv_docx, cover_pdf, ats_report_json
     storage_url TEXT,                 -- signed URL or object key
     content_sha256 TEXT,
-    meta JSONB,
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    meta_json TEXT,
+    created_at BIGINT NOT NULL
 );
 
 CREATE TABLE IF NOT EXISTS applications (
     id TEXT PRIMARY KEY,
-    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
     tenant_id TEXT NOT NULL,
-    job_id TEXT REFERENCES jobs(id) ON DELETE SET NULL,
-    kit_id TEXT REFERENCES kits(id) ON DELETE SET NULL,
+    job_id TEXT,
+    kit_id TEXT,
     status TEXT NOT NULL DEFAULT 'new', -- new/applied/followup/interview/offer/rejected
     notes TEXT,
-    next_action_at TIMESTAMPTZ,
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    next_action_at BIGINT,
+    created_at BIGINT NOT NULL,
+    updated_at BIGINT NOT NULL
 );
 
 -- Stripe webhook dedupe
 CREATE TABLE IF NOT EXISTS stripe_events (
     id TEXT PRIMARY KEY,              -- stripe event id
-    type TEXT NOT NULL,
-    processed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    raw JSONB
+    type TEXT,
+    created_at BIGINT NOT NULL,
+    raw_json TEXT
 );
 
 CREATE TABLE IF NOT EXISTS audits (
     id BIGSERIAL PRIMARY KEY,
     tenant_id TEXT NOT NULL,
-    actor_user_id BIGINT REFERENCES users(id),
-    action TEXT NOT NULL,             -- CREDIT_GRANT, KIT_GENERATE, ATTEST_SUBMIT, etc.
+    actor_sub TEXT,
+    action TEXT NOT NULL,             -- KIT_GENERATE, ATS_SCORE, GUARANTEE_RESOLVE, etc.
     target_type TEXT,
     target_id TEXT,
-    ip INET,
-    user_agent TEXT,
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-    details JSONB
+    details_json TEXT,
+    created_at BIGINT NOT NULL
+);
+
+-- CV analysis results uploaded by users
+CREATE TABLE IF NOT EXISTS cv_analyses (
+    id TEXT PRIMARY KEY,              -- cva_<hex>
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
+    filename TEXT,
+    raw_text TEXT NOT NULL,
+    analysis_json TEXT,
+    ats_score INTEGER,
+    artifact_sha256 TEXT,
+    attestation_txid TEXT,
+    credits_charged INTEGER NOT NULL DEFAULT 2,
+    created_at BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS cv_analyses_sub_idx ON cv_analyses(sub, created_at DESC);
+
+-- Employer/recruiter accounts
+CREATE TABLE IF NOT EXISTS employers (
+    id TEXT PRIMARY KEY,
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
+    company_name TEXT NOT NULL,
+    verified INTEGER DEFAULT 0,
+    credit_balance INTEGER DEFAULT 0,
+    created_at BIGINT NOT NULL
+);
+
+-- Controls whether a candidate appears in recruiter search
+CREATE TABLE IF NOT EXISTS candidate_visibility (
+    sub TEXT PRIMARY KEY,
+    visible INTEGER DEFAULT 0,
+    desired_roles_json TEXT,
+    desired_locations_json TEXT,
+    keywords_json TEXT,
+    latest_ats INTEGER,               -- newest cv_analyses.ats_score, kept by save_cv_analysis()
+    updated_at BIGINT NOT NULL
+);
+
+ALTER TABLE candidate_visibility ADD COLUMN IF NOT EXISTS latest_ats INTEGER;
+
+CREATE INDEX IF NOT EXISTS candidate_visibility_rank_idx
+    ON candidate_visibility((COALESCE(latest_ats, -1)) DESC, sub) WHERE visible = 1;
+
+-- Recruiter search documents for visible candidates, maintained by
+-- store._index_candidate() (SQLite uses an FTS5 table instead)
+CREATE TABLE IF NOT EXISTS candidate_search (
+    user_id BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    roles TEXT NOT NULL DEFAULT '',
+    keywords TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    skills TEXT NOT NULL DEFAULT '',
+    locations TEXT NOT NULL DEFAULT ''
+);
+
+-- Identity verification sessions (tri-channel: agent → AI → manager)
+CREATE TABLE IF NOT EXISTS verification_sessions (
+    id TEXT PRIMARY KEY,
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    channel TEXT NOT NULL DEFAULT 'ai',
+    agent_sub TEXT,
+    fraud_score DOUBLE PRECISION,
+    fraud_flags_json TEXT,
+    doc_front_b64 TEXT,               -- legacy; see doc_front_sha256
+    doc_back_b64 TEXT,
+    video_b64 TEXT,                   -- legacy; uploads now live in the blob store
+    video_duration_s DOUBLE PRECISION,
+    doc_front_sha256 TEXT,
+    doc_front_size BIGINT,
+    doc_front_mime TEXT,
+    doc_back_sha256 TEXT,
+    doc_back_size BIGINT,
+    doc_back_mime TEXT,
+    video_sha256 TEXT,
+    video_size BIGINT,
+    video_mime TEXT,
+    manager_decision TEXT,
+    manager_note TEXT,
+    manager_sub TEXT,
+    decided_at BIGINT,
+    created_at BIGINT NOT NULL,
+    updated_at BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS vsess_sub_idx ON verification_sessions(sub, created_at DESC);
+CREATE INDEX IF NOT EXISTS vsess_status_idx ON verification_sessions(status);
+
+ALTER TABLE verification_sessions
+    ADD COLUMN IF NOT EXISTS doc_front_sha256 TEXT,
+    ADD COLUMN IF NOT EXISTS doc_front_size BIGINT,
+    ADD COLUMN IF NOT EXISTS doc_front_mime TEXT,
+    ADD COLUMN IF NOT EXISTS doc_back_sha256 TEXT,
+    ADD COLUMN IF NOT EXISTS doc_back_size BIGINT,
+    ADD COLUMN IF NOT EXISTS doc_back_mime TEXT,
+    ADD COLUMN IF NOT EXISTS video_sha256 TEXT,
+    ADD COLUMN IF NOT EXISTS video_size BIGINT,
+    ADD COLUMN IF NOT EXISTS video_mime TEXT;
+
+-- Files in the content-addressed blob store (app/db/blobs.py)
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size BIGINT NOT NULL,
+    mime TEXT,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at BIGINT NOT NULL
+);
+
+-- Chunked, resumable document uploads (staged under BLOB_STORE_DIR/uploads)
+CREATE TABLE IF NOT EXISTS verification_uploads (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    sub TEXT NOT NULL,
+    doc_type TEXT NOT NULL,           -- front/back/video
+    size BIGINT NOT NULL,             -- declared total bytes
+    mime TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open', -- open/finalized/expired
+    sha256 TEXT,
+    created_at BIGINT NOT NULL,
+    updated_at BIGINT NOT NULL
+);
+
+-- Anti-bot psychology test results
+CREATE TABLE IF NOT EXISTS psychology_tests (
+    id TEXT PRIMARY KEY,
+    sub TEXT NOT NULL REFERENCES users(sub) ON DELETE CASCADE,
+    answers_json TEXT NOT NULL,
+    score INTEGER NOT NULL DEFAULT 0,
+    flags_json TEXT,
+    passed INTEGER NOT NULL DEFAULT 0,
+    duration_ms INTEGER,
+    created_at BIGINT NOT NULL
+);
+
+-- Job-search guarantee tracking
+CREATE TABLE IF NOT EXISTS guarantee_requests (
+    id TEXT PRIMARY KEY,
+    sub TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    credits_refunded INTEGER DEFAULT 0,
+    reason TEXT,
+    reviewed_by TEXT,
+    created_at BIGINT NOT NULL,
+    resolved_at BIGINT
 );
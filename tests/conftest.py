@@ -0,0 +1,43 @@
+"""
+Test setup: one app per session against a throwaway SQLite database, or the
+Postgres database in TEST_DATABASE_URL (tests for one backend skip on the other).
+
+    python -m pytest -q
+    TEST_DATABASE_URL=postgresql://localhost/careerforge_test python -m pytest -q
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix='careerforge-test-')
+# sqlite:/// paths are relative to the working directory
+os.chdir(_TMP)
+os.environ.update({
+    'JWT_SECRET_KEY': 'test-secret-' + 'x' * 40,
+    'STRIPE_SECRET_KEY': 'sk_test',
+    'STRIPE_WEBHOOK_SECRET': 'whsec_test',
+    'ATTESTOR_PRIVKEY_HEX': '1' * 64,
+    'DATABASE_URL': os.getenv('TEST_DATABASE_URL') or 'sqlite:///test.db',
+    'BLOB_STORE_DIR': f'{_TMP}/blobs',
+    'AUDIT_ARCHIVE_DIR': f'{_TMP}/audit-archive',
+})
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def store(app):
+    from app.db import store
+    return store
+
+
+@pytest.fixture
+def sub():
+    """A user id no other test uses."""
+    return f'test-{uuid.uuid4().hex[:12]}'
@@ -0,0 +1,40 @@
+def _visible(store, sub, roles, keywords=()):
+    store.upsert_user(sub, f'{sub}@example.com', 't1', False)
+    store.set_candidate_visibility(sub, True, roles, ['Athens'], list(keywords))
+
+
+def _all_pages(store, on_page=lambda n: None, **query):
+    subs, key, n = [], None, 0
+    while True:
+        page, key = store.search_candidates(limit=3, after=key, **query)
+        subs += [c['sub'] for c in page]
+        if key is None:
+            return subs
+        n += 1
+        on_page(n)
+
+
+def test_no_cursor_for_empty_last_page(store, sub):
+    token = f'zq{sub[-10:]}'
+    for i in range(3):
+        _visible(store, f'{sub}-{i}', [f'Engineer {token}'])
+    page, key = store.search_candidates(role_query=token, limit=3)
+    assert len(page) == 3 and key is None
+
+
+def test_pages_have_no_duplicates_or_gaps_when_index_changes(store, sub):
+    token = f'zq{sub[-10:]}'
+    expected = [f'{sub}-{i}' for i in range(8)]
+    for i, s in enumerate(expected):
+        # Varied lengths and term counts so bm25 differs per candidate
+        _visible(store, s, [f'Engineer {token}' + ' platform' * i], [token] * (i % 3 + 1))
+
+    def reindex(n):
+        # Index writes that match nothing still move every row's bm25
+        for j in range(4):
+            _visible(store, f'{sub}-other-{n}-{j}', ['Chef ' * (j + n)], ['cooking'])
+        store.set_candidate_visibility(f'{sub}-other-{n}-0', False)
+
+    subs = _all_pages(store, reindex, role_query=token)
+    assert len(subs) == len(set(subs))
+    assert sorted(subs) == sorted(expected)
@@ -0,0 +1,39 @@
+import base64
+
+import pytest
+
+from app.db import codec
+
+TEXT = '{"identity": {"full_name": "Ada Lovelace"}, "summary": "%s"}' % ('Analytical engine ' * 40)
+
+
+@pytest.mark.parametrize('binary', [True, False])
+def test_round_trip(binary):
+    value = codec.encode(TEXT, binary)
+    assert value != TEXT
+    assert codec.decode(value) == TEXT
+
+
+@pytest.mark.parametrize('binary', [True, False])
+def test_round_trip_multi_digit_version(binary, monkeypatch):
+    monkeypatch.setitem(codec._DICTIONARIES, 300, b'"summary": Analytical engine ')
+    monkeypatch.setattr(codec, '_CURRENT', 300)
+    value = codec.encode(TEXT, binary)
+    assert value[:6] == (b'\x1fZ300:' if binary else '\x1fZ300:')
+    assert codec.decode(value) == TEXT
+
+
+@pytest.mark.parametrize('binary', [True, False])
+def test_reads_single_character_version(binary):
+    payload = codec._compress(TEXT.encode('utf-8'), 1)
+    if binary:
+        value = b'\x1fZ\x01' + payload
+    else:
+        value = '\x1fZ1' + base64.b64encode(payload).decode('ascii')
+    assert codec.decode(value) == TEXT
+
+
+def test_marker_text_is_wrapped():
+    text = '\x1fZ12:not compressed'
+    assert codec.decode(codec.encode(text, False)) == text
+    assert codec.decode(codec.encode(text, True)) == text
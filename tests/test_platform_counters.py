@@ -0,0 +1,30 @@
+import time
+
+
+def test_rebuild_keeps_the_live_series(store, sub, monkeypatch):
+    real_now = time.time()
+    clock = [real_now]
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+
+    def on_day(days_ago):
+        clock[0] = real_now - days_ago * 86400
+
+    a, b = f'{sub}-a', f'{sub}-b'
+    on_day(5)
+    store.upsert_user(a, f'{a}@example.com', 't1', False)
+    store.set_candidate_visibility(a, True, ['Engineer'])
+    on_day(3)
+    store.mark_user_verified(a)
+    # Saving preferences again is not a new opt-in
+    store.set_candidate_visibility(a, True, ['Engineer', 'Lead'])
+    on_day(2)
+    store.upsert_user(b, f'{b}@example.com', 't1', True)
+    store.set_candidate_visibility(b, True, ['Designer'])
+    store.set_candidate_visibility(b, False)
+    on_day(1)
+    store.set_candidate_visibility(b, True, ['Designer'])
+    on_day(0)
+
+    before = store.get_platform_counters(days=10)
+    store.rebuild_platform_counters()
+    assert store.get_platform_counters(days=10) == before
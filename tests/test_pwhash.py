@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils import pwhash
+
+
+def test_make_and_check():
+    stored = pwhash.make('correct horse')
+    assert stored.startswith(f'pbkdf2_sha256${pwhash.ITERATIONS}$')
+    assert pwhash.check('correct horse', stored) == (True, False)
+    assert pwhash.check('wrong', stored) == (False, False)
+
+
+def test_other_iterations_need_rehash():
+    salt = 'ab' * 16
+    stored = f'pbkdf2_sha256$1000${salt}${pwhash.pbkdf2_sha256("pw", salt, 1000)}'
+    assert pwhash.check('pw', stored) == (True, True)
+
+
+@pytest.mark.parametrize('stored', [
+    '', '[deleted]', 'md5$1$salt$abc', 'pbkdf2_sha256$many$salt$abc', 'pbkdf2_sha256$0$salt$abc',
+    'pbkdf2_sha256$1000$salt', 'salt:not-hex', 'salt:ÿÿ',
+])
+def test_malformed_hash_never_matches(stored):
+    assert pwhash.check('pw', stored) == (False, False)
+
+
+def test_login_with_malformed_hash_is_rejected(app, store):
+    client = app.test_client()
+    email = 'malformed-hash@example.com'
+    assert client.post('/v1/auth/register', json={'email': email, 'password': 'password1'}).status_code == 201
+    with store._conn() as c:
+        c.execute("UPDATE auth_accounts SET password_hash='[deleted]' WHERE email=?", (email,))
+    r = client.post('/v1/auth/login', json={'email': email, 'password': 'password1'})
+    assert r.status_code == 401
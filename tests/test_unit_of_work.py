@@ -0,0 +1,33 @@
+import pytest
+
+
+def _checked_out(pool):
+    stats = pool.get_stats()
+    return stats['pool_size'] - stats['pool_available']
+
+
+def test_commit_point_commits_and_request_continues(app, store, sub):
+    with app.test_request_context():
+        store.upsert_user(sub, f'{sub}@example.com', 't1', False)
+        store.commit_point()
+        store.add_credits(sub, 3, 'test')
+        store._finish_request_unit(commit=True)
+    assert store.get_balance(sub) == 3
+
+
+def test_commit_point_returns_postgres_connection(app, store, sub):
+    if store._BACKEND != 'postgres':
+        pytest.skip('Postgres only')
+    pool = store._pg._pool()
+    baseline = _checked_out(pool)
+    with app.test_request_context():
+        store.upsert_user(sub, f'{sub}@example.com', 't1', False)
+        assert _checked_out(pool) == baseline + 1
+        store.commit_point()
+        # Nothing is held while the request waits on an outbound call
+        assert _checked_out(pool) == baseline
+        store.add_credits(sub, 2, 'test')
+        assert _checked_out(pool) == baseline + 1
+        store._finish_request_unit(commit=True)
+    assert _checked_out(pool) == baseline
+    assert store.get_balance(sub) == 2